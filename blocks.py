@@ -0,0 +1,82 @@
+import hashlib
+import json
+import numpy as np
+import settings
+
+# Реестр типов блоков из файла описаний (settings.BLOCKS_FILE). Свойства
+# собираются в таблицы NumPy, индексируемые номером блока, - мешер, столкновения
+# и свет проверяют сразу целые массивы блоков без ветвлений по типам.
+
+# Порядок граней в таблице текстур - тот же, что в mesher.FACE_DIRECTIONS
+FACES = ("top", "bottom", "front", "back", "left", "right")
+SIDE_FACES = ("front", "back", "left", "right")
+
+
+class BlockRegistry:
+    """Свойства всех типов блоков.
+
+    Таблицы по номеру блока (256 значений):
+        solid       - участвует в столкновениях;
+        opaque      - не пропускает свет и затеняет углы соседей;
+        transparent - сквозь блок видны грани соседей;
+        emission    - уровень собственного света 0..15;
+        tint        - множитель цвета вершин (r, g, b).
+    Неописанные номера ведут себя как камень с текстурой по умолчанию.
+    """
+
+    def __init__(self, definitions, default_texture):
+        self.definitions = {}
+        self.default_texture = default_texture
+        self.solid = np.ones(256, dtype=bool)
+        self.opaque = np.ones(256, dtype=bool)
+        self.transparent = np.zeros(256, dtype=bool)
+        self.emission = np.zeros(256, dtype=np.uint8)
+        self.tint = np.ones((256, 3), dtype=np.float32)
+        # Имена текстур по граням: (6, 256)
+        self.texture_names = [[default_texture] * 256 for _ in FACES]
+
+        for definition in definitions:
+            block_id = definition["id"]
+            if not 0 <= block_id < 256:
+                raise ValueError(f"Номер блока вне 0..255: {block_id}")
+            if block_id in self.definitions:
+                raise ValueError(f"Блок {block_id} описан дважды")
+            self.definitions[block_id] = definition
+            self.solid[block_id] = definition.get("solid", True)
+            self.opaque[block_id] = definition.get("opaque", True)
+            self.transparent[block_id] = definition.get("transparent", not self.opaque[block_id])
+            self.emission[block_id] = definition.get("light", 0)
+            self.tint[block_id] = definition.get("tint", (1.0, 1.0, 1.0))
+            textures = definition.get("textures", {})
+            for face_index, face in enumerate(FACES):
+                side = textures.get("side") if face in SIDE_FACES else None
+                name = textures.get(face) or side or textures.get("all") or default_texture
+                self.texture_names[face_index][block_id] = name
+
+        # Воздух всегда пустой: не рисуется, не мешает движению и свету
+        self.solid[0] = self.opaque[0] = False
+        self.transparent[0] = True
+        # Отпечаток описаний: меняется вместе с любым свойством блоков (ключ кэша мешей)
+        description = json.dumps([default_texture, sorted(self.definitions.items())], sort_keys=True)
+        self.fingerprint = hashlib.blake2b(description.encode(), digest_size=8).hexdigest()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["blocks"], data.get("default_texture", "stone"))
+
+    def name(self, block_id):
+        definition = self.definitions.get(block_id)
+        return definition["name"] if definition is not None else f"Блок {block_id}"
+
+    def texture_lookup(self, atlas):
+        """Таблица (грань, тип блока) -> номер клетки атласа для мешера"""
+        missing = {name for names in self.texture_names for name in names} - set(atlas.index)
+        if missing:
+            raise ValueError(f"Нет текстур для блоков: {', '.join(sorted(missing))}")
+        return np.array([[atlas.index[name] for name in names] for names in self.texture_names], dtype=np.uint8)
+
+
+# Общий реестр движка
+registry = BlockRegistry.load(settings.BLOCKS_FILE)
@@ -0,0 +1,205 @@
+import numpy as np
+import settings
+
+
+def chunk_coords(x, y, z, size=settings.CHUNK_SIZE):
+    """Перевести мировые координаты блока в координаты чанка"""
+    return x // size, y // size, z // size
+
+
+class PalettedBlocks:
+    """Сжатое хранение блоков: палитра типов и упакованные индексы в палитру.
+
+    Однородный чанк (весь воздух или весь камень) хранит только палитру из
+    одного значения. Остальные - индексы по 1, 2, 4 или 8 бит на блок.
+    """
+
+    def __init__(self, shape, palette, bits, packed):
+        self.shape = shape
+        self.palette = palette
+        self.bits = bits
+        self.packed = packed
+
+    @staticmethod
+    def bits_for(palette_size):
+        """Ширина индекса: степень двойки, чтобы индексы не пересекали границы байтов"""
+        for bits in (0, 1, 2, 4):
+            if palette_size <= 1 << bits:
+                return bits
+        return 8
+
+    @classmethod
+    def from_dense(cls, dense):
+        palette, indices = np.unique(dense, return_inverse=True)
+        bits = cls.bits_for(len(palette))
+        if bits == 0:
+            packed = np.empty(0, dtype=np.uint8)
+        elif bits == 8:
+            packed = indices.astype(np.uint8).ravel()
+        else:
+            # В каждый байт ложится 8 / bits индексов, младшие биты - первый индекс
+            per_byte = 8 // bits
+            shifts = np.arange(per_byte, dtype=np.uint8) * bits
+            grouped = indices.astype(np.uint8).reshape(-1, per_byte) << shifts
+            packed = np.bitwise_or.reduce(grouped, axis=1).astype(np.uint8)
+        return cls(dense.shape, palette.astype(np.uint8), bits, packed)
+
+    def to_dense(self):
+        """Развернуть в обычный массив (для однородного чанка - без выделения памяти)"""
+        if self.bits == 0:
+            return np.broadcast_to(self.palette[0], self.shape)
+        if self.bits == 8:
+            indices = self.packed
+        else:
+            per_byte = 8 // self.bits
+            shifts = np.arange(per_byte, dtype=np.uint8) * self.bits
+            mask = (1 << self.bits) - 1
+            indices = ((self.packed[:, None] >> shifts) & mask).ravel()
+        return self.palette[indices].reshape(self.shape)
+
+    def get(self, lx, ly, lz):
+        if self.bits == 0:
+            return self.palette[0]
+        _, sy, sz = self.shape
+        index = (lx * sy + ly) * sz + lz
+        per_byte = 8 // self.bits
+        value = self.packed[index // per_byte] >> ((index % per_byte) * self.bits)
+        return self.palette[value & ((1 << self.bits) - 1)]
+
+    def get_many(self, lx, ly, lz):
+        """То же, что get, для массивов координат"""
+        if self.bits == 0:
+            return np.full(np.shape(lx), self.palette[0], dtype=np.uint8)
+        _, sy, sz = self.shape
+        index = (lx * sy + ly) * sz + lz
+        per_byte = 8 // self.bits
+        value = self.packed[index // per_byte] >> ((index % per_byte) * self.bits).astype(np.uint8)
+        return self.palette[value & ((1 << self.bits) - 1)]
+
+    @property
+    def uniform(self):
+        return self.bits == 0
+
+    @property
+    def nbytes(self):
+        return self.palette.nbytes + self.packed.nbytes
+
+
+class Chunk:
+    """Кусок мира размером CHUNK_SIZE³ со своим массивом блоков.
+
+    Блоки хранятся либо обычным массивом (пока чанк редактируют), либо
+    в сжатом виде PalettedBlocks (см. compact и settings.CHUNK_STORAGE).
+    """
+
+    def __init__(self, cx, cy, cz, size=settings.CHUNK_SIZE):
+        self.cx = cx
+        self.cy = cy
+        self.cz = cz
+        self.size = size
+
+        # Новый чанк целиком из воздуха
+        self._dense = None
+        self._packed = PalettedBlocks((size, size, size), np.zeros(1, dtype=np.uint8), 0, np.empty(0, dtype=np.uint8))
+
+        # Чанк нужно перестроить при следующей отрисовке
+        self.dirty = True
+        # Растет при каждом изменении, влияющем на геометрию чанка
+        # (по ней отбрасываются устаревшие результаты фонового мешинга)
+        self.version = 0
+        # Уровень детализации геометрии: 0 - полная, n - сетка в 2 ** n раз грубее
+        self.lod = 0
+        # Какие пары сторон чанка соединены через прозрачные блоки (culling.chunk_connectivity);
+        # None - еще не посчитано, чанк считается проницаемым
+        self.connectivity = None
+        # Чанк отличается от сгенерированного и не может быть просто выброшен
+        self.modified = False
+        # Свет блоков (sky << 4 | block, см. lighting.py); None - еще не посчитан
+        self.light = None
+
+    @property
+    def key(self):
+        return self.cx, self.cy, self.cz
+
+    @property
+    def origin(self):
+        """Мировые координаты угла чанка"""
+        return self.cx * self.size, self.cy * self.size, self.cz * self.size
+
+    @property
+    def blocks(self):
+        """Блоки чанка обычным массивом.
+
+        Для сжатого чанка это развернутая копия только для чтения -
+        изменять блоки нужно через set_local или присваиванием blocks.
+        """
+        if self._dense is not None:
+            return self._dense
+        dense = self._packed.to_dense()
+        dense.flags.writeable = False
+        return dense
+
+    @blocks.setter
+    def blocks(self, dense):
+        self._dense = dense
+        self._packed = None
+
+    def compact(self):
+        """Перевести блоки в сжатый вид с палитрой"""
+        if self._dense is not None:
+            self._packed = PalettedBlocks.from_dense(self._dense)
+            self._dense = None
+
+    def get_local(self, lx, ly, lz):
+        if self._dense is not None:
+            return self._dense[lx, ly, lz]
+        return self._packed.get(lx, ly, lz)
+
+    def get_many(self, lx, ly, lz):
+        """Типы блоков для массивов локальных координат без разворачивания чанка"""
+        if self._dense is not None:
+            return self._dense[lx, ly, lz]
+        return self._packed.get_many(lx, ly, lz)
+
+    def set_local(self, lx, ly, lz, block_type):
+        """Установить блок в локальных координатах, вернуть True если он изменился"""
+        if self.get_local(lx, ly, lz) == block_type:
+            return False
+        if self._dense is None:
+            # Редактируемый чанк разворачивается, сжимать его обратно будет World
+            self.blocks = self._packed.to_dense().copy()
+        self._dense[lx, ly, lz] = block_type
+        self.modified = True
+        return True
+
+    def set_many(self, indices, values):
+        """Установить блоки по плоским индексам (x, y, z по порядку), вернуть прежние типы"""
+        if self._dense is None:
+            old = self._packed.get_many(*np.unravel_index(indices, self._packed.shape))
+            if (old == values).all():
+                return old
+            self.blocks = self._packed.to_dense().copy()
+        flat = self._dense.reshape(-1)
+        old = flat[indices]
+        flat[indices] = values
+        self.modified = True
+        return old
+
+    def is_empty(self):
+        if self._packed is not None and self._packed.uniform:
+            return self._packed.palette[0] == 0
+        return not self.blocks.any()
+
+    @property
+    def nbytes(self):
+        """Сколько памяти занимают блоки чанка"""
+        if self._dense is not None:
+            return self._dense.nbytes
+        return self._packed.nbytes
+
+    @property
+    def storage_kind(self):
+        """Вид хранения для статистики памяти: uniform, palette или dense"""
+        if self._dense is not None:
+            return "dense"
+        return "uniform" if self._packed.uniform else "palette"
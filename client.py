@@ -0,0 +1,118 @@
+import time
+from collections import deque
+import numpy as np
+from network import (CHUNK, DELTA, EDIT, POSITION, UNLOAD, WELCOME, Connection, KEY,
+                     decode_chunk, decode_delta, decode_welcome, encode_edits, encode_position)
+
+
+class WorldClient:
+    """Связь с сервером мира (server.py): держит копию мира в согласии с сервером.
+
+    world - World(remote=True): чанки в него добавляет и выгружает сервер, правки
+    игрока уходят на сервер и попадают в копию с ответной дельтой.
+    """
+
+    def __init__(self, address, world, timeout=10.0):
+        self.world = world
+        self.connection = self._connect(address, timeout)
+        # Сообщения, пришедшие вместе с приветствием (первые чанки), - до первого update
+        self.backlog = []
+        welcome = self._wait_for_welcome(timeout)
+        tick_rate, chunk_size, world_height, self.spawn_point = decode_welcome(welcome)
+        if chunk_size != world.chunk_size or world_height != world.size_y:
+            raise ValueError(f"У сервера {address} другие CHUNK_SIZE/WORLD_HEIGHT")
+        self.tick_rate = tick_rate
+        self.server_tick = 0
+        self.last_position = None
+        self.edits = []
+        self.edit_seq = 0
+        # Номер правки -> время отправки; задержка - до дельты, которая ее подтвердила
+        self.edit_times = {}
+        self.latencies = deque(maxlen=600)
+        self.started = time.perf_counter()
+
+    @staticmethod
+    def _connect(address, timeout):
+        # Сервер, запущенный рядом, может еще не слушать - пробуем до timeout
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                return Connection.connect(address, timeout)
+            except (ConnectionRefusedError, FileNotFoundError):
+                if time.perf_counter() >= deadline:
+                    raise
+                time.sleep(0.1)
+
+    def _wait_for_welcome(self, timeout):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline and not self.connection.closed:
+            messages = self.connection.receive()
+            if messages:
+                kind, data = messages[0]
+                if kind != WELCOME:
+                    raise ConnectionError("Сервер начал не с приветствия")
+                self.backlog = messages[1:]
+                return data
+            time.sleep(0.01)
+        raise ConnectionError("Сервер не ответил")
+
+    @property
+    def connected(self):
+        return not self.connection.closed
+
+    def set_block(self, x, y, z, block_type):
+        """Попросить сервер поставить блок; в копии мира он появится с дельтой тика сервера"""
+        if not self.world.in_bounds(x, y, z):
+            return False
+        self.edits.append((x, y, z, block_type))
+        return True
+
+    def update(self, position):
+        """Отправить позицию и правки игрока, применить все пришедшие сообщения"""
+        position = tuple(float(v) for v in position)
+        if position != self.last_position:
+            self.connection.send(POSITION, encode_position(position))
+            self.last_position = position
+        if self.edits:
+            # Все правки кадра - одним сообщением
+            self.edit_seq += 1
+            self.connection.send(EDIT, encode_edits(self.edit_seq, self.edits))
+            self.edit_times[self.edit_seq] = time.perf_counter()
+            self.edits.clear()
+        self.connection.flush()
+
+        messages = self.backlog + self.connection.receive()
+        self.backlog = []
+        for kind, data in messages:
+            if kind == CHUNK:
+                key, blocks = decode_chunk(data, self.world.chunk_size)
+                self.world.drop_chunk(key)
+                self.world.add_chunk(key, blocks)
+            elif kind == UNLOAD:
+                self.world.drop_chunk(KEY.unpack(data))
+            elif kind == DELTA:
+                self.server_tick, ack, changes = decode_delta(data)
+                # Сервер шлет правки только чанков клиента, но выгрузка могла прийти раньше
+                self.world.apply_chunk_edits({key: edit for key, edit in changes.items() if key in self.world.chunks})
+                now = time.perf_counter()
+                for seq in [seq for seq in self.edit_times if seq <= ack]:
+                    self.latencies.append(now - self.edit_times.pop(seq))
+
+    def report_lines(self):
+        """Задержка правок до подтверждения сервером и входящий трафик по типам сообщений"""
+        lines = []
+        if self.latencies:
+            latencies = np.array(self.latencies) * 1000
+            lines.append("задержка правки p50/p95/max: {:.1f} / {:.1f} / {:.1f} мс ({} правок)".format(
+                np.percentile(latencies, 50), np.percentile(latencies, 95), latencies.max(), len(latencies)))
+        received = self.connection.bytes_received
+        seconds = max(time.perf_counter() - self.started, 1e-3)
+        lines.append(f"получено: {sum(received.values()) / 1024:.1f} КБ ("
+                     + ", ".join(f"{name} {count / 1024:.1f} КБ" for name, count in received.most_common())
+                     + f"), {sum(received.values()) / 1024 / seconds:.1f} КБ/с;"
+                     f" отправлено: {sum(self.connection.bytes_sent.values()) / 1024:.1f} КБ")
+        return lines
+
+    def close(self):
+        self.connection.flush()
+        self.connection.close()
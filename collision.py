@@ -0,0 +1,81 @@
+import numpy as np
+from blocks import registry
+
+# Движение AABB сквозь воксельный мир со сдвигом по одной оси за раз (Y, затем X и Z):
+# по каждой оси тело проходит ровно до ближайшего твердого блока, а не отменяет шаг целиком.
+# Все функции работают сразу с N телами; блоки вокруг них читаются одним запросом World.get_blocks.
+
+AXIS_ORDER = (1, 0, 2)
+# Допуск на ошибки округления: касание с зазором меньше EPSILON считается контактом
+EPSILON = 1e-6
+
+
+def _neighbourhood(mins, maxs, velocities):
+    """Координаты всех блоков, которые может задеть каждое тело за шаг, и номера тел"""
+    low = np.floor(np.minimum(mins, mins + velocities)).astype(np.int64)
+    high = np.ceil(np.maximum(maxs, maxs + velocities)).astype(np.int64)
+    dims = high - low
+    counts = dims.prod(axis=1)
+    bodies = np.repeat(np.arange(len(mins)), counts)
+    # Номер блока внутри коробки своего тела -> смещение (dx, dy, dz)
+    index = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    size_y, size_z = dims[bodies, 1], dims[bodies, 2]
+    offsets = np.stack([index // (size_y * size_z), index // size_z % size_y, index % size_z], axis=1)
+    return low[bodies] + offsets, bodies
+
+
+def move_boxes(world, mins, maxs, velocities):
+    """Сдвинуть тела (AABB от mins до maxs, массивы (N, 3)) на velocities с учетом блоков.
+
+    Возвращает (mins, velocities, blocked, on_ground): новые нижние углы тел,
+    скорости с обнуленными компонентами по осям столкновений, маску (N, 3)
+    остановленных осей и маску тел, стоящих на земле (движение вниз уперлось в блок).
+    """
+    mins = np.array(mins, dtype=np.float64).reshape(-1, 3)
+    maxs = np.array(maxs, dtype=np.float64).reshape(-1, 3)
+    velocities = np.array(velocities, dtype=np.float64).reshape(-1, 3)
+    blocked = np.zeros(velocities.shape, dtype=bool)
+    on_ground = np.zeros(len(velocities), dtype=bool)
+
+    cells, bodies = _neighbourhood(mins, maxs, velocities)
+    solid = registry.solid[world.get_blocks(cells)]
+    cells, bodies = cells[solid], bodies[solid]
+
+    for axis in AXIS_ORDER:
+        move = velocities[:, axis].copy()
+        others = [a for a in range(3) if a != axis]
+        # Блок мешает движению, только если перекрывает тело по двум другим осям
+        overlap = np.ones(len(cells), dtype=bool)
+        for other in others:
+            overlap &= (cells[:, other] < maxs[bodies, other] - EPSILON) & \
+                       (cells[:, other] + 1 > mins[bodies, other] + EPSILON)
+        c, b = cells[overlap, axis], bodies[overlap]
+
+        # Расстояние до грани блока по направлению движения (блоки позади не мешают)
+        forward = move[b] > 0
+        gap_up = c - maxs[b, axis]
+        ahead = forward & (gap_up >= -EPSILON)
+        limit_up = np.full(len(move), np.inf)
+        np.minimum.at(limit_up, b[ahead], np.maximum(gap_up[ahead], 0.0))
+
+        gap_down = c + 1 - mins[b, axis]
+        behind = ~forward & (gap_down <= EPSILON)
+        limit_down = np.full(len(move), -np.inf)
+        np.maximum.at(limit_down, b[behind], np.minimum(gap_down[behind], 0.0))
+
+        allowed = np.where(move > 0, np.minimum(move, limit_up), np.maximum(move, limit_down))
+        hit = allowed != move
+        blocked[:, axis] = hit
+        if axis == 1:
+            on_ground = hit & (move < 0)
+        velocities[hit, axis] = 0.0
+        mins[:, axis] += allowed
+        maxs[:, axis] += allowed
+
+    return mins, velocities, blocked, on_ground
+
+
+def move_box(world, box_min, box_max, velocity):
+    """move_boxes для одного тела: (новый нижний угол, скорость, остановленные оси, на земле)"""
+    mins, velocities, blocked, on_ground = move_boxes(world, [box_min], [box_max], [velocity])
+    return mins[0], velocities[0], blocked[0], bool(on_ground[0])
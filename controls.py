@@ -0,0 +1,91 @@
+import json
+import pygame
+
+
+def load_script(path):
+    """Прочитать сценарий ввода из JSON-файла со списком [кадр, действие, аргумент]"""
+    with open(path, encoding="utf-8") as f:
+        return [tuple(entry) for entry in json.load(f)]
+
+
+class PygameInput:
+    """Ввод с клавиатуры и мыши через pygame (обычный режим с окном)"""
+
+    finished = False
+
+    def next_frame(self):
+        pass
+
+    def events(self):
+        return pygame.event.get()
+
+    def pressed_keys(self):
+        return pygame.key.get_pressed()
+
+    def mouse_motion(self):
+        return pygame.mouse.get_rel()
+
+
+class KeyState(dict):
+    """Нажатые клавиши; индексируется кодом клавиши, как результат pygame.key.get_pressed"""
+
+    def __getitem__(self, key):
+        return self.get(key, False)
+
+
+class ScriptedInput:
+    """Ввод по заранее записанному сценарию - для запуска без окна и замеров.
+
+    Сценарий - список записей (кадр, действие, аргумент):
+        ("key_down", "w"), ("key_up", "w")  - нажать/отпустить клавишу (имя как в pygame.K_*);
+        ("mouse_move", (dx, dy))            - сдвиг мыши за кадр;
+        ("click", 1)                        - нажатие кнопки мыши;
+        ("quit", None)                      - завершить игру.
+    """
+
+    def __init__(self, script):
+        self.script = sorted(script, key=lambda entry: entry[0])
+        self.position = 0
+        self.frame = -1
+        self.keys = KeyState()
+        self.frame_events = []
+        self.motion = (0, 0)
+
+    @property
+    def finished(self):
+        return self.position >= len(self.script)
+
+    def next_frame(self):
+        """Перейти к следующему кадру и применить его записи"""
+        self.frame += 1
+        self.frame_events = []
+        dx, dy = 0, 0
+        while self.position < len(self.script) and self.script[self.position][0] <= self.frame:
+            _, action, argument = self.script[self.position]
+            self.position += 1
+            if action == "key_down":
+                key = getattr(pygame, f"K_{argument}")
+                self.keys[key] = True
+                self.frame_events.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+            elif action == "key_up":
+                key = getattr(pygame, f"K_{argument}")
+                self.keys[key] = False
+                self.frame_events.append(pygame.event.Event(pygame.KEYUP, key=key))
+            elif action == "mouse_move":
+                dx, dy = dx + argument[0], dy + argument[1]
+            elif action == "click":
+                self.frame_events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=argument, pos=(0, 0)))
+            elif action == "quit":
+                self.frame_events.append(pygame.event.Event(pygame.QUIT))
+            else:
+                raise ValueError(f"Неизвестное действие в сценарии: {action}")
+        self.motion = (dx, dy)
+
+    def events(self):
+        return self.frame_events
+
+    def pressed_keys(self):
+        return self.keys
+
+    def mouse_motion(self):
+        return self.motion
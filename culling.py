@@ -0,0 +1,183 @@
+from collections import deque
+import math
+import numpy as np
+
+# Матрицы здесь в обычной (строковой) записи numpy: точка p переводится как M @ p.
+# OpenGL хранит матрицы по столбцам, поэтому при передаче в GL их нужно транспонировать.
+
+
+def perspective_matrix(fov, aspect, near, far):
+    """То же, что gluPerspective"""
+    f = 1.0 / math.tan(math.radians(fov) / 2)
+    return np.array([
+        [f / aspect, 0, 0, 0],
+        [0, f, 0, 0],
+        [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+        [0, 0, -1, 0],
+    ], dtype=np.float64)
+
+
+def rotation_matrix(angle, x, y, z):
+    """То же, что glRotatef (угол в градусах, ось единичной длины)"""
+    c, s = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    t = 1 - c
+    return np.array([
+        [t * x * x + c, t * x * y - s * z, t * x * z + s * y, 0],
+        [t * x * y + s * z, t * y * y + c, t * y * z - s * x, 0],
+        [t * x * z - s * y, t * y * z + s * x, t * z * z + c, 0],
+        [0, 0, 0, 1],
+    ], dtype=np.float64)
+
+
+def translation_matrix(x, y, z):
+    """То же, что glTranslatef"""
+    matrix = np.identity(4)
+    matrix[:3, 3] = (x, y, z)
+    return matrix
+
+
+class Frustum:
+    """Пирамида видимости камеры из шести плоскостей (a, b, c, d), нормали внутрь"""
+
+    def __init__(self, projection, view):
+        clip = projection @ view
+        planes = np.array([
+            clip[3] + clip[0],  # Левая
+            clip[3] - clip[0],  # Правая
+            clip[3] + clip[1],  # Нижняя
+            clip[3] - clip[1],  # Верхняя
+            clip[3] + clip[2],  # Ближняя
+            clip[3] - clip[2],  # Дальняя
+        ])
+        self.planes = planes / np.linalg.norm(planes[:, :3], axis=1)[:, None]
+
+    def boxes_visible(self, mins, maxs):
+        """Маска AABB (массивы (N, 3)), хотя бы частично попадающих в пирамиду"""
+        normals = self.planes[:, :3]
+        # Для каждой плоскости берем угол коробки, дальше всего лежащий по нормали
+        corners = np.where(normals[None, :, :] >= 0, maxs[:, None, :], mins[:, None, :])
+        distances = np.einsum("npk,pk->np", corners, normals) + self.planes[:, 3]
+        return (distances >= 0).all(axis=1)
+
+
+def boxes_within_distance(mins, maxs, point, distance):
+    """Маска AABB, ближайшая точка которых не дальше distance от point"""
+    closest = np.clip(point, mins, maxs)
+    return ((closest - point) ** 2).sum(axis=1) <= distance * distance
+
+
+class CullingStats:
+    """Сколько чанков нарисовано и сколько отброшено в последнем кадре"""
+
+    def __init__(self):
+        self.drawn = 0
+        self.culled_distance = 0
+        self.culled_frustum = 0
+        self.culled_occlusion = 0
+
+    @property
+    def culled(self):
+        return self.culled_distance + self.culled_frustum + self.culled_occlusion
+
+
+def cull_chunks(keys, chunk_size, frustum=None, camera_position=None, max_distance=None, stats=None):
+    """Оставить только чанки в пределах дистанции отрисовки и в пирамиде видимости"""
+    if not keys:
+        return []
+    mins = np.array(keys, dtype=np.float64) * chunk_size
+    maxs = mins + chunk_size
+    visible = np.ones(len(keys), dtype=bool)
+
+    if camera_position is not None and max_distance is not None:
+        visible &= boxes_within_distance(mins, maxs, np.asarray(camera_position, dtype=np.float64), max_distance)
+    in_range = int(visible.sum())
+
+    if frustum is not None:
+        visible[visible] = frustum.boxes_visible(mins[visible], maxs[visible])
+
+    if stats is not None:
+        stats.drawn = int(visible.sum())
+        stats.culled_distance = len(keys) - in_range
+        stats.culled_frustum = in_range - stats.drawn
+    return [key for key, shown in zip(keys, visible) if shown]
+
+
+# Граф видимости чанков: для каждого чанка известно, какие пары его сторон
+# соединены через прозрачные блоки. Поиск в ширину от чанка камеры проходит
+# только через такие пары и только в направлениях от камеры - чанки, до которых
+# он не дошел (пещеры под землей, замкнутые полости), не рисуются.
+
+# Стороны чанка: -x, +x, -y, +y, -z, +z (противоположная сторона - side ^ 1)
+SIDES = ((-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0), (0, 0, -1), (0, 0, 1))
+# Маска связности: бит i * 6 + j - из стороны i видно сторону j
+ALL_CONNECTED = (1 << 36) - 1
+
+
+def chunk_connectivity(transparent):
+    """Маска пар сторон чанка, соединенных через прозрачные блоки (transparent - маска блоков)"""
+    if transparent.all():
+        return ALL_CONNECTED
+    if not transparent.any():
+        return 0
+
+    # Разметка связных областей: каждая прозрачная клетка берет наименьшую метку соседей
+    blocked = np.iinfo(np.int32).max
+    labels = np.where(transparent, np.arange(transparent.size, dtype=np.int32).reshape(transparent.shape), blocked)
+    while True:
+        spread = labels.copy()
+        for axis in range(3):
+            lower = [slice(None)] * 3
+            upper = [slice(None)] * 3
+            lower[axis], upper[axis] = slice(None, -1), slice(1, None)
+            lower, upper = tuple(lower), tuple(upper)
+            np.minimum(spread[lower], labels[upper], out=spread[lower])
+            np.minimum(spread[upper], labels[lower], out=spread[upper])
+        spread[~transparent] = blocked
+        if (spread == labels).all():
+            break
+        labels = spread
+
+    # Метки областей на каждой стороне чанка
+    side_labels = []
+    for side, direction in enumerate(SIDES):
+        axis = side // 2
+        index = [slice(None)] * 3
+        index[axis] = -1 if direction[axis] > 0 else 0
+        face = labels[tuple(index)]
+        side_labels.append(np.unique(face[face != blocked]))
+
+    mask = 0
+    for i in range(6):
+        for j in range(6):
+            if len(side_labels[i]) and len(side_labels[j]) and \
+                    (i == j or len(np.intersect1d(side_labels[i], side_labels[j], assume_unique=True))):
+                mask |= 1 << (i * 6 + j)
+    return mask
+
+
+def reachable_chunks(start, connectivity, allowed):
+    """Чанки, которые может быть видно из чанка start.
+
+    connectivity - маски связности по ключам чанков (нет ключа - чанк
+    считается полностью проницаемым), allowed - множество чанков, по которым
+    можно идти (загруженные и в пределах дальности).
+    """
+    visited = {start}
+    # Чанк, сторона, через которую в него вошли, и уже пройденные направления
+    queue = deque([(start, -1, 0)])
+    while queue:
+        key, entry, directions = queue.popleft()
+        mask = connectivity.get(key, ALL_CONNECTED)
+        x, y, z = key
+        for side, (dx, dy, dz) in enumerate(SIDES):
+            # Назад к камере не возвращаемся: из пройденных направлений видно только дальше
+            if directions >> (side ^ 1) & 1:
+                continue
+            if entry >= 0 and not mask >> (entry * 6 + side) & 1:
+                continue
+            neighbour = (x + dx, y + dy, z + dz)
+            if neighbour in visited or neighbour not in allowed:
+                continue
+            visited.add(neighbour)
+            queue.append((neighbour, side ^ 1, directions | 1 << side))
+    return visited
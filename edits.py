@@ -0,0 +1,53 @@
+# Массовое редактирование мира (см. World.fill_box, replace_box, paste, apply_edits):
+# изменения собираются по чанкам и применяются срезами массивов, каждый
+# затронутый чанк отмечается для перестройки один раз.
+
+
+class ChangeSet:
+    """Изменившиеся блоки одной операции, по чанкам.
+
+    changes: ключ чанка -> (плоские индексы в чанке uint16, прежние типы, новые типы).
+    Записываются только блоки, которые действительно изменились, поэтому
+    отмена (World.revert) возвращает мир точно в прежнее состояние.
+    """
+
+    def __init__(self, changes=None):
+        self.changes = {} if changes is None else changes
+
+    def __len__(self):
+        return sum(len(indices) for indices, _, _ in self.changes.values())
+
+    def __bool__(self):
+        return bool(self.changes)
+
+    @property
+    def chunks(self):
+        return list(self.changes)
+
+    @property
+    def nbytes(self):
+        return sum(indices.nbytes + old.nbytes + new.nbytes for indices, old, new in self.changes.values())
+
+    def inverted(self):
+        """Набор изменений, отменяющий этот"""
+        return ChangeSet({key: (indices, new, old) for key, (indices, old, new) in self.changes.items()})
+
+
+def box_slices(start, end, chunk_size):
+    """Чанки, пересекающие блок [start, end), с частью блока (срез) и частью чанка (срез).
+
+    start и end - мировые координаты (x, y, z), end не включается, как в срезах.
+    """
+    first = [s // chunk_size for s in start]
+    last = [(e - 1) // chunk_size for e in end]
+    for cx in range(first[0], last[0] + 1):
+        for cy in range(first[1], last[1] + 1):
+            for cz in range(first[2], last[2] + 1):
+                key = (cx, cy, cz)
+                area, local = [], []
+                for axis, c in enumerate(key):
+                    lo = max(start[axis], c * chunk_size)
+                    hi = min(end[axis], (c + 1) * chunk_size)
+                    area.append(slice(lo - start[axis], hi - start[axis]))
+                    local.append(slice(lo - c * chunk_size, hi - c * chunk_size))
+                yield key, tuple(area), tuple(local)
@@ -0,0 +1,233 @@
+from collections import OrderedDict
+import ctypes
+from OpenGL.GL import *
+import numpy as np
+import pygame
+from profiler import startup
+
+# Вершина текста: x, y, u, v, r, g, b, a
+TEXT_VERTEX_SIZE = 8
+TEXT_VERTEX_STRIDE = TEXT_VERTEX_SIZE * 4
+
+
+class GlyphAtlas:
+    """Символы шрифта в одной текстуре; новый символ растеризуется один раз.
+
+    Символы раскладываются по строкам (полкам). Когда место кончается, атлас
+    очищается и заполняется заново теми символами, которые понадобятся дальше.
+    """
+
+    def __init__(self, font, size=512):
+        self.font = font
+        self.size = size
+        self.texture_id = None
+        # Символ -> (u0, v0, u1, v1, ширина, высота)
+        self.glyphs = {}
+        self.generation = 0  # Растет при каждой очистке атласа
+        self._reset_packing()
+
+    def _reset_packing(self):
+        self.glyphs.clear()
+        self.cursor_x, self.cursor_y, self.row_height = 1, 1, 0
+
+    def _ensure_texture(self):
+        if self.texture_id is None:
+            self.texture_id = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, self.texture_id)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.size, self.size, 0, GL_RGBA, GL_UNSIGNED_BYTE,
+                         bytes(self.size * self.size * 4))
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+
+    def glyph(self, char):
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            glyph = self._add(char)
+        return glyph
+
+    def _add(self, char):
+        surface = self.font.render(char, True, (255, 255, 255))
+        width, height = surface.get_size()
+        if self.cursor_x + width + 1 > self.size:
+            # Переходим на следующую полку
+            self.cursor_x, self.cursor_y = 1, self.cursor_y + self.row_height + 1
+            self.row_height = 0
+        if self.cursor_y + height + 1 > self.size:
+            self._reset_packing()
+            self.generation += 1
+
+        # Строки текстуры идут сверху вниз, как в поверхности pygame
+        self._ensure_texture()
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, self.cursor_x, self.cursor_y, width, height,
+                        GL_RGBA, GL_UNSIGNED_BYTE, pygame.image.tostring(surface, "RGBA"))
+        x, y = self.cursor_x, self.cursor_y
+        glyph = (x / self.size, y / self.size, (x + width) / self.size, (y + height) / self.size, width, height)
+        self.glyphs[char] = glyph
+        self.cursor_x += width + 1
+        self.row_height = max(self.row_height, height)
+        return glyph
+
+    def delete(self):
+        if self.texture_id is not None:
+            glDeleteTextures(1, [self.texture_id])
+            self.texture_id = None
+        self._reset_packing()
+
+
+class HUD:
+    """Двумерный интерфейс поверх сцены, рисуется одним проходом за кадр.
+
+    Элементы добавляются методами text и lines в течение кадра, draw рисует
+    их все с одной настройкой ортографической проекции. Раскладка строк
+    кэшируется (LRU), поэтому неизменный текст не пересчитывается.
+    """
+
+    def __init__(self, width, height, font_name="Arial", font_size=18, max_cached_strings=64):
+        self.width = width
+        self.height = height
+        self.font_name = font_name
+        self.font_size = font_size
+        self.max_cached_strings = max_cached_strings
+        self.font = None
+        self.font_future = None
+        self.atlas = None
+        # Текст -> (вершины без цвета относительно левого нижнего угла, ширина, высота)
+        self.layouts = OrderedDict()
+        self.layout_generation = 0
+        self.text_items = []
+        self.line_items = []
+
+    def load_font(self, executor):
+        """Начать поиск системного шрифта в фоне (executor - пул потоков); до его конца текст не рисуется"""
+        self.font_future = executor.submit(startup.timed, "font", pygame.font.SysFont, self.font_name, self.font_size)
+
+    def _ensure_font(self):
+        """Готов ли шрифт; без load_font он ищется при первом тексте"""
+        # Поиск системного шрифта медленный, поэтому откладываем его до первого текста
+        if self.font is None:
+            if self.font_future is None:
+                self.font = pygame.font.SysFont(self.font_name, self.font_size)
+            elif self.font_future.done():
+                self.font = self.font_future.result()
+            else:
+                return False
+            self.atlas = GlyphAtlas(self.font)
+        return True
+
+    def _layout(self, text):
+        """Вершины строки (x, y, u, v) и ее размер; пересчитываются только для новых строк"""
+        if self.atlas.generation != self.layout_generation:
+            # Атлас был очищен - старые текстурные координаты недействительны
+            self.layouts.clear()
+            self.layout_generation = self.atlas.generation
+        layout = self.layouts.get(text)
+        if layout is not None:
+            self.layouts.move_to_end(text)
+            return layout
+
+        glyphs = [self.atlas.glyph(char) for char in text]
+        if self.atlas.generation != self.layout_generation:
+            # Атлас очистился на середине строки - собираем ее заново в новом атласе
+            self.layouts.clear()
+            self.layout_generation = self.atlas.generation
+            glyphs = [self.atlas.glyph(char) for char in text]
+
+        height = max((glyph[5] for glyph in glyphs), default=0)
+        vertices = np.zeros((len(glyphs) * 4, 4), dtype=np.float32)
+        x = 0
+        for i, (u0, v0, u1, v1, w, h) in enumerate(glyphs):
+            # Верх символа (v0) сверху квадрата
+            vertices[i * 4:i * 4 + 4] = ((x, 0, u0, v1), (x + w, 0, u1, v1),
+                                         (x + w, h, u1, v0), (x, h, u0, v0))
+            x += w
+        layout = (vertices, x, height)
+        self.layouts[text] = layout
+        while len(self.layouts) > self.max_cached_strings:
+            self.layouts.popitem(last=False)
+        return layout
+
+    def text(self, text, x, y, color=(1.0, 1.0, 1.0, 1.0), align="left", valign="bottom"):
+        """Добавить строку; (x, y) - угол, заданный align/valign, от левого нижнего угла экрана"""
+        if not self._ensure_font():
+            return
+        vertices, width, height = self._layout(text)
+        if align == "right":
+            x -= width
+        elif align == "center":
+            x -= width / 2
+        if valign == "top":
+            y -= height
+        self.text_items.append((vertices, int(x), int(y), color))
+
+    def lines(self, points, color=(1.0, 1.0, 1.0)):
+        """Добавить отрезки (пары точек подряд, как в GL_LINES)"""
+        self.line_items.append((points, color))
+
+    def draw(self):
+        """Нарисовать все добавленные за кадр элементы и очистить очередь"""
+        glDisable(GL_DEPTH_TEST)
+
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(0, self.width, 0, self.height, -1, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+
+        for points, color in self.line_items:
+            glColor3f(*color)
+            glBegin(GL_LINES)
+            for point in points:
+                glVertex2f(*point)
+            glEnd()
+
+        if self.text_items:
+            self._draw_text()
+
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
+
+        glEnable(GL_DEPTH_TEST)
+        self.text_items.clear()
+        self.line_items.clear()
+
+    def _draw_text(self):
+        # Весь текст кадра - один массив вершин и один вызов отрисовки
+        batch = np.empty((sum(len(v) for v, _, _, _ in self.text_items), TEXT_VERTEX_SIZE), dtype=np.float32)
+        start = 0
+        for vertices, x, y, color in self.text_items:
+            end = start + len(vertices)
+            batch[start:end, :4] = vertices
+            batch[start:end, 0] += x
+            batch[start:end, 1] += y
+            batch[start:end, 4:] = color
+            start = end
+
+        glEnable(GL_TEXTURE_2D)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glBindTexture(GL_TEXTURE_2D, self.atlas.texture_id)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        base = batch.ctypes.data
+        glVertexPointer(2, GL_FLOAT, TEXT_VERTEX_STRIDE, ctypes.c_void_p(base))
+        glTexCoordPointer(2, GL_FLOAT, TEXT_VERTEX_STRIDE, ctypes.c_void_p(base + 8))
+        glColorPointer(4, GL_FLOAT, TEXT_VERTEX_STRIDE, ctypes.c_void_p(base + 16))
+        glDrawArrays(GL_QUADS, 0, len(batch))
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisable(GL_BLEND)
+        glDisable(GL_TEXTURE_2D)
+        # После массива цветов текущий цвет не определен
+        glColor4f(1.0, 1.0, 1.0, 1.0)
+
+    def delete(self):
+        if self.atlas is not None:
+            self.atlas.delete()
+        self.layouts.clear()
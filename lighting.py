@@ -0,0 +1,277 @@
+from collections import deque
+import numpy as np
+from blocks import registry
+
+# Освещение вокселей: у каждого блока уровень небесного света (sky) и света от
+# светящихся блоков (block), оба 0..15, хранятся в одном байте: sky << 4 | block.
+# Свет теряет единицу на каждом шаге; небесный свет 15 идет вниз без потерь.
+#
+# Новая колонна чанков освещается векторно (волна по всем блокам сразу, по уровню
+# за итерацию), изменения отдельных блоков - очередями BFS только в затронутой области.
+
+MAX_LIGHT = 15
+FULL_SKY = MAX_LIGHT << 4
+
+# Тип блока -> непрозрачен ли он и сколько света излучает (таблицы реестра блоков)
+OPAQUE = registry.opaque
+EMISSION = registry.emission
+
+
+def sky_sources(opaque):
+    """Небесный свет 15 во всех блоках, над которыми до верха мира нет непрозрачных (ось 1 - высота)"""
+    covered = np.logical_or.accumulate(opaque[:, ::-1, :], axis=1)[:, ::-1, :]
+    return np.where(covered, 0, MAX_LIGHT).astype(np.uint8)
+
+
+def propagate(light, opaque, sources):
+    """Распространить свет по прозрачным блокам до устойчивого состояния.
+
+    light - уже известные уровни (не меньше которых будет результат), sources -
+    источники; непрозрачные блоки сохраняют только свой собственный свет.
+    """
+    light = np.maximum(light, sources)
+    light[opaque] = sources[opaque]
+    transparent = ~opaque
+    for _ in range(MAX_LIGHT):
+        dimmed = light - (light > 0)
+        spread = dimmed.copy()
+        spread[1:] = np.maximum(spread[1:], dimmed[:-1])
+        spread[:-1] = np.maximum(spread[:-1], dimmed[1:])
+        spread[:, 1:] = np.maximum(spread[:, 1:], dimmed[:, :-1])
+        spread[:, :-1] = np.maximum(spread[:, :-1], dimmed[:, 1:])
+        spread[:, :, 1:] = np.maximum(spread[:, :, 1:], dimmed[:, :, :-1])
+        spread[:, :, :-1] = np.maximum(spread[:, :, :-1], dimmed[:, :, 1:])
+        updated = transparent & (spread > light)
+        if not updated.any():
+            break
+        light[updated] = spread[updated]
+    return light
+
+
+class LightEngine:
+    """Хранит свет в чанках мира (chunk.light) и обновляет его при загрузке и изменениях"""
+
+    def __init__(self, world):
+        self.world = world
+        size = world.chunk_size
+        # Общие неизменяемые массивы для чанков целиком под открытым небом и целиком в темноте
+        self.full_sky = np.full((size, size, size), FULL_SKY, dtype=np.uint8)
+        self.full_sky.flags.writeable = False
+        self.dark = np.zeros((size, size, size), dtype=np.uint8)
+        self.dark.flags.writeable = False
+        # Колонны чанков (cx, cz), свет в которых посчитан
+        self.lit_columns = set()
+
+    def column_loaded(self, cx, cz):
+        chunks = self.world.chunks
+        return all((cx, cy, cz) in chunks for cy in range(self.world.height_chunks))
+
+    def can_light(self, cx, cz):
+        """Колонну можно осветить, когда загружены она и восемь соседних"""
+        return all(self.column_loaded(cx + dx, cz + dz) for dx in (-1, 0, 1) for dz in (-1, 0, 1))
+
+    def is_lit_around(self, cx, cz):
+        """Посчитан ли свет в колонне и у всех соседей (нужно для построения геометрии)"""
+        return all((cx + dx, cz + dz) in self.lit_columns for dx in (-1, 0, 1) for dz in (-1, 0, 1))
+
+    def light_column(self, cx, cz):
+        """Посчитать свет новой колонны; свет, пришедший из нее к соседям, тоже обновляется.
+
+        Считается область из 3x3 колонн: свет из центральной колонны не уходит
+        дальше 15 блоков, то есть не выходит за соседние колонны.
+        """
+        size = self.world.chunk_size
+        x0, z0 = (cx - 1) * size, (cz - 1) * size
+        blocks, opaque, light = self._gather(x0, z0, 3 * size, 3 * size)
+        sky = propagate(light >> 4, opaque, sky_sources(opaque))
+        block = light & MAX_LIGHT
+        emission = EMISSION[blocks]
+        if emission.any() or block.any():
+            block = propagate(block, opaque, emission)
+        self.lit_columns.add((cx, cz))
+        self._scatter(x0, z0, (sky << 4) | block)
+
+    def update_block(self, x, y, z, old_type, new_type):
+        """Обновить свет после замены блока (x, y, z) с old_type на new_type"""
+        world = self.world
+        size = world.chunk_size
+        if (x // size, z // size) not in self.lit_columns:
+            return
+        if OPAQUE[old_type] == OPAQUE[new_type] and EMISSION[old_type] == EMISSION[new_type]:
+            return
+        # Изменение света не уходит дальше 15 блоков по горизонтали (по вертикали - вся высота)
+        radius = MAX_LIGHT + 2
+        x0, z0 = x - radius, z - radius
+        width = 2 * radius + 1
+        blocks, opaque, light = self._gather(x0, z0, width, width)
+        dims = (width, world.size_y, width)
+        flat_opaque = opaque.tobytes()
+        start = (radius, y, radius)
+
+        sky = bytearray((light >> 4).tobytes())
+        sky_source = 0
+        if not OPAQUE[new_type] and (y == world.size_y - 1 or sky[_index(dims, (radius, y + 1, radius))] == MAX_LIGHT):
+            sky_source = MAX_LIGHT
+        _update_channel(sky, flat_opaque, dims, start, sky_source, True)
+
+        block = bytearray((light & MAX_LIGHT).tobytes())
+        _update_channel(block, flat_opaque, dims, start, int(EMISSION[new_type]), False)
+
+        sky = np.frombuffer(bytes(sky), dtype=np.uint8).reshape(dims)
+        block = np.frombuffer(bytes(block), dtype=np.uint8).reshape(dims)
+        self._scatter(x0, z0, (sky << 4) | block)
+
+    def relight_box(self, x0, z0, x1, z1):
+        """Пересчитать свет после изменения многих блоков в колоннах [x0, x1) x [z0, z1).
+
+        Изменение не влияет на свет дальше MAX_LIGHT блоков по горизонтали,
+        поэтому область с таким запасом считается заново векторно, а свет на
+        ее внешней рамке остается прежним и служит границей.
+        """
+        margin = MAX_LIGHT + 1
+        x0, z0 = x0 - margin, z0 - margin
+        blocks, opaque, light = self._gather(x0, z0, x1 - x0 + margin, z1 - z0 + margin)
+        border = np.ones(opaque.shape, dtype=bool)
+        border[1:-1, :, 1:-1] = False
+        light = np.where(border, light, 0)
+        sky = propagate(light >> 4, opaque, sky_sources(opaque))
+        block = propagate(light & MAX_LIGHT, opaque, EMISSION[blocks])
+        self._scatter(x0 + 1, z0 + 1, ((sky << 4) | block)[1:-1, :, 1:-1])
+
+    def forget_column(self, cx, cz):
+        """Колонна выгружается - ее свет придется считать заново после загрузки"""
+        self.lit_columns.discard((cx, cz))
+
+    def _gather(self, x0, z0, size_x, size_z):
+        """Блоки, непрозрачность и свет области мира (вся высота); незагруженное - непрозрачно и темно"""
+        world = self.world
+        size = world.chunk_size
+        shape = (size_x, world.size_y, size_z)
+        blocks = np.zeros(shape, dtype=np.uint8)
+        opaque = np.ones(shape, dtype=bool)
+        light = np.zeros(shape, dtype=np.uint8)
+        for key, area, local in self._chunk_slices(x0, z0, size_x, size_z):
+            chunk = world.chunks.get(key)
+            if chunk is None:
+                continue
+            chunk_blocks = chunk.blocks[local]
+            blocks[area] = chunk_blocks
+            opaque[area] = OPAQUE[chunk_blocks]
+            if chunk.light is not None:
+                light[area] = chunk.light[local]
+        return blocks, opaque, light
+
+    def _scatter(self, x0, z0, light):
+        """Записать свет области в освещенные чанки и отметить те, где он изменился"""
+        world = self.world
+        size_x, _, size_z = light.shape
+        for key, area, local in self._chunk_slices(x0, z0, size_x, size_z):
+            chunk = world.chunks.get(key)
+            if chunk is None or (key[0], key[2]) not in self.lit_columns:
+                continue
+            new = light[area]
+            if chunk.light is None:
+                old = self.dark
+                chunk_light = np.zeros_like(self.dark)
+            else:
+                old = chunk.light
+                chunk_light = chunk.light.copy()
+            changed = np.zeros(old.shape, dtype=bool)
+            changed[local] = old[local] != new
+            if not changed.any() and chunk.light is not None:
+                continue
+            chunk_light[local] = new
+            # Однородный свет хранится общими массивами
+            if (chunk_light == FULL_SKY).all():
+                chunk_light = self.full_sky
+            elif not chunk_light.any():
+                chunk_light = self.dark
+            chunk.light = chunk_light
+            world.mark_region_dirty(key, changed)
+
+    def _chunk_slices(self, x0, z0, size_x, size_z):
+        """Чанки, пересекающие область, с ее частью (срез области) и частью чанка (срез чанка)"""
+        size = self.world.chunk_size
+        for cx in range(x0 // size, (x0 + size_x - 1) // size + 1):
+            lx0, lx1 = max(x0, cx * size), min(x0 + size_x, (cx + 1) * size)
+            for cz in range(z0 // size, (z0 + size_z - 1) // size + 1):
+                lz0, lz1 = max(z0, cz * size), min(z0 + size_z, (cz + 1) * size)
+                for cy in range(self.world.height_chunks):
+                    area = (slice(lx0 - x0, lx1 - x0), slice(cy * size, (cy + 1) * size), slice(lz0 - z0, lz1 - z0))
+                    local = (slice(lx0 - cx * size, lx1 - cx * size), slice(0, size),
+                             slice(lz0 - cz * size, lz1 - cz * size))
+                    yield (cx, cy, cz), area, local
+
+    def nbytes(self, chunk):
+        """Память под свет чанка (общие массивы не считаются)"""
+        if chunk.light is None or chunk.light is self.full_sky or chunk.light is self.dark:
+            return 0
+        return chunk.light.nbytes
+
+
+def _index(dims, position):
+    x, y, z = position
+    return (x * dims[1] + y) * dims[2] + z
+
+
+def _update_channel(light, opaque, dims, start, source, sky):
+    """Обновить один канал света (bytearray по области dims) после изменения блока start.
+
+    Сначала убирается свет, который зависел от старого блока, затем от границы
+    убранной области и от нового источника свет распространяется заново.
+    """
+    size_x, size_y, size_z = dims
+    step_x, step_y = size_y * size_z, size_z
+
+    def neighbours(i):
+        x, rest = divmod(i, step_x)
+        y, z = divmod(rest, step_y)
+        if x > 0:
+            yield i - step_x, False
+        if x < size_x - 1:
+            yield i + step_x, False
+        if y > 0:
+            yield i - step_y, True  # Вниз
+        if y < size_y - 1:
+            yield i + step_y, False
+        if z > 0:
+            yield i - 1, False
+        if z < size_z - 1:
+            yield i + 1, False
+
+    origin = _index(dims, start)
+    removed = deque()
+    refill = deque()
+    old = light[origin]
+    if old:
+        light[origin] = 0
+        removed.append((origin, old))
+    while removed:
+        i, level = removed.popleft()
+        for j, down in neighbours(i):
+            current = light[j]
+            if current and (current < level or (sky and down and level == MAX_LIGHT)):
+                light[j] = 0
+                removed.append((j, current))
+            elif current >= level:
+                refill.append(j)
+
+    if source > light[origin]:
+        light[origin] = source
+        refill.append(origin)
+    if not opaque[origin]:
+        # Свет соседей может теперь пройти через освободившийся блок
+        refill.extend(j for j, _ in neighbours(origin))
+
+    while refill:
+        i = refill.popleft()
+        level = light[i]
+        if level <= 1:
+            continue
+        for j, down in neighbours(i):
+            if opaque[j]:
+                continue
+            new = level if (sky and down and level == MAX_LIGHT) else level - 1
+            if light[j] < new:
+                light[j] = new
+                refill.append(j)
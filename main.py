@@ -1,40 +1,107 @@
+# Первым, чтобы замер запуска включал импорт остальных модулей
+from profiler import profiler, startup, startup_regressions
 from OpenGL.GL import *
 from OpenGL.GLU import *
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import math
+import os
+import sys
 import pygame
+from controls import PygameInput, ScriptedInput, load_script
 from player import Player
+from blocks import registry
+from client import WorldClient
+from picking import BlockPicker
+from hud import HUD
+from textures import TextureAtlas
+from server import LocalServer
 from world import World
+from culling import Frustum, perspective_matrix
+from timestep import FixedTimestep
 import settings
 import time
 
+startup.mark("imports")
+
 class Game:
-    def __init__(self):
-        # Инициализация Pygame и OpenGL
-        pygame.init()
-        pygame.display.set_caption("Pyvoxels Engine Alpha 0.0.2")
-        self.screen = pygame.display.set_mode(
-            (settings.WINDOW_WIDTH, settings.WINDOW_HEIGHT), 
-            pygame.OPENGL | pygame.DOUBLEBUF
-        )
+    def __init__(self, headless=False, script=None, server=None):
+        """headless - без окна и OpenGL (мир рисуется в NullRenderer),
+        script - сценарий ввода для ScriptedInput вместо клавиатуры и мыши,
+        server - адрес сервера мира (server.py); без него мир свой, локальный"""
+        self.headless = headless
+        if headless:
+            # Без дисплея SDL нужен фиктивный видеодрайвер для событий pygame
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
         
-        # Настройка OpenGL
-        self.setup_opengl()
+        # Инициализация Pygame и OpenGL
+        with startup.phase("pygame_init"):
+            pygame.init()
+        # Чтение текстур и поиск шрифта не требуют OpenGL - идут в фоне, пока создается окно
+        loader = ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup")
+        atlas = loader.submit(startup.timed, "textures", TextureAtlas.load, "textures")
+        self.hud = HUD(settings.WINDOW_WIDTH, settings.WINDOW_HEIGHT)
+        if not headless:
+            self.hud.load_font(loader)
+        aspect = settings.WINDOW_WIDTH / settings.WINDOW_HEIGHT
+        # Дальняя плоскость - за самым дальним углом чанка в пределах RENDER_DISTANCE
+        self.far_plane = settings.RENDER_DISTANCE * settings.CHUNK_SIZE + settings.FAR_PLANE_MARGIN
+        # Проекция в NumPy - для отсечения чанков по пирамиде видимости
+        self.projection_matrix = perspective_matrix(settings.FOV, aspect, settings.NEAR_PLANE, self.far_plane)
+        if not headless:
+            with startup.phase("window"):
+                pygame.display.set_caption("Pyvoxels Engine Alpha 0.0.2")
+                self.screen = pygame.display.set_mode(
+                    (settings.WINDOW_WIDTH, settings.WINDOW_HEIGHT), 
+                    pygame.OPENGL | pygame.DOUBLEBUF
+                )
+                
+                # Настройка OpenGL
+                self.setup_opengl()
+        self.input = ScriptedInput(script) if script is not None else PygameInput()
         
         # Создаём игрока и мир
+        # Чанки генерируются потом, по кадрам: до их готовности игра на экране загрузки
         self.player = Player()
-        self.world = World(10 * settings.WORLD_SIZE, 15, 10 * settings.WORLD_SIZE)
+        with startup.phase("world"):
+            self.world = World(backend="null" if headless else None, atlas=atlas.result(), remote=server is not None)
+            self.client = None
+            if server is not None:
+                # Мир - копия серверного: чанки и правки приходят по сети, правки игрока уходят на сервер
+                with startup.phase("connect"):
+                    self.client = WorldClient(server, self.world)
+                self.player.spawn_point = self.client.spawn_point
+            else:
+                self.player.spawn_point = self.world.spawn_point(5 * settings.WORLD_SIZE, 5 * settings.WORLD_SIZE)
+            self.player.reset_position()
+        # Куда уходят правки блоков игрока
+        self.editor = self.client if self.client is not None else self.world
+        loader.shutdown(wait=False)
+        self.loading = True
+        self.loading_progress = 0.0
+        # Блок под прицелом считается один раз и общий для ввода и подсветки
+        self.picker = BlockPicker(self.world, self.player)
         
         # Настройка игры
         self.running = True
         self.clock = pygame.time.Clock()
-        self.fps_font = pygame.font.SysFont("Arial", 18)
-        self.fps_surface = None
+        self.timestep = FixedTimestep(settings.TICK_RATE, settings.MAX_TICKS_PER_FRAME)
+        self.frame = 0
+        profiler.reset(settings.PROFILER_FRAMES)
+        profiler.enabled = settings.PROFILER_ENABLED
+        self.profiler_lines = []
+        self.profiler_lines_time = 0.0
         self.last_time = time.time()
         self.frame_count = 0
         self.fps_display = 0
+        self.last_save_time = time.time()
         
         # Захват мыши
-        pygame.mouse.set_visible(False)
-        pygame.event.set_grab(True)
+        if not headless:
+            pygame.mouse.set_visible(False)
+            pygame.event.set_grab(True)
+        startup.mark("init")
     
     def setup_opengl(self):
         """Настройка OpenGL"""
@@ -42,71 +109,83 @@ class Game:
         glClearColor(0.4, 0.8, 1, 1)  # Голубой цвет фона (небо)
         
         # Настройка проекции
+        aspect = settings.WINDOW_WIDTH / settings.WINDOW_HEIGHT
         glMatrixMode(GL_PROJECTION)
-        gluPerspective(70, (settings.WINDOW_WIDTH / settings.WINDOW_HEIGHT), 0.1, 100)
+        gluPerspective(settings.FOV, aspect, settings.NEAR_PLANE, self.far_plane)
         glMatrixMode(GL_MODELVIEW)
-        
-        # Настройка освещения
-        glEnable(GL_LIGHTING)
-        glEnable(GL_LIGHT0)
-        glEnable(GL_COLOR_MATERIAL)
-        glLightfv(GL_LIGHT0, GL_POSITION, [10.0, 10.0, 10.0, 1.0])
-        glLightfv(GL_LIGHT0, GL_DIFFUSE, [1.0, 1.0, 1.0, 1.0])
-        glLightfv(GL_LIGHT0, GL_SPECULAR, [1.0, 1.0, 1.0, 1.0])
-        glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, [1.0, 1.0, 1.0, 1.0])
+        # Освещение не настраивается: свет запечен в цвета вершин чанков (lighting.py)
     
     def handle_events(self):
         """Обработка событий"""
-        for event in pygame.event.get():
+        for event in self.input.events():
             if event.type == pygame.QUIT:
                 self.running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.running = False
-                    pygame.mouse.set_visible(True)
-                    pygame.event.set_grab(False)
+                    if not self.headless:
+                        pygame.mouse.set_visible(True)
+                        pygame.event.set_grab(False)
+                elif event.key == pygame.K_F9 and profiler.enabled:
+                    count = profiler.export_chrome_trace(settings.PROFILER_TRACE_PATH)
+                    print(f"Трасса сохранена: {settings.PROFILER_TRACE_PATH} ({count} событий)")
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 # Левая кнопка мыши - разрушение блока
                 if event.button == 1:
-                    target_block, _ = self.player.raycast(self.world)
+                    target_block, _ = self.picker.pick()
                     if target_block:
                         # Выводим отладочную информацию
                         if settings.DEBUG_MODE:
                             print(f"Разрушаем блок: {target_block}")
-                        self.world.set_block(target_block[0], target_block[1], target_block[2], 0)  # 0 - воздух
+                        self.editor.set_block(target_block[0], target_block[1], target_block[2], 0)  # 0 - воздух
             
                 # Правая кнопка мыши - размещение блока
                 elif event.button == 3:
-                    target_block, place_pos = self.player.raycast(self.world)
+                    target_block, place_pos = self.picker.pick()
                     if target_block and place_pos:
                         # Выводим отладочную информацию
                         if settings.DEBUG_MODE:
                             print(f"Размещаем блок: {place_pos}, рядом с: {target_block}")
                         
-                        # Проверяем, что игрок не находится в этом блоке
-                        player_min_x = int(self.player.x - self.player.width/2)
-                        player_max_x = int(self.player.x + self.player.width/2)
-                        player_min_y = int(self.player.y)
-                        player_max_y = int(self.player.y + self.player.height)
-                        player_min_z = int(self.player.z - self.player.width/2)
-                        player_max_z = int(self.player.z + self.player.width/2)
-                        
-                        # Проверяем, не пересекается ли новый блок с игроком
-                        if not (player_min_x <= place_pos[0] <= player_max_x and
-                                player_min_y <= place_pos[1] <= player_max_y and
-                                player_min_z <= place_pos[2] <= player_max_z):
+                        # Проверяем, не пересекается ли новый блок с игроком: блок c занимает [c, c + 1),
+                        # а координаты бывают отрицательными - округляем вниз, а не к нулю
+                        box_min, box_max = self.player.bounding_box()
+                        if not all(math.floor(low) <= c < math.ceil(high)
+                                   for c, low, high in zip(place_pos, box_min, box_max)):
                             # Размещаем выбранный блок
-                            self.world.set_block(place_pos[0], place_pos[1], place_pos[2], self.player.selected_block)
+                            self.editor.set_block(place_pos[0], place_pos[1], place_pos[2], self.player.selected_block)
     
-    def update(self):
-        """Обновление игровой логики"""
-        # Работа с мышью
-        dx, dy = pygame.mouse.get_rel()
-        self.player.handle_mouse(dx, dy)
+    def tick(self):
+        """Один шаг симуляции длиной 1 / TICK_RATE секунды"""
+        self.player.begin_tick()
         
         # Работа с клавишами
-        keys = pygame.key.get_pressed()
+        keys = self.input.pressed_keys()
         self.player.handle_keys(keys, self.world)
+    
+    def update(self):
+        """Обновление раз в кадр: обзор мышью, подгрузка чанков, автосохранение"""
+        # Работа с мышью (поворот камеры не ждет тика, чтобы не было задержки)
+        dx, dy = self.input.mouse_motion()
+        self.player.handle_mouse(dx, dy)
+        
+        # Обмен с сервером: позиция и правки игрока туда, чанки и дельты оттуда
+        if self.client is not None:
+            self.client.update(self.player.position)
+            if not self.client.connected:
+                print("Соединение с сервером потеряно")
+                self.running = False
+        
+        # Подгрузка чанков вокруг игрока
+        if self.loading:
+            self.update_loading()
+        else:
+            self.world.update_streaming(self.player.position)
+        
+        # Автосохранение измененных чанков
+        if time.time() - self.last_save_time >= settings.AUTOSAVE_INTERVAL:
+            self.world.save()
+            self.last_save_time = time.time()
         
         # Обновление FPS счетчика
         self.frame_count += 1
@@ -116,46 +195,61 @@ class Game:
             self.frame_count = 0
             self.last_time = current_time
     
-    def render(self):
-        """Отрисовка сцены"""
+    def update_loading(self):
+        """Кадр экрана загрузки: подгрузка и мешинг с большим бюджетом, пока чанки вокруг игрока не готовы"""
+        budget = settings.LOADING_BUDGET_MS / 1000
+        self.world.update_streaming(self.player.position, budget)
+        self.world.update_meshes(budget)
+        self.loading_progress = self.world.loading_progress(self.player.position, settings.LOADING_RADIUS)
+        if self.loading_progress >= 1.0:
+            self.loading = False
+            startup.mark("world_ready")
+
+    def render(self, alpha=1.0):
+        """Отрисовка сцены (alpha - доля пройденного тика для интерполяции камеры)"""
+        if self.headless:
+            # Без OpenGL остаются мешинг и отсечение чанков
+            frustum = Frustum(self.projection_matrix, self.player.view_matrix(alpha))
+            self.world.draw(frustum, self.player.eye_position(alpha))
+            return
+        
         # Очистка буферов
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glLoadIdentity()
         
         # Обновление камеры
-        self.player.update_camera()
-        
-        # Обновление позиции света
-        light_position = [10.0, 10.0, 20.0 * settings.WORLD_SIZE, 1.0]
-        glLightfv(GL_LIGHT0, GL_POSITION, light_position)
+        self.player.update_camera(alpha)
         
-        # Отрисовка мира
-        self.world.draw()
+        # Отрисовка мира (только чанков, попадающих в поле зрения)
+        frustum = Frustum(self.projection_matrix, self.player.view_matrix(alpha))
+        self.world.draw(frustum, self.player.eye_position(alpha))
         
         # Отрисовка выделения блока, на который смотрит игрок
         if settings.DEBUG_MODE:
             self.draw_block_highlight()
         
-        # Отрисовка прицела
-        self.draw_crosshair()
-        
-        # Отображение FPS если включено
-        if settings.SHOW_FPS:
-            self.draw_fps()
-        
-        # Отображение информации о выбранном блоке
-        self.draw_selected_block_info()
+        # Интерфейс: прицел, FPS и выбранный блок рисуются одним проходом
+        with profiler.scope("hud"):
+            self.draw_crosshair()
+            if settings.SHOW_FPS:
+                self.draw_fps()
+            self.draw_selected_block_info()
+            if self.loading:
+                self.hud.text(f"Загрузка мира: {self.loading_progress:.0%}",
+                              settings.WINDOW_WIDTH // 2, settings.WINDOW_HEIGHT // 2 + 30, align="center")
+            if profiler.enabled:
+                self.draw_profiler()
+            self.hud.draw()
         
         # Обновление экрана
-        pygame.display.flip()
+        with profiler.scope("flip"):
+            pygame.display.flip()
 
     def draw_block_highlight(self):
         """Отрисовка выделения блока, на который смотрит игрок"""
-        target_block, place_pos = self.player.raycast(self.world)
+        target_block, place_pos = self.picker.pick()
         
         if target_block:
-            # Отключаем освещение для отрисовки контура
-            glDisable(GL_LIGHTING)
             glDisable(GL_TEXTURE_2D)
             
             # Рисуем контур выбранного блока
@@ -228,197 +322,135 @@ class Game:
             
             # Восстанавливаем состояние OpenGL
             glEnable(GL_TEXTURE_2D)
-            glEnable(GL_LIGHTING)
     
     def draw_crosshair(self):
-        """Отрисовка прицела в центре экрана"""
-        glDisable(GL_LIGHTING)
-        glDisable(GL_DEPTH_TEST)
-        
-        glMatrixMode(GL_PROJECTION)
-        glPushMatrix()
-        glLoadIdentity()
-        glOrtho(0, settings.WINDOW_WIDTH, 0, settings.WINDOW_HEIGHT, -1, 1)
-        
-        glMatrixMode(GL_MODELVIEW)
-        glPushMatrix()
-        glLoadIdentity()
-        
-        # Рисуем прицел
+        """Прицел в центре экрана"""
         center_x = settings.WINDOW_WIDTH // 2
         center_y = settings.WINDOW_HEIGHT // 2
         size = 10
-        
-        glColor3f(1.0, 1.0, 1.0)  # Белый цвет
-        glBegin(GL_LINES)
-        # Горизонтальная линия
-        glVertex2f(center_x - size, center_y)
-        glVertex2f(center_x + size, center_y)
-        # Вертикальная линия
-        glVertex2f(center_x, center_y - size)
-        glVertex2f(center_x, center_y + size)
-        glEnd()
-        
-        # Восстанавливаем матрицы
-        glMatrixMode(GL_PROJECTION)
-        glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
-        glPopMatrix()
-        
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
+        # Горизонтальная и вертикальная линии
+        self.hud.lines([(center_x - size, center_y), (center_x + size, center_y),
+                        (center_x, center_y - size), (center_x, center_y + size)])
     
     def draw_fps(self):
-        """Отображение счетчика FPS"""
-        # Отключаем 3D-рендеринг для отрисовки текста
-        glDisable(GL_LIGHTING)
-        glDisable(GL_DEPTH_TEST)
-        
-        # Переключаемся на ортографическую проекцию
-        glMatrixMode(GL_PROJECTION)
-        glPushMatrix()
-        glLoadIdentity()
-        glOrtho(0, settings.WINDOW_WIDTH, 0, settings.WINDOW_HEIGHT, -1, 1)  # Изменено: второй параметр 0, третий settings.WINDOW_HEIGHT
-        
-        glMatrixMode(GL_MODELVIEW)
-        glPushMatrix()
-        glLoadIdentity()
-        
-        # Создаем текстовую поверхность с FPS
-        if not hasattr(self, 'fps_font') or self.fps_font is None:
-            self.fps_font = pygame.font.SysFont("Arial", 18)
-        
+        """Счетчик FPS в левом нижнем углу"""
         fps_text = f"FPS: {self.fps_display}"
-        fps_surface = self.fps_font.render(fps_text, True, (255, 255, 255))
-        
-        # Преобразуем поверхность в текстуру OpenGL
-        fps_data = pygame.image.tostring(fps_surface, "RGBA", True)
-        fps_width, fps_height = fps_surface.get_size()
-        
-        # Создаем текстуру
-        texture_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texture_id)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, fps_width, fps_height, 0, GL_RGBA, GL_UNSIGNED_BYTE, fps_data)
-        
-        # Настраиваем параметры текстуры
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        
-        # Отрисовываем текстуру
-        glEnable(GL_TEXTURE_2D)
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        
-        glBegin(GL_QUADS)
-        glTexCoord2f(0, 0); glVertex2f(10, 10)
-        glTexCoord2f(1, 0); glVertex2f(10 + fps_width, 10)
-        glTexCoord2f(1, 1); glVertex2f(10 + fps_width, 10 + fps_height)
-        glTexCoord2f(0, 1); glVertex2f(10, 10 + fps_height)
-        glEnd()
-        
-        # Удаляем текстуру
-        glDeleteTextures(1, [texture_id])
-        
-        # Восстанавливаем состояние OpenGL
-        glDisable(GL_BLEND)
-        glDisable(GL_TEXTURE_2D)
-        
-        # Восстанавливаем матрицы
-        glMatrixMode(GL_PROJECTION)
-        glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
-        glPopMatrix()
-        
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
+        if settings.DEBUG_MODE:
+            stats = self.world.culling_stats
+            fps_text += (f" | чанки: {stats.drawn} (отсечено {stats.culled}: {stats.culled_distance} по дальности,"
+                         f" {stats.culled_frustum} вне обзора, {stats.culled_occlusion} закрыто)")
+            memory = self.world.memory_report()
+            fps_text += (f" | блоки: {memory['total_bytes'] // 1024} КБ из {memory['dense_bytes'] // 1024} КБ"
+                         f" (однородных {memory['uniform']['chunks']}, с палитрой {memory['palette']['chunks']},"
+                         f" несжатых {memory['dense']['chunks']})")
+            fps_text += f" | прицел: {self.picker.hits} из {self.picker.hits + self.picker.misses} без пересчета"
+            cache = self.world.mesh_cache
+            if cache is not None:
+                fps_text += f" | кэш мешей: {cache.hits} из {cache.hits + cache.misses}"
+            if self.timestep.dropped_time:
+                fps_text += f" | отброшено симуляции: {self.timestep.dropped_time:.2f} с"
+        self.hud.text(fps_text, 10, 10)
+    
+    def draw_profiler(self):
+        """Процентили времени кадра и фаз в левом верхнем углу"""
+        # Процентили пересчитываются два раза в секунду, а не каждый кадр
+        now = time.perf_counter()
+        if now - self.profiler_lines_time >= 0.5:
+            self.profiler_lines = profiler.report_lines()
+            self.profiler_lines_time = now
+        y = settings.WINDOW_HEIGHT - 10
+        for line in self.profiler_lines:
+            self.hud.text(line, 10, y, valign="top")
+            y -= 20
     
     def draw_selected_block_info(self):
-        """Отображение информации о выбранном блоке"""
-        # Отключаем 3D-рендеринг для отрисовки текста
-        glDisable(GL_LIGHTING)
-        glDisable(GL_DEPTH_TEST)
-        
-        # Переключаемся на ортографическую проекцию
-        glMatrixMode(GL_PROJECTION)
-        glPushMatrix()
-        glLoadIdentity()
-        glOrtho(0, settings.WINDOW_WIDTH, 0, settings.WINDOW_HEIGHT, -1, 1)
-        
-        glMatrixMode(GL_MODELVIEW)
-        glPushMatrix()
-        glLoadIdentity()
-        
-        # Создаем текстовую поверхность с информацией о блоке
-        if not hasattr(self, 'block_font') or self.block_font is None:
-            self.block_font = pygame.font.SysFont("Arial", 18)
-        
-        # Определяем название блока
-        block_names = {
-            0: "Воздух",
-            1: "Земля",
-            2: "Камень"
-        }
-        block_name = block_names.get(self.player.selected_block, f"Блок {self.player.selected_block}")
-        
+        """Информация о выбранном блоке в правом верхнем углу"""
+        block_name = registry.name(self.player.selected_block)
         block_text = f"Выбран: {block_name} [{self.player.selected_block}]"
-        block_surface = self.block_font.render(block_text, True, (255, 255, 255))
-        
-        # Преобразуем поверхность в текстуру OpenGL
-        block_data = pygame.image.tostring(block_surface, "RGBA", True)
-        block_width, block_height = block_surface.get_size()
-        
-        # Создаем текстуру
-        texture_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texture_id)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, block_width, block_height, 0, GL_RGBA, GL_UNSIGNED_BYTE, block_data)
-        
-        # Настраиваем параметры текстуры
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        
-        # Отрисовываем текстуру
-        glEnable(GL_TEXTURE_2D)
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        
-        # Размещаем текст в правом верхнем углу
-        x_pos = settings.WINDOW_WIDTH - block_width - 10
-        y_pos = settings.WINDOW_HEIGHT - block_height - 10
-        
-        glBegin(GL_QUADS)
-        glTexCoord2f(0, 0); glVertex2f(x_pos, y_pos)
-        glTexCoord2f(1, 0); glVertex2f(x_pos + block_width, y_pos)
-        glTexCoord2f(1, 1); glVertex2f(x_pos + block_width, y_pos + block_height)
-        glTexCoord2f(0, 1); glVertex2f(x_pos, y_pos + block_height)
-        glEnd()
-        
-        # Удаляем текстуру
-        glDeleteTextures(1, [texture_id])
-        
-        # Восстанавливаем состояние OpenGL
-        glDisable(GL_BLEND)
-        glDisable(GL_TEXTURE_2D)
-        
-        # Восстанавливаем матрицы
-        glMatrixMode(GL_PROJECTION)
-        glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
-        glPopMatrix()
-        
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
+        self.hud.text(block_text, settings.WINDOW_WIDTH - 10, settings.WINDOW_HEIGHT - 10, align="right", valign="top")
     
-    def run(self):
-        """Основной игровой цикл"""
-        while self.running:
-            self.handle_events()
-            self.update()
-            self.render()
-            self.clock.tick(settings.FPS)
-        
-        pygame.quit()
+    def run(self, frames=None, until_loaded=False):
+        """Основной игровой цикл (frames - остановиться после стольких кадров,
+        until_loaded - после конца загрузки мира)"""
+        # Мир закрывается (и сохраняется) и при прерывании цикла, например по Ctrl-C
+        try:
+            while self.running and (frames is None or self.frame < frames):
+                profiler.begin_frame()
+                # Во время загрузки игрок стоит на месте, а сценарий ввода еще не начинается
+                if not self.loading:
+                    self.input.next_frame()
+                with profiler.scope("events"):
+                    self.handle_events()
+                # Без окна время виртуальное: ровно один тик на кадр, без ожидания
+                now = self.frame * self.timestep.dt if self.headless else None
+                with profiler.scope("simulation"):
+                    if not self.loading:
+                        for _ in range(self.timestep.advance(now)):
+                            self.tick()
+                with profiler.scope("update"):
+                    self.update()
+                self.render(self.timestep.alpha)
+                if self.frame == 0:
+                    startup.mark("first_frame")
+                self.frame += 1
+                if frames is None and self.input.finished:
+                    break
+                if until_loaded and not self.loading:
+                    break
+                if not self.headless:
+                    self.clock.tick(settings.FPS)
+        finally:
+            if self.client is not None:
+                self.client.close()
+            self.world.close()
+            self.hud.delete()
+            pygame.quit()
 
 # Запуск игры
 if __name__ == "__main__":
-    game = Game()
-    game.run()
+    parser = argparse.ArgumentParser(description="Pyvoxels Engine")
+    parser.add_argument("--headless", action="store_true", help="без окна и OpenGL")
+    parser.add_argument("--script", help="JSON-сценарий ввода [[кадр, действие, аргумент], ...]")
+    parser.add_argument("--frames", type=int, help="остановиться после стольких кадров")
+    parser.add_argument("--profile", metavar="TRACE", help="включить профилировщик и сохранить трассу при выходе")
+    parser.add_argument("--connect", metavar="ADDRESS", help="играть в мире сервера (\"хост:порт\" или \"unix:/путь\")")
+    parser.add_argument("--local-server", action="store_true",
+                        help="запустить сервер мира в отдельном процессе и подключиться к нему")
+    parser.add_argument("--startup-benchmark", action="store_true",
+                        help="выйти после загрузки мира и вывести время фаз запуска")
+    parser.add_argument("--startup-baseline", metavar="JSON",
+                        help="базовый замер запуска: сравнить с ним (или записать, если файла нет)")
+    args = parser.parse_args()
+    if args.profile:
+        settings.PROFILER_ENABLED = True
+    script = load_script(args.script) if args.script else None
+    local_server = None
+    if args.local_server:
+        local_server = LocalServer(args.connect)
+        args.connect = local_server.address
+    try:
+        game = Game(headless=args.headless, script=script, server=args.connect)
+        game.run(args.frames, until_loaded=args.startup_benchmark)
+    finally:
+        if local_server is not None:
+            local_server.stop()
+    if game.client is not None:
+        print("\n".join(game.client.report_lines()))
+    if args.profile:
+        profiler.export_chrome_trace(args.profile)
+        print("\n".join(profiler.report_lines()))
+    if args.startup_benchmark:
+        print("\n".join(startup.report_lines()))
+        if args.startup_baseline:
+            report = startup.report()
+            if not os.path.exists(args.startup_baseline):
+                with open(args.startup_baseline, "w", encoding="utf-8") as f:
+                    json.dump(report, f, indent=1)
+                print(f"Базовый замер записан: {args.startup_baseline}")
+            else:
+                with open(args.startup_baseline, encoding="utf-8") as f:
+                    baseline = json.load(f)
+                regressions = startup_regressions(baseline, report, settings.STARTUP_REGRESSION_TOLERANCE)
+                if regressions:
+                    print("Запуск стал медленнее:\n" + "\n".join(regressions))
+                    sys.exit(1)
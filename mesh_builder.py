@@ -0,0 +1,100 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import settings
+from blocks import registry
+from culling import chunk_connectivity
+from mesher import build_chunk_mesh, build_lod_mesh, combine_faces
+
+
+def build_mesh_job(padded, origin, greedy, block_textures, light=None, ambient_occlusion=True, lod=0, tile_uvs=True):
+    """Задача для пула: построить ChunkMesh и маску связности сторон по снимку блоков и света чанка.
+
+    lod > 0 - упрощенная геометрия из сетки, уменьшенной в 2 ** lod раз (рамка снимков такой же толщины).
+    """
+    start = time.perf_counter()
+    if lod:
+        faces = build_lod_mesh(padded, block_textures, origin, 1 << lod, greedy, light, ambient_occlusion, tile_uvs)
+    else:
+        faces = build_chunk_mesh(padded, block_textures, origin, greedy, light, ambient_occlusion)
+    mesh = combine_faces(faces)
+    border = 1 << lod
+    connectivity = chunk_connectivity(registry.transparent[padded[border:-border, border:-border, border:-border]])
+    return mesh, connectivity, time.perf_counter() - start
+
+
+class MeshBuilder:
+    """Строит геометрию чанков в фоновом пуле и складывает готовые результаты в очередь.
+
+    Результат - кортеж (ключ чанка, версия чанка, ChunkMesh или None, маска связности сторон, время построения).
+    С кэшем (mesh_cache.MeshCache) уже строившиеся чанки берутся с диска без построения.
+    """
+
+    def __init__(self, workers=None, pool=None, cache=None):
+        workers = settings.MESH_WORKERS if workers is None else workers
+        pool = settings.MESH_POOL if pool is None else pool
+        if workers <= 0:
+            self.executor = None  # Строим прямо в вызывающем потоке
+        elif pool == "process":
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mesher")
+        self.results = queue.Queue()
+        self.cache = cache
+
+    def submit(self, key, version, padded, origin, greedy, block_textures, light=None, ambient_occlusion=True,
+               lod=0, tile_uvs=True):
+        """Поставить чанк в очередь на построение (padded и light должны быть копиями)"""
+        args = (padded, origin, greedy, block_textures, light, ambient_occlusion, lod, tile_uvs)
+        digest = None
+        if self.cache is not None:
+            digest = self.cache.key(*args)
+            cached = self.cache.get(digest)
+            if cached is not None:
+                mesh, connectivity = cached
+                self.results.put((key, version, mesh, connectivity, 0.0))
+                return
+
+        if self.executor is None:
+            mesh, connectivity, elapsed = build_mesh_job(*args)
+            self._store(digest, mesh, connectivity)
+            self.results.put((key, version, mesh, connectivity, elapsed))
+            return
+
+        future = self.executor.submit(build_mesh_job, *args)
+        future.add_done_callback(lambda f: self._on_done(key, version, digest, f))
+
+    def _store(self, digest, mesh, connectivity):
+        if digest is not None:
+            self.cache.put(digest, mesh, connectivity)
+
+    def _on_done(self, key, version, digest, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # Чанк останется со старой геометрией до следующего изменения
+            print(f"Ошибка построения чанка {key}: {error}")
+            return
+        mesh, connectivity, elapsed = future.result()
+        # Запись в кэш идет в потоке пула, а не в главном цикле
+        self._store(digest, mesh, connectivity)
+        self.results.put((key, version, mesh, connectivity, elapsed))
+
+    def drain(self, time_budget):
+        """Выдавать готовые результаты, пока не истечет time_budget секунд"""
+        deadline = time.perf_counter() + time_budget
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                return
+            yield result
+            if time.perf_counter() >= deadline:
+                return
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.cache is not None:
+            self.cache.save_index()
@@ -0,0 +1,177 @@
+from contextlib import suppress
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import settings
+from blocks import registry
+from mesher import MESH_VERSION, ChunkMesh
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: блокировки нет, процессам нужны разные MESH_CACHE_DIR
+    fcntl = None
+
+# Кэш построенной геометрии чанков на диске.
+# Ключ - хеш снимка блоков и света чанка (с рамкой из соседей) вместе с
+# параметрами мешера, версией построения геометрии и описаниями блоков:
+# неизмененный чанк после перезапуска не перестраивается, а любое изменение
+# блоков, света, соседей или мешера дает новый ключ.
+# Каждая запись - два файла .npy (вершины и индексы), читаются через mmap.
+# Индекс (размеры записей, маски связности и порядок использования) хранится
+# в index.json и записывается при сохранении мира.
+# Каталогом кэша пользуется один процесс: он держит блокировку файла lock,
+# второй процесс (еще одно окно игры) берет соседний каталог с номером.
+
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+LOCK_FILE = "lock"
+MAX_DIRECTORIES = 8
+
+
+class MeshCache:
+    """Геометрия чанков по хешу содержимого с вытеснением давно не использованных записей"""
+
+    def __init__(self, directory, max_bytes, lock_file=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock_file = lock_file
+        # Хеш -> (размер файлов в байтах, маска связности); порядок - от давно не использованных
+        self.entries = OrderedDict()
+        self.size = 0
+        # Чанки, геометрия которых взята из кэша и построена заново (для отладочной строки)
+        self.hits = 0
+        self.misses = 0
+        self.changed = False
+        # Записи добавляются из потоков мешера
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @classmethod
+    def open(cls, directory, max_bytes):
+        """Кэш в первом свободном каталоге: directory, directory-2, ... (None - все заняты)"""
+        for n in range(1, MAX_DIRECTORIES + 1):
+            path = directory if n == 1 else f"{directory}-{n}"
+            if fcntl is None:
+                return cls(path, max_bytes)
+            os.makedirs(path, exist_ok=True)
+            lock_file = open(os.path.join(path, LOCK_FILE), "w")
+            try:
+                # Блокировка снимается и при аварийном завершении процесса
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            return cls(path, max_bytes, lock_file)
+        return None
+
+    @staticmethod
+    def key(padded, origin, greedy, block_textures, light=None, ambient_occlusion=True, lod=0, tile_uvs=True):
+        """Хеш всего, от чего зависит геометрия (аргументы - как у mesh_builder.build_mesh_job)"""
+        digest = hashlib.blake2b(digest_size=16)
+        params = (MESH_VERSION, registry.fingerprint, settings.SUN_DIRECTION, tuple(origin), padded.shape,
+                  bool(greedy), bool(ambient_occlusion), lod, bool(tile_uvs), light is not None)
+        digest.update(repr(params).encode())
+        digest.update(block_textures.tobytes())
+        digest.update(np.ascontiguousarray(padded).data)
+        if light is not None:
+            digest.update(np.ascontiguousarray(light).data)
+        return digest.hexdigest()
+
+    def get(self, digest):
+        """(ChunkMesh, маска связности) из кэша или None"""
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(digest)
+            self.changed = True
+        try:
+            # Массивы остаются отображением файла - в GPU они загружаются без лишней копии
+            mesh = ChunkMesh(np.load(self._path(digest, "vertices"), mmap_mode="r"),
+                             np.load(self._path(digest, "indices"), mmap_mode="r"))
+        except (OSError, ValueError):
+            # Файлы удалены или повреждены - запись просто строится заново
+            with self.lock:
+                self._remove(digest)
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return mesh, entry[1]
+
+    def put(self, digest, mesh, connectivity):
+        """Сохранить геометрию чанка (пустая строится быстро и не кэшируется)"""
+        if mesh is None:
+            return
+        for name, array in (("vertices", mesh.vertices), ("indices", mesh.indices)):
+            # Запись через временный файл: прерванная запись не оставит битую геометрию
+            path = self._path(digest, name)
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path + ".tmp", path)
+        nbytes = mesh.vertices.nbytes + mesh.indices.nbytes
+        with self.lock:
+            if digest in self.entries:
+                self.size -= self.entries[digest][0]
+            self.entries[digest] = (nbytes, connectivity)
+            self.entries.move_to_end(digest)
+            self.size += nbytes
+            self.changed = True
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                self._remove(next(iter(self.entries)))
+
+    def save_index(self):
+        """Записать индекс на диск, если он изменился"""
+        with self.lock:
+            if not self.changed:
+                return
+            entries = [[digest, nbytes, connectivity] for digest, (nbytes, connectivity) in self.entries.items()]
+            self.changed = False
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "entries": entries}, f)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        """Записать индекс и освободить каталог для других процессов"""
+        self.save_index()
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if data is not None and data.get("version") == INDEX_VERSION:
+            for digest, nbytes, connectivity in data["entries"]:
+                self.entries[digest] = (nbytes, connectivity)
+                self.size += nbytes
+        # Файлы, которых нет в индексе (запись после последнего сохранения индекса), удаляем
+        for name in os.listdir(self.directory):
+            if name.endswith((".npy", ".tmp")) and name.split(".")[0] not in self.entries:
+                with suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.directory, name))
+
+    def _remove(self, digest):
+        entry = self.entries.pop(digest, None)
+        if entry is None:
+            return
+        self.size -= entry[0]
+        self.changed = True
+        for name in ("vertices", "indices"):
+            try:
+                os.remove(self._path(digest, name))
+            except OSError:
+                pass
+
+    def _path(self, digest, name):
+        return os.path.join(self.directory, f"{digest}.{name}.npy")
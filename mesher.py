@@ -0,0 +1,332 @@
+from collections import namedtuple
+import numpy as np
+import settings
+from blocks import FACES, registry
+from lighting import MAX_LIGHT
+
+# Построение геометрии чанка без единого вызова OpenGL.
+# На вход подается массив блоков чанка с рамкой в один блок из соседних чанков,
+# на выходе - массивы вершин для каждой стороны граней.
+
+# Направление к соседу, закрывающему грань (в порядке граней таблицы текстур)
+FACE_DIRECTIONS = {
+    "top": (0, 1, 0),
+    "bottom": (0, -1, 0),
+    "front": (0, 0, 1),
+    "back": (0, 0, -1),
+    "left": (-1, 0, 0),
+    "right": (1, 0, 0),
+}
+
+# Углы грани относительно угла блока (в том же порядке, что и раньше в draw_face)
+FACE_CORNERS = {
+    "top": np.array([(0, 1, 0), (1, 1, 0), (1, 1, 1), (0, 1, 1)], dtype=np.float32),
+    "bottom": np.array([(0, 0, 0), (1, 0, 0), (1, 0, 1), (0, 0, 1)], dtype=np.float32),
+    "front": np.array([(0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)], dtype=np.float32),
+    "back": np.array([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], dtype=np.float32),
+    "left": np.array([(0, 0, 0), (0, 0, 1), (0, 1, 1), (0, 1, 0)], dtype=np.float32),
+    "right": np.array([(1, 0, 0), (1, 0, 1), (1, 1, 1), (1, 1, 0)], dtype=np.float32),
+}
+
+QUAD_UVS = np.array([(0, 0), (1, 0), (1, 1), (0, 1)], dtype=np.float32)
+
+# Оси, вдоль которых растут координаты текстуры u и v на каждой грани
+UV_AXES = {
+    face: (int(np.argmax(np.abs(c[1] - c[0]))), int(np.argmax(np.abs(c[3] - c[0]))))
+    for face, c in FACE_CORNERS.items()
+}
+
+FACE_INDEX = {face: FACES.index(face) for face in FACE_DIRECTIONS}
+
+FACE_NORMALS = {face: np.array(direction, dtype=np.float32) for face, direction in FACE_DIRECTIONS.items()}
+
+# Два треугольника на четырехугольник грани
+QUAD_INDICES = np.array([0, 1, 2, 0, 2, 3], dtype=np.uint32)
+
+# Второй вариант разбиения четырехугольника - по другой диагонали
+FLIPPED_QUAD_INDICES = np.array([1, 2, 3, 1, 3, 0], dtype=np.uint32)
+
+# Число float на вершину в общем массиве чанка:
+# x, y, z, u, v, номер текстуры, nx, ny, nz, r, g, b
+VERTEX_SIZE = 12
+# Версия построения геометрии: увеличивать при любом изменении вершин, которые
+# строит мешер, - иначе из кэша мешей (mesh_cache.py) загрузится старая геометрия
+MESH_VERSION = 1
+
+# Яркость по уровню света 0..15 и по числу закрывающих угол блоков (3 - угол открыт)
+LIGHT_FALLOFF = 0.8
+AO_CURVE = np.array([0.55, 0.7, 0.85, 1.0], dtype=np.float32)
+
+# Постоянное затенение сторон от солнца, как раньше давал GL_LIGHT0 (фон 0.2 + рассеянный свет)
+_sun = np.array(settings.SUN_DIRECTION, dtype=np.float32)
+_sun /= np.linalg.norm(_sun)
+FACE_SHADE = {face: min(0.2 + max(float(np.dot(direction, _sun)), 0.0), 1.0)
+              for face, direction in FACE_DIRECTIONS.items()}
+
+# positions: (N * 4, 3), uvs: (N * 4, 2), textures: (N,) - по одному индексу на грань,
+# colors: (N * 4, 3) - цвет вершины с запеченным светом
+FaceMesh = namedtuple("FaceMesh", ["positions", "uvs", "textures", "colors"])
+
+# Геометрия всего чанка для загрузки в GPU:
+# vertices: (M, VERTEX_SIZE) float32, indices: uint32 (треугольники)
+ChunkMesh = namedtuple("ChunkMesh", ["vertices", "indices"])
+
+
+def visible_faces(padded, face):
+    """Маска блоков чанка, у которых видна грань face.
+
+    Грань видна, если сосед прозрачный и другого типа (между двумя блоками
+    стекла грань не нужна).
+    """
+    dx, dy, dz = FACE_DIRECTIONS[face]
+    sx, sy, sz = (n - 2 for n in padded.shape)
+    inner = padded[1:-1, 1:-1, 1:-1]
+    neighbour = padded[1 + dx:1 + dx + sx, 1 + dy:1 + dy + sy, 1 + dz:1 + dz + sz]
+    return (inner > 0) & registry.transparent[neighbour] & (neighbour != inner)
+
+
+def build_chunk_mesh(padded, block_textures, origin=(0, 0, 0), greedy=False,
+                     light=None, ambient_occlusion=True, skirts=False):
+    """Построить видимые грани чанка.
+
+    padded - блоки чанка с рамкой толщиной в один блок, block_textures - таблица
+    (грань, тип блока) -> номер текстуры в атласе (registry.texture_lookup),
+    origin - мировые координаты угла чанка. При greedy=True соседние грани одного
+    типа блока объединяются в большие прямоугольники. light - свет с такой же рамкой (None - полный свет).
+    skirts=True - всегда строить боковые грани на краях чанка (закрывают щели
+    между чанками разной детализации). Возвращает словарь {грань: FaceMesh}.
+    """
+    inner = padded[1:-1, 1:-1, 1:-1]
+    origin = np.asarray(origin, dtype=np.float32)
+    opaque = registry.opaque[padded]
+    levels = None if light is None else np.maximum(light >> 4, light & MAX_LIGHT)
+    meshes = {}
+    for face in FACE_DIRECTIONS:
+        mask = visible_faces(padded, face)
+        if skirts and FACE_DIRECTIONS[face][1] == 0:
+            _add_skirt(mask, padded, face)
+        cells = np.argwhere(mask)
+        shades = _vertex_shades(opaque, levels, cells, face, ambient_occlusion)
+        if greedy:
+            meshes[face] = _greedy_face_mesh(inner, cells, shades, face, origin, block_textures)
+            continue
+        coords = cells.astype(np.float32) + origin
+        count = len(coords)
+
+        positions = (coords[:, None, :] + FACE_CORNERS[face][None, :, :]).reshape(-1, 3)
+        uvs = np.tile(QUAD_UVS, (count, 1))
+        types = inner[mask]
+        textures = block_textures[FACE_INDEX[face]][types]
+        meshes[face] = FaceMesh(positions, uvs, textures, _vertex_colors(shades, types))
+    return meshes
+
+
+def _add_skirt(mask, padded, face):
+    """Отметить в mask грани face поверхностных блоков на краю чанка, куда смотрит грань.
+
+    Поверхность соседнего чанка другой детализации отличается меньше чем на
+    клетку, поэтому юбки достаточно под верхним блоком каждой колонны края.
+    """
+    inner = padded[1:-1, 1:-1, 1:-1]
+    surface = (inner > 0) & registry.transparent[padded[1:-1, 2:, 1:-1]]
+    axis = int(np.argmax(np.abs(FACE_DIRECTIONS[face])))
+    edge = -1 if FACE_DIRECTIONS[face][axis] > 0 else 0
+    index = [slice(None)] * 3
+    index[axis] = edge
+    mask[tuple(index)] |= surface[tuple(index)]
+
+
+def build_lod_mesh(padded, block_textures, origin, factor, greedy=False,
+                   light=None, ambient_occlusion=True, tile_uvs=True):
+    """Построить упрощенную геометрию чанка из сетки, уменьшенной в factor раз.
+
+    padded и light - блоки и свет чанка с рамкой толщиной factor блоков. Каждая
+    клетка factor³ становится одним большим блоком; на краях добавляются юбки.
+    tile_uvs - повторять текстуру по разу на блок мира (нужна поддержка повтора в отрисовке).
+    """
+    coarse = downsample_blocks(padded, factor)
+    coarse_light = None if light is None else downsample_light(light, factor)
+    meshes = build_chunk_mesh(coarse, block_textures, (0, 0, 0), greedy, coarse_light, ambient_occlusion, skirts=True)
+    origin = np.asarray(origin, dtype=np.float32)
+    uv_scale = factor if tile_uvs else 1
+    return {face: mesh._replace(positions=mesh.positions * factor + origin, uvs=mesh.uvs * uv_scale)
+            for face, mesh in meshes.items()}
+
+
+def _cells(array, factor):
+    """Разбить куб (N * factor)³ на клетки: (N, N, N, factor, factor, factor)"""
+    n = array.shape[0] // factor
+    return array.reshape(n, factor, n, factor, n, factor).transpose(0, 2, 4, 1, 3, 5)
+
+
+def downsample_blocks(blocks, factor):
+    """Уменьшить сетку блоков в factor раз.
+
+    Клетка заполнена, если в ней не меньше половины непустых блоков; тип
+    берется из самого верхнего непустого слоя клетки, чтобы издали была видна поверхность.
+    """
+    cells = _cells(blocks, factor)
+    filled = (cells != 0).sum(axis=(3, 4, 5)) * 2 >= factor ** 3
+    types = np.zeros(cells.shape[:3], dtype=np.uint8)
+    for layer in range(factor - 1, -1, -1):
+        top = cells[:, :, :, :, layer, :].max(axis=(3, 4))
+        types = np.where(types == 0, top, types)
+    return np.where(filled, types, 0).astype(np.uint8)
+
+
+def downsample_light(light, factor):
+    """Уменьшить сетку света в factor раз: в каждой клетке - самый яркий свет по каждому каналу"""
+    cells = _cells(light, factor)
+    sky = (cells >> 4).max(axis=(3, 4, 5))
+    block = (cells & MAX_LIGHT).max(axis=(3, 4, 5))
+    return ((sky << 4) | block).astype(np.uint8)
+
+
+def _vertex_colors(shades, types):
+    """Цвета вершин (N * 4, 3): яркость углов, умноженная на оттенок типа блока"""
+    return (shades[:, :, None] / np.float32(255) * registry.tint[types][:, None, :]).reshape(-1, 3)
+
+
+def _vertex_shades(opaque, levels, cells, face, ambient_occlusion):
+    """Яркость углов видимых граней (N, 4) uint8 0..255.
+
+    Свет угла - среднее по блоку перед гранью и прозрачным блокам рядом с
+    углом (сглаженное освещение), затенение угла - по непрозрачным соседям.
+    opaque и levels - массивы с рамкой, cells - координаты блоков без рамки.
+    """
+    normal = np.array(FACE_DIRECTIONS[face])
+    normal_axis = int(np.argmax(np.abs(normal)))
+    plane_axes = [axis for axis in range(3) if axis != normal_axis]
+    front = cells + 1 + normal
+    shades = np.empty((len(cells), 4), dtype=np.float32)
+    for k, corner in enumerate(FACE_CORNERS[face].astype(int)):
+        side_a = np.zeros(3, dtype=int)
+        side_b = np.zeros(3, dtype=int)
+        side_a[plane_axes[0]] = 2 * corner[plane_axes[0]] - 1
+        side_b[plane_axes[1]] = 2 * corner[plane_axes[1]] - 1
+        s1 = opaque[tuple((front + side_a).T)]
+        s2 = opaque[tuple((front + side_b).T)]
+        diagonal = opaque[tuple((front + side_a + side_b).T)]
+        # Через два непрозрачных соседа свет в угол не проходит
+        diagonal_open = ~diagonal & ~(s1 & s2)
+        if levels is None:
+            level = np.full(len(cells), MAX_LIGHT, dtype=np.float32)
+        else:
+            total = levels[tuple(front.T)].astype(np.float32)
+            total += np.where(s1, 0, levels[tuple((front + side_a).T)])
+            total += np.where(s2, 0, levels[tuple((front + side_b).T)])
+            total += np.where(diagonal_open, levels[tuple((front + side_a + side_b).T)], 0)
+            level = total / (1 + ~s1 + ~s2 + diagonal_open)
+        shade = LIGHT_FALLOFF ** (MAX_LIGHT - level)
+        if ambient_occlusion:
+            occlusion = np.where(s1 & s2, 0, 3 - s1.astype(int) - s2 - diagonal)
+            shade = shade * AO_CURVE[occlusion]
+        shades[:, k] = shade * FACE_SHADE[face]
+    return np.round(shades * 255).astype(np.uint8)
+
+
+def _greedy_rects(plane):
+    """Разбить 2D-срез типов блоков на прямоугольники (i, j, h, w, тип)"""
+    plane = plane.copy()
+    rows, cols = plane.shape
+    rects = []
+    for i in range(rows):
+        if not plane[i].any():
+            continue
+        row = plane[i].tolist()
+        j = 0
+        while j < cols:
+            block_type = row[j]
+            if block_type == 0:
+                j += 1
+                continue
+            # Растягиваем прямоугольник вдоль строки, затем вниз по строкам
+            w = 1
+            while j + w < cols and row[j + w] == block_type:
+                w += 1
+            h = 1
+            while i + h < rows and (plane[i + h, j:j + w] == block_type).all():
+                h += 1
+            plane[i:i + h, j:j + w] = 0
+            rects.append((i, j, h, w, block_type))
+            j += w
+    return rects
+
+
+def _greedy_face_mesh(inner, cells, shades, face, origin, block_textures):
+    """Объединить видимые грани одного направления.
+
+    Объединяются только грани одного типа блока с одинаковой яркостью всех
+    четырех углов; грани с перепадом света остаются отдельными.
+    """
+    normal_axis = int(np.argmax(np.abs(FACE_DIRECTIONS[face])))
+    plane_axes = [axis for axis in range(3) if axis != normal_axis]
+    u_axis, v_axis = UV_AXES[face]
+
+    # Ключ клетки: тип блока + 256 * (яркость + 1) или уникальное значение; 0 - нет грани
+    keys = np.zeros(inner.shape, dtype=np.int64)
+    cell_shades = np.zeros(inner.shape + (4,), dtype=np.uint8)
+    index = tuple(cells.T)
+    block_types = inner[index].astype(np.int64)
+    uniform = (shades == shades[:, :1]).all(axis=1)
+    unique = 256 * (257 + np.arange(len(cells), dtype=np.int64))
+    keys[index] = block_types + np.where(uniform, 256 * (shades[:, 0].astype(np.int64) + 1), unique)
+    cell_shades[index] = shades
+
+    starts, extents, rect_types, rect_shades = [], [], [], []
+    for depth in range(inner.shape[normal_axis]):
+        plane = np.take(keys, depth, axis=normal_axis)
+        if not plane.any():
+            continue
+        for i, j, h, w, key in _greedy_rects(plane):
+            start = [0, 0, 0]
+            extent = [1, 1, 1]
+            start[normal_axis] = depth
+            start[plane_axes[0]], extent[plane_axes[0]] = i, h
+            start[plane_axes[1]], extent[plane_axes[1]] = j, w
+            starts.append(start)
+            extents.append(extent)
+            rect_types.append(key & 255)
+            # У объединенных клеток яркость одинаковая - берем ее у первой
+            rect_shades.append(cell_shades[tuple(start)])
+
+    starts = np.array(starts, dtype=np.float32).reshape(-1, 3) + origin
+    extents = np.array(extents, dtype=np.float32).reshape(-1, 3)
+
+    # Углы единичной грани растягиваются на размер прямоугольника
+    positions = (starts[:, None, :] + FACE_CORNERS[face][None, :, :] * extents[:, None, :]).reshape(-1, 3)
+    # Текстура повторяется по одному разу на блок
+    uv_scale = extents[:, [u_axis, v_axis]]
+    uvs = (QUAD_UVS[None, :, :] * uv_scale[:, None, :]).reshape(-1, 2)
+    rect_types = np.array(rect_types, dtype=np.uint8)
+    textures = block_textures[FACE_INDEX[face]][rect_types]
+    colors = _vertex_colors(np.array(rect_shades, dtype=np.uint8).reshape(-1, 4), rect_types)
+    return FaceMesh(positions, uvs, textures, colors)
+
+
+def combine_faces(meshes):
+    """Собрать грани всех направлений в один ChunkMesh.
+
+    Номер текстуры хранится в каждой вершине, поэтому весь чанк рисуется
+    одним вызовом. Возвращает None, если у чанка нет видимых граней.
+    Четырехугольник делится на треугольники по диагонали между более светлыми
+    углами, чтобы затенение углов не зависело от разбиения.
+    """
+    parts = []
+    for face, mesh in meshes.items():
+        count = len(mesh.textures)
+        if count == 0:
+            continue
+        layers = np.repeat(mesh.textures.astype(np.float32), 4)[:, None]
+        normals = np.broadcast_to(FACE_NORMALS[face], (count * 4, 3))
+        parts.append(np.hstack([mesh.positions, mesh.uvs, layers, normals, mesh.colors]))
+    if not parts:
+        return None
+
+    vertices = np.ascontiguousarray(np.concatenate(parts), dtype=np.float32)
+    quads = len(vertices) // 4
+    corners = vertices[:, 9].reshape(quads, 4)
+    flipped = corners[:, 0] + corners[:, 2] < corners[:, 1] + corners[:, 3]
+    pattern = np.where(flipped[:, None], FLIPPED_QUAD_INDICES, QUAD_INDICES)
+    indices = (np.arange(quads, dtype=np.uint32)[:, None] * 4 + pattern).reshape(-1)
+    return ChunkMesh(vertices, indices)
@@ -0,0 +1,202 @@
+import math
+import socket
+import struct
+import zlib
+from collections import Counter
+import numpy as np
+
+# Двоичный протокол клиента и сервера мира (server.py, client.py).
+# Сообщение: заголовок (тип u8, длина данных u32) и данные; все числа little-endian.
+#
+# Сервер -> клиент:
+#   WELCOME  тик/с u16, CHUNK_SIZE u16, WORLD_HEIGHT u16, точка появления 3 x f32
+#   CHUNK    ключ 3 x i32, блоки чанка, сжатые zlib
+#   UNLOAD   ключ 3 x i32 - чанк вышел из области интереса клиента
+#   DELTA    номер тика u32, последняя примененная правка клиента u32, число чанков u16,
+#            по каждому чанку: ключ 3 x i32, число блоков u16, индексы u16[n], типы u8[n]
+# Клиент -> сервер:
+#   POSITION позиция игрока 3 x f32
+#   EDIT     номер правки u32, правки (x i32, y i32, z i32, тип u8)[n]
+
+WELCOME, CHUNK, UNLOAD, DELTA, POSITION, EDIT = range(1, 7)
+MESSAGE_NAMES = {WELCOME: "welcome", CHUNK: "chunk", UNLOAD: "unload", DELTA: "delta",
+                 POSITION: "position", EDIT: "edit"}
+
+HEADER = struct.Struct("<BI")
+KEY = struct.Struct("<3i")
+WELCOME_DATA = struct.Struct("<3H3f")
+POSITION_DATA = struct.Struct("<3f")
+DELTA_HEADER = struct.Struct("<IIH")
+DELTA_CHUNK = struct.Struct("<3iH")
+EDIT_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4"), ("z", "<i4"), ("type", "u1")])
+
+RECEIVE_SIZE = 1 << 16
+# Предел длины одного сообщения: больше - ошибка протокола, соединение закрывается
+MAX_MESSAGE_SIZE = 1 << 24
+
+
+def parse_address(address):
+    """Семейство сокета и адрес: "unix:/путь" или "хост:порт" (TCP)"""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def encode_welcome(tick_rate, chunk_size, world_height, spawn):
+    return WELCOME_DATA.pack(tick_rate, chunk_size, world_height, *spawn)
+
+
+def decode_welcome(data):
+    tick_rate, chunk_size, world_height, *spawn = WELCOME_DATA.unpack(data)
+    return tick_rate, chunk_size, world_height, np.array(spawn, dtype=np.float32)
+
+
+def encode_position(position):
+    return POSITION_DATA.pack(*position)
+
+
+def decode_position(data):
+    if len(data) != POSITION_DATA.size:
+        raise ValueError(f"Позиция длиной {len(data)} байт")
+    position = POSITION_DATA.unpack(data)
+    if not all(math.isfinite(v) for v in position):
+        raise ValueError("Позиция не конечна")
+    return np.array(position, dtype=np.float32)
+
+
+def encode_chunk(key, blocks, level=6):
+    return KEY.pack(*key) + zlib.compress(np.ascontiguousarray(blocks, dtype=np.uint8).tobytes(), level)
+
+
+def decode_chunk(data, chunk_size):
+    key = KEY.unpack_from(data)
+    blocks = np.frombuffer(zlib.decompress(data[KEY.size:]), dtype=np.uint8)
+    return key, blocks.reshape(chunk_size, chunk_size, chunk_size).copy()
+
+
+def encode_delta(tick, ack, changes):
+    """changes: ключ чанка -> (индексы, новые типы) - только чанки, которые есть у клиента"""
+    parts = [DELTA_HEADER.pack(tick, ack, len(changes))]
+    for key, (indices, values) in changes.items():
+        parts.append(DELTA_CHUNK.pack(*key, len(indices)))
+        parts.append(indices.astype("<u2").tobytes())
+        parts.append(values.astype(np.uint8).tobytes())
+    return b"".join(parts)
+
+
+def decode_delta(data):
+    """Номер тика, подтвержденная правка и правки {ключ чанка: (индексы, новые типы)}"""
+    tick, ack, count = DELTA_HEADER.unpack_from(data)
+    offset = DELTA_HEADER.size
+    changes = {}
+    for _ in range(count):
+        *key, n = DELTA_CHUNK.unpack_from(data, offset)
+        offset += DELTA_CHUNK.size
+        indices = np.frombuffer(data, dtype="<u2", count=n, offset=offset).astype(np.uint16)
+        offset += 2 * n
+        values = np.frombuffer(data, dtype=np.uint8, count=n, offset=offset).copy()
+        offset += n
+        changes[tuple(key)] = (indices, values)
+    return tick, ack, changes
+
+
+def encode_edits(seq, edits):
+    """edits - массив (N, 4): x, y, z, тип"""
+    edits = np.asarray(edits, dtype=np.int64).reshape(-1, 4)
+    packed = np.empty(len(edits), dtype=EDIT_DTYPE)
+    packed["x"], packed["y"], packed["z"], packed["type"] = edits.T
+    return struct.pack("<I", seq) + packed.tobytes()
+
+
+def decode_edits(data):
+    if len(data) < 4 or (len(data) - 4) % EDIT_DTYPE.itemsize:
+        raise ValueError(f"Правки длиной {len(data)} байт")
+    (seq,) = struct.unpack_from("<I", data)
+    packed = np.frombuffer(data, dtype=EDIT_DTYPE, offset=4)
+    edits = np.stack([packed["x"], packed["y"], packed["z"], packed["type"]], axis=1).astype(np.int64)
+    return seq, edits
+
+
+class Connection:
+    """Неблокирующий сокет с буферами и разбором сообщений; считает трафик по типам сообщений"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.sock.setblocking(False)
+        if sock.family == socket.AF_INET:
+            # Мелкие сообщения тика не должны ждать алгоритма Нейгла
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.incoming = bytearray()
+        self.outgoing = bytearray()
+        self.closed = False
+        self.bytes_sent = Counter()
+        self.bytes_received = Counter()
+        self.messages_sent = Counter()
+
+    @classmethod
+    def connect(cls, address, timeout=5.0):
+        family, target = parse_address(address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(target)
+        return cls(sock)
+
+    def send(self, kind, data=b""):
+        """Поставить сообщение в очередь; уходит при flush"""
+        self.outgoing += HEADER.pack(kind, len(data))
+        self.outgoing += data
+        self.bytes_sent[MESSAGE_NAMES[kind]] += HEADER.size + len(data)
+        self.messages_sent[MESSAGE_NAMES[kind]] += 1
+
+    def flush(self):
+        """Отправить сколько получится без блокировки; True - очередь пуста"""
+        while self.outgoing and not self.closed:
+            try:
+                sent = self.sock.send(self.outgoing)
+            except BlockingIOError:
+                return False
+            except OSError:
+                self.closed = True
+                return False
+            del self.outgoing[:sent]
+        return not self.outgoing
+
+    def receive(self):
+        """Прочитать доступные данные и вернуть список полных сообщений (тип, данные)"""
+        while not self.closed:
+            try:
+                data = self.sock.recv(RECEIVE_SIZE)
+            except BlockingIOError:
+                break
+            except OSError:
+                self.closed = True
+                break
+            if not data:
+                self.closed = True
+                break
+            self.incoming += data
+
+        messages = []
+        offset = 0
+        while len(self.incoming) - offset >= HEADER.size:
+            kind, length = HEADER.unpack_from(self.incoming, offset)
+            if length > MAX_MESSAGE_SIZE:
+                # Не копим неограниченно данные одного сообщения
+                self.close()
+                break
+            end = offset + HEADER.size + length
+            if len(self.incoming) < end:
+                break
+            messages.append((kind, bytes(self.incoming[offset + HEADER.size:end])))
+            self.bytes_received[MESSAGE_NAMES.get(kind, "unknown")] += end - offset
+            offset = end
+        del self.incoming[:offset]
+        return messages
+
+    def close(self):
+        self.closed = True
+        try:
+            self.sock.close()
+        except OSError:
+            pass
@@ -0,0 +1,54 @@
+from chunk import chunk_coords
+
+
+class BlockPicker:
+    """Блок под прицелом игрока, вычисляемый один раз на состояние камеры.
+
+    Результат пересчитывается, только если игрок сдвинулся, повернул камеру
+    или изменился чанк, через который проходит луч (по версии чанка).
+    """
+
+    def __init__(self, world, player):
+        self.world = world
+        self.player = player
+        self.camera = None
+        # Версии чанков на пути луча в момент расчета (None - чанк не был загружен)
+        self.chunk_versions = {}
+        self.result = (None, None)
+        # Сколько раз результат взят готовым и сколько раз луч пускался заново (для отладочной строки)
+        self.hits = 0
+        self.misses = 0
+
+    def _camera_state(self):
+        player = self.player
+        return (tuple(player.eye_position().tolist()), player.yaw, player.pitch, player.interaction_distance)
+
+    def _is_valid(self, camera):
+        if camera != self.camera:
+            return False
+        for key, version in self.chunk_versions.items():
+            chunk = self.world.chunks.get(key)
+            if (chunk.version if chunk is not None else None) != version:
+                return False
+        return True
+
+    def pick(self):
+        """(блок под прицелом, позиция для установки) - то же, что Player.raycast"""
+        camera = self._camera_state()
+        if self._is_valid(camera):
+            self.hits += 1
+            return self.result
+        self.misses += 1
+
+        world = self.world
+        path = []
+        self.result = self.player.raycast(world, path)
+
+        self.chunk_versions = {}
+        for block in path:
+            key = chunk_coords(*block, world.chunk_size)
+            if key not in self.chunk_versions:
+                chunk = world.chunks.get(key)
+                self.chunk_versions[key] = chunk.version if chunk is not None else None
+        self.camera = camera
+        return self.result
@@ -3,11 +3,18 @@ import math
 import settings
 import pygame
 import numpy as np
+from culling import rotation_matrix, translation_matrix
+from collision import move_box
+from raycast import raycast
 
 class Player:
     def __init__(self):
-        # Позиция игрока
-        self.position = np.array([5 * settings.WORLD_SIZE, 3, 5 * settings.WORLD_SIZE], dtype=np.float32)
+        # Позиция игрока и точка, куда он возвращается по клавише R
+        self.spawn_point = np.array([5 * settings.WORLD_SIZE, 3, 5 * settings.WORLD_SIZE], dtype=np.float32)
+        # float64: при float32 округление вдали от начала координат сравнимо с допуском коллизий
+        self.position = self.spawn_point.astype(np.float64)
+        # Позиция в начале текущего тика - для интерполяции камеры между тиками
+        self.previous_position = self.position.copy()
         self.pitch, self.yaw = 0, 0  # Углы камеры
         self.speed = settings.PLAYER_SPEED
         self.sprint_speed = settings.SPRINT_SPEED
@@ -24,9 +31,6 @@ class Player:
         self.width = 0.6   # Ширина игрока
         self.eye_height = 1.6  # Высота глаз от земли
         
-        # Уменьшаем отступ для коллизий, чтобы игрок мог проходить в узкие места
-        self.collision_padding = 0.2
-        
         self.prev_f_pressed = False  # Для переключения режима полета
         self.selected_block = 2  # По умолчанию выбран камень (2)
         self.interaction_distance = 5.0  # Максимальное расстояние для взаимодействия с блоками
@@ -55,14 +59,30 @@ class Player:
     def z(self, value):
         self.position[2] = value
 
-    def update_camera(self):
-        # Применяем повороты камеры
-        glRotatef(self.pitch, 1, 0, 0)  # Поворот по оси X
-        glRotatef(self.yaw, 0, 1, 0)    # Поворот по оси Y
-        
-        # Сдвигаем сцену, чтобы камера была на уровне глаз игрока
-        # Вычитаем высоту глаз из позиции Y
-        glTranslatef(-self.x, -(self.y + self.eye_height), -self.z)
+    def begin_tick(self):
+        """Запомнить позицию перед шагом симуляции"""
+        self.previous_position[:] = self.position
+
+    def eye_position(self, alpha=1.0):
+        """Позиция глаз игрока в мире.
+
+        alpha < 1 - точка между позицией прошлого и текущего тика (для отрисовки).
+        """
+        position = self.position if alpha >= 1.0 else \
+            self.previous_position + (self.position - self.previous_position) * alpha
+        return np.array([position[0], position[1] + self.eye_height, position[2]], dtype=np.float64)
+
+    def view_matrix(self, alpha=1.0):
+        """Матрица камеры (та же, что строит update_camera) для отсечения чанков"""
+        # Применяем повороты камеры: по оси X, затем по оси Y
+        # и сдвигаем сцену, чтобы камера была на уровне глаз игрока
+        return (rotation_matrix(self.pitch, 1, 0, 0) @
+                rotation_matrix(self.yaw, 0, 1, 0) @
+                translation_matrix(*-self.eye_position(alpha)))
+
+    def update_camera(self, alpha=1.0):
+        # OpenGL хранит матрицы по столбцам
+        glMultMatrixf(np.ascontiguousarray(self.view_matrix(alpha).T, dtype=np.float32))
 
     def handle_mouse(self, dx, dy):
         # Исправляем инверсию по горизонтали - убираем минус перед dx
@@ -100,57 +120,31 @@ class Player:
             move_vector /= length
             move_vector *= current_speed
         
-        # Применяем движение по горизонтали
-        new_position = self.position.copy()
-        new_position[0] += move_vector[0]
-        new_position[2] += move_vector[2]
-        
-        # Проверка коллизий с миром (если мир передан)
-        if world is not None:
-            # Проверяем коллизии только если не в режиме полета
-            if not self.is_flying:
-                # Проверка коллизий по X
-                if self.check_collision(new_position[0], self.y, self.z, world):
-                    new_position[0] = self.x
-                
-                # Проверка коллизий по Z
-                if self.check_collision(new_position[0], self.y, new_position[2], world):
-                    new_position[2] = self.z
-        
-        # Применяем новую позицию
-        self.position[0] = new_position[0]
-        self.position[2] = new_position[2]
-        
-        # Обработка вертикального движения
         if self.is_flying:
-            # В режиме полета
+            # В режиме полета коллизий нет
+            self.position[0] += move_vector[0]
+            self.position[2] += move_vector[2]
             if keys[pygame.K_SPACE]:  # Вверх
                 self.position[1] += self.fly_speed
             if keys[pygame.K_LSHIFT]:  # Вниз
                 self.position[1] -= self.fly_speed
         else:
             # В режиме ходьбы с гравитацией
-            # Проверяем, стоим ли мы на земле
-            self.is_on_ground = self.check_ground(world)
-            
             if self.is_on_ground:
-                self.velocity_y = 0
-                if keys[pygame.K_SPACE]:  # Прыжок
-                    self.velocity_y = self.jump_strength
+                # Стоя на земле, тело все равно прижимается к ней - так касание
+                # с землей определяется тем же запросом, что и столкновения
+                self.velocity_y = self.jump_strength if keys[pygame.K_SPACE] else -self.gravity
             else:
-                # Применяем гравитацию
                 self.velocity_y -= self.gravity
+            velocity = np.array([move_vector[0], self.velocity_y, move_vector[2]])
             
-            # Применяем вертикальную скорость
-            new_y = self.y + self.velocity_y
-            
-            # Проверка коллизий по Y
-            if world is not None and self.check_collision(self.x, new_y, self.z, world):
-                if self.velocity_y < 0:  # Если падаем вниз
-                    self.is_on_ground = True
-                self.velocity_y = 0
+            if world is not None:
+                box_min, box_max = self.bounding_box()
+                new_min, velocity, _, self.is_on_ground = move_box(world, box_min, box_max, velocity)
+                self.position[:] = new_min + (self.width / 2, 0, self.width / 2)
+                self.velocity_y = velocity[1]
             else:
-                self.position[1] = new_y
+                self.position += velocity
         
         # Переключение режима полета
         if keys[pygame.K_f] and not self.prev_f_pressed:
@@ -166,127 +160,41 @@ class Player:
             if keys[getattr(pygame, f'K_{i}')]:
                 self.selected_block = i
 
-    def check_collision(self, x, y, z, world):
-        """Проверка коллизий с блоками мира с учетом размеров игрока"""
-        # Получаем координаты блоков, которые занимает игрок
-        min_x, max_x = int(x - self.width/2), int(x + self.width/2)
-        min_y, max_y = int(y), int(y + self.height)
-        min_z, max_z = int(z - self.width/2), int(z + self.width/2)
-        
-        # Проверяем все блоки, которые могут пересекаться с игроком
-        for check_x in range(min_x, max_x + 1):
-            for check_y in range(min_y, max_y + 1):
-                for check_z in range(min_z, max_z + 1):
-                    # Проверяем, что координаты в пределах мира
-                    if (0 <= check_x < world.size_x and 
-                        0 <= check_y < world.size_y and 
-                        0 <= check_z < world.size_z):
-                        
-                        # Если блок не воздух
-                        if world.blocks[check_x, check_y, check_z] != 0:
-                            # Проверяем коллизию с этим блоком
-                            # Центр блока
-                            block_center_x = check_x + 0.5
-                            block_center_y = check_y + 0.5
-                            block_center_z = check_z + 0.5
-                            
-                            # Расстояние от центра игрока до центра блока
-                            dx = abs(x - block_center_x)
-                            dy = abs((y + self.height/2) - block_center_y)
-                            dz = abs(z - block_center_z)
-                            
-                            # Сумма половин размеров
-                            sum_half_width_x = (self.width/2 + 0.5)
-                            sum_half_height = (self.height/2 + 0.5)
-                            sum_half_width_z = (self.width/2 + 0.5)
-                            
-                            # Если расстояние меньше суммы половин размеров, то есть коллизия
-                            if (dx < sum_half_width_x and
-                                dy < sum_half_height and
-                                dz < sum_half_width_z):
-                                return True
-        return False
-
-    def check_ground(self, world):
-        """Проверка, стоит ли игрок на земле"""
-        # Проверяем блоки прямо под ногами игрока
-        feet_y = int(self.y - 0.1)  # Немного ниже позиции ног
-        
-        # Проверяем несколько точек под игроком для более надежного определения
-        check_points = [
-            (self.x, self.z),  # Центр
-            (self.x - self.width/2, self.z),  # Левый край
-            (self.x + self.width/2, self.z),  # Правый край
-            (self.x, self.z - self.width/2),  # Передний край
-            (self.x, self.z + self.width/2)   # Задний край
-        ]
-        
-        for point_x, point_z in check_points:
-            block_x, block_z = int(point_x), int(point_z)
-            
-            if (0 <= block_x < world.size_x and 
-                0 <= feet_y < world.size_y and 
-                0 <= block_z < world.size_z):
-                
-                if world.blocks[block_x, feet_y, block_z] != 0:
-                    return True
-        
-        return False
+    def bounding_box(self):
+        """Нижний и верхний углы AABB игрока"""
+        half = self.width / 2
+        box_min = np.array([self.x - half, self.y, self.z - half], dtype=np.float64)
+        return box_min, box_min + (self.width, self.height, self.width)
 
     def reset_position(self):
-        """Сбросить позицию игрока в центр карты"""
-        self.position = np.array([5 * settings.WORLD_SIZE, 3, 5 * settings.WORLD_SIZE], dtype=np.float32)
+        """Сбросить позицию игрока в точку появления"""
+        self.position = np.array(self.spawn_point, dtype=np.float64)
+        self.previous_position = self.position.copy()
         self.pitch, self.yaw = 0, 0  # Сбрасываем углы камеры
         self.velocity_y = 0  # Сбрасываем вертикальную скорость
         if settings.DEBUG_MODE:
-            print("Позиция игрока сброшена в центр карты.")
-        
-    def raycast(self, world):
-        """Определение блока, на который смотрит игрок"""
-        # Начальная позиция луча - позиция глаз игрока
-        ray_pos = self.position.copy()
-        ray_pos[1] += self.eye_height  # Добавляем высоту глаз
-        
-        # Направление луча - направление взгляда игрока
-        ray_dir = np.array([
-            math.sin(math.radians(self.yaw)) * math.cos(math.radians(self.pitch)),
-            -math.sin(math.radians(self.pitch)),
-            -math.cos(math.radians(self.yaw)) * math.cos(math.radians(self.pitch))
-        ], dtype=np.float32)
-        
-        # Нормализуем направление
-        ray_dir /= np.linalg.norm(ray_dir)
-        
-        # Шаг для луча (уменьшаем для большей точности)
-        step = 0.01
-        
-        # Максимальное расстояние для проверки
-        max_distance = self.interaction_distance
-        
-        # Проходим по лучу с шагом step
-        for i in range(int(max_distance / step)):
-            # Текущая позиция на луче
-            current_pos = ray_pos + ray_dir * step * i
-            
-            # Координаты блока
-            block_x, block_y, block_z = int(current_pos[0]), int(current_pos[1]), int(current_pos[2])
-            
-            # Проверяем, что координаты в пределах мира
-            if (0 <= block_x < world.size_x and 
-                0 <= block_y < world.size_y and 
-                0 <= block_z < world.size_z):
-                
-                # Если блок не воздух, возвращаем его координаты и предыдущую позицию
-                if world.blocks[block_x, block_y, block_z] != 0:
-                    # Вычисляем предыдущую позицию для размещения блока
-                    prev_pos = ray_pos + ray_dir * step * (i - 1)
-                    prev_block_x, prev_block_y, prev_block_z = int(prev_pos[0]), int(prev_pos[1]), int(prev_pos[2])
-                    
-                    # Проверяем, что предыдущая позиция в пределах мира
-                    if (0 <= prev_block_x < world.size_x and 
-                        0 <= prev_block_y < world.size_y and 
-                        0 <= prev_block_z < world.size_z):
-                        
-                        return (block_x, block_y, block_z), (prev_block_x, prev_block_y, prev_block_z)
-        
-        return None, None
+            print("Позиция игрока сброшена в точку появления.")
+        
+    def look_direction(self):
+        """Единичный вектор направления взгляда"""
+        yaw, pitch = math.radians(self.yaw), math.radians(self.pitch)
+        return np.array([
+            math.sin(yaw) * math.cos(pitch),
+            -math.sin(pitch),
+            -math.cos(yaw) * math.cos(pitch)
+        ], dtype=np.float64)
+
+    def raycast(self, world, path=None):
+        """Блок, на который смотрит игрок, и позиция для установки нового блока.
+
+        Возвращает (None, None), если в пределах interaction_distance блоков нет;
+        позиция установки - None, если она вне мира или глаза внутри блока.
+        """
+        hit = raycast(world, self.eye_position(), self.look_direction(), self.interaction_distance, path)
+        if hit is None:
+            return None, None
+        place = hit.place_position
+        # Луч начался внутри блока - ставить новый блок некуда
+        if hit.normal == (0, 0, 0) or not world.in_bounds(*place):
+            place = None
+        return hit.block, place
@@ -0,0 +1,183 @@
+from contextlib import contextmanager, nullcontext
+import json
+import threading
+import time
+import numpy as np
+
+# Профилировщик кадров: время каждой фазы кадра (именованные области) складывается
+# в кольцевой буфер на последние N кадров. Выключенный профилировщик возвращает
+# из scope общий пустой контекст, поэтому почти ничего не стоит.
+
+_NO_SCOPE = nullcontext()
+
+
+class _Scope:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class Profiler:
+    def __init__(self, enabled=False, frames=600):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.reset(frames)
+
+    def reset(self, frames=None):
+        """Очистить собранные данные (и поменять размер буфера)"""
+        frames = self.frames if frames is None else frames
+        self.frames = frames
+        self.frame_index = -1
+        self.frame_start = None
+        # Длительность кадров и суммарное время фаз по кадрам (секунды), кольцевые буферы
+        self.frame_times = np.full(frames, np.nan)
+        self.phase_times = {}
+        # События для экспорта трассы: (имя, начало, конец, поток); тоже только последние кадры
+        self.events = []
+        self.event_frames = []
+        self.origin = time.perf_counter()
+
+    def scope(self, name):
+        """Контекст, время которого записывается как фаза name текущего кадра"""
+        if not self.enabled:
+            return _NO_SCOPE
+        return _Scope(self, name)
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.frame_times[self.frame_index % self.frames] = now - self.frame_start
+        self.frame_index += 1
+        self.frame_start = now
+        slot = self.frame_index % self.frames
+        for times in self.phase_times.values():
+            times[slot] = 0.0
+        # Выбрасываем события кадров, вышедших из буфера
+        with self.lock:
+            oldest = self.frame_index - self.frames + 1
+            drop = 0
+            while drop < len(self.event_frames) and self.event_frames[drop] < oldest:
+                drop += 1
+            if drop:
+                del self.events[:drop]
+                del self.event_frames[:drop]
+
+    def record(self, name, start, end):
+        """Записать фазу текущего кадра (вызывать только из главного потока)"""
+        if self.frame_index < 0:
+            return
+        slot = self.frame_index % self.frames
+        times = self.phase_times.get(name)
+        if times is None:
+            times = self.phase_times[name] = np.full(self.frames, np.nan)
+            times[slot] = 0.0
+        # Фаза может встречаться в кадре несколько раз (например, тики) - суммируем
+        times[slot] += end - start
+        with self.lock:
+            self.events.append((name, start, end, threading.get_ident()))
+            self.event_frames.append(self.frame_index)
+
+    def percentiles(self, name=None, q=(50, 95, 99)):
+        """Процентили времени кадра (или фазы name) в миллисекундах по буферу"""
+        times = self.frame_times if name is None else self.phase_times.get(name)
+        if times is None:
+            return None
+        values = times[~np.isnan(times)]
+        if len(values) == 0:
+            return None
+        return tuple(np.percentile(values, q) * 1000)
+
+    def report_lines(self):
+        """Строки для вывода на экран: кадр и фазы, p50 / p95 / p99 в мс"""
+        frame = self.percentiles()
+        if frame is None:
+            return []
+        lines = ["кадр p50/p95/p99: {:.1f} / {:.1f} / {:.1f} мс".format(*frame)]
+        for name in sorted(self.phase_times):
+            phase = self.percentiles(name)
+            if phase is not None:
+                lines.append("{}: {:.2f} / {:.2f} / {:.2f} мс".format(name, *phase))
+        return lines
+
+    def export_chrome_trace(self, path):
+        """Записать события последних кадров в формате Chrome trace (chrome://tracing, Perfetto)"""
+        with self.lock:
+            events = list(self.events)
+        trace = [{"name": name, "ph": "X", "pid": 0, "tid": tid,
+                  "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6}
+                 for name, start, end, tid in events]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+        return len(trace)
+
+
+class StartupTimer:
+    """Время фаз запуска игры и моментов (первый кадр, готовый мир) от импорта модулей.
+
+    Фазы могут идти в фоновых потоках и пересекаться, поэтому каждая хранит
+    свое начало и конец; сумма фаз не обязана совпадать со временем до кадра.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases = {}  # Имя -> (начало, конец) в секундах от origin
+        self.marks = {}   # Имя -> время от origin
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (start - self.origin, time.perf_counter() - self.origin)
+
+    def timed(self, name, func, *args):
+        """Вызвать func как фазу name (удобно для отправки в пул потоков)"""
+        with self.phase(name):
+            return func(*args)
+
+    def mark(self, name):
+        """Запомнить момент name (повторные вызовы не перезаписывают первый)"""
+        self.marks.setdefault(name, time.perf_counter() - self.origin)
+
+    def report(self):
+        """Длительности фаз и моменты в миллисекундах"""
+        return {"phases": {name: (end - start) * 1000 for name, (start, end) in self.phases.items()},
+                "marks": {name: at * 1000 for name, at in self.marks.items()}}
+
+    def report_lines(self):
+        lines = []
+        for name, (start, end) in sorted(self.phases.items(), key=lambda item: item[1]):
+            lines.append(f"{name}: {(end - start) * 1000:.1f} мс (с {start * 1000:.1f} мс)")
+        for name, at in sorted(self.marks.items(), key=lambda item: item[1]):
+            lines.append(f"{name}: на {at * 1000:.1f} мс")
+        return lines
+
+
+def startup_regressions(baseline, report, tolerance, min_ms=20.0):
+    """Фазы и моменты, ставшие медленнее базового замера больше чем на долю tolerance (и на min_ms)"""
+    regressions = []
+    for group in ("phases", "marks"):
+        for name, before in baseline.get(group, {}).items():
+            after = report[group].get(name)
+            if after is not None and after > before * (1 + tolerance) and after - before > min_ms:
+                regressions.append(f"{name}: {before:.1f} -> {after:.1f} мс")
+    return regressions
+
+
+# Общий профилировщик движка; включается из Game по settings.PROFILER_ENABLED
+profiler = Profiler()
+# Замер запуска; отсчет идет от первого импорта этого модуля
+startup = StartupTimer()
@@ -0,0 +1,122 @@
+import math
+import numpy as np
+
+# Обход сетки вокселей по лучу (Amanatides & Woo): луч переходит из блока в блок
+# через ближайшую грань, поэтому проверяется каждый пересеченный блок ровно один раз.
+
+
+class RayHit:
+    """Результат попадания луча в блок"""
+
+    def __init__(self, block, normal, distance):
+        self.block = block        # Координаты блока (x, y, z)
+        self.normal = normal      # Нормаль грани, через которую луч вошел в блок
+        self.distance = distance  # Расстояние от начала луча до этой грани
+
+    @property
+    def place_position(self):
+        """Блок перед гранью попадания - туда ставится новый блок"""
+        return tuple(b + n for b, n in zip(self.block, self.normal))
+
+
+def _axis_setup(origin, direction):
+    """Шаг по оси, расстояние до первой границы блока и между границами (вдоль луча)"""
+    cell = math.floor(origin)
+    if direction > 0:
+        return cell, 1, (cell + 1 - origin) / direction, 1 / direction
+    if direction < 0:
+        return cell, -1, (cell - origin) / direction, -1 / direction
+    return cell, 0, math.inf, math.inf
+
+
+def raycast(world, origin, direction, max_distance, path=None):
+    """Первый непустой блок на луче не дальше max_distance или None.
+
+    direction должен быть единичным, тогда distance - расстояние в блоках.
+    Если луч начинается внутри блока, возвращается он сам с нулевой нормалью.
+    В список path (если передан) добавляются все проверенные блоки.
+    """
+    x, step_x, t_max_x, t_delta_x = _axis_setup(float(origin[0]), float(direction[0]))
+    y, step_y, t_max_y, t_delta_y = _axis_setup(float(origin[1]), float(direction[1]))
+    z, step_z, t_max_z, t_delta_z = _axis_setup(float(origin[2]), float(direction[2]))
+    normal = (0, 0, 0)
+    distance = 0.0
+
+    while distance <= max_distance:
+        if 0 <= y < world.size_y:
+            if path is not None:
+                path.append((x, y, z))
+            if world.get_block(x, y, z):
+                return RayHit((x, y, z), normal, distance)
+        elif (y < 0 and step_y <= 0) or (y >= world.size_y and step_y >= 0):
+            # Луч ушел за пределы мира по высоте и не вернется
+            return None
+
+        # Переходим через ближайшую границу (при равенстве - по первой оси, как argmin)
+        if t_max_x <= t_max_y and t_max_x <= t_max_z:
+            x += step_x
+            distance = t_max_x
+            t_max_x += t_delta_x
+            normal = (-step_x, 0, 0)
+        elif t_max_y <= t_max_z:
+            y += step_y
+            distance = t_max_y
+            t_max_y += t_delta_y
+            normal = (0, -step_y, 0)
+        else:
+            z += step_z
+            distance = t_max_z
+            t_max_z += t_delta_z
+            normal = (0, 0, -step_z)
+    return None
+
+
+def raycast_batch(world, origins, directions, max_distance):
+    """Обход сетки сразу для многих лучей (массивы (N, 3), направления единичные).
+
+    Все лучи продвигаются на один блок за итерацию, блоки читаются одним
+    запросом World.get_blocks. Возвращает (hit, blocks, normals, distances):
+    маску попаданий, координаты блоков, нормали граней и расстояния
+    (для промахов блоки и нормали нулевые, расстояние - inf).
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+    count = len(origins)
+
+    cells = np.floor(origins).astype(np.int64)
+    steps = np.sign(directions).astype(np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_delta = np.where(steps != 0, np.abs(1 / directions), np.inf)
+        t_max = np.where(steps != 0, (cells + (steps > 0) - origins) / directions, np.inf)
+
+    hit = np.zeros(count, dtype=bool)
+    normals = np.zeros((count, 3), dtype=np.int64)
+    distances = np.zeros(count)
+    active = np.ones(count, dtype=bool)
+
+    # Луч длины L пересекает не больше чем по L + 1 границе на каждой оси
+    for _ in range(3 * (math.ceil(max_distance) + 1) + 1):
+        rays = np.flatnonzero(active)
+        if len(rays) == 0:
+            break
+        solid = world.get_blocks(cells[rays]) != 0
+        hit[rays[solid]] = True
+        active[rays[solid]] = False
+        rays = rays[~solid]
+
+        axis = np.argmin(t_max[rays], axis=1)
+        distances[rays] = t_max[rays, axis]
+        cells[rays, axis] += steps[rays, axis]
+        t_max[rays, axis] += t_delta[rays, axis]
+        normals[rays] = 0
+        normals[rays, axis] = -steps[rays, axis]
+
+        y, step_y = cells[rays, 1], steps[rays, 1]
+        gone = ((distances[rays] > max_distance) |
+                ((y < 0) & (step_y <= 0)) | ((y >= world.size_y) & (step_y >= 0)))
+        active[rays[gone]] = False
+
+    cells[~hit] = 0
+    normals[~hit] = 0
+    distances[~hit] = np.inf
+    return hit, cells, normals, distances
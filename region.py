@@ -0,0 +1,186 @@
+import json
+import mmap
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Формат файла региона:
+#   заголовок - таблица из REGION_CHUNKS записей (смещение, длина) по 4 байта (little-endian);
+#   дальше сжатые zlib чанки, каждый начинается с границы сектора.
+# Регион покрывает REGION_SIZE³ чанков.
+REGION_SIZE = 8
+REGION_CHUNKS = REGION_SIZE ** 3
+SECTOR_SIZE = 4096
+HEADER_SIZE = REGION_CHUNKS * 8
+FORMAT_VERSION = 1
+
+
+def region_coords(key):
+    """Координаты региона и номер записи чанка внутри него"""
+    cx, cy, cz = key
+    rx, lx = divmod(cx, REGION_SIZE)
+    ry, ly = divmod(cy, REGION_SIZE)
+    rz, lz = divmod(cz, REGION_SIZE)
+    return (rx, ry, rz), (lx * REGION_SIZE + ly) * REGION_SIZE + lz
+
+
+class RegionFile:
+    """Один файл региона; чтение чанков через mmap без чтения всего файла"""
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(bytes(HEADER_SIZE))
+        self.file = open(path, "r+b")
+        # Таблица смещений - единственное, что читается при открытии (4 КБ)
+        self.header = np.frombuffer(self.file.read(HEADER_SIZE), dtype="<u4").reshape(REGION_CHUNKS, 2).copy()
+        self.map = None
+        self.lock = threading.Lock()
+
+    def read(self, index):
+        """Сжатые данные чанка или None, если чанк не сохранен"""
+        with self.lock:
+            offset, length = (int(v) for v in self.header[index])
+            if length == 0:
+                return None
+            self._ensure_open()
+            if self.map is None:
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self.map[offset:offset + length]
+
+    def write(self, index, data):
+        """Записать сжатые данные чанка (на старое место, если помещаются)"""
+        with self.lock:
+            self._ensure_open()
+            offset, length = (int(v) for v in self.header[index])
+            sectors = -(-len(data) // SECTOR_SIZE)
+            if length == 0 or -(-length // SECTOR_SIZE) < sectors:
+                # Не помещается - дописываем в конец файла
+                self.file.seek(0, os.SEEK_END)
+                offset = -(-self.file.tell() // SECTOR_SIZE) * SECTOR_SIZE
+            self.file.seek(offset)
+            self.file.write(data)
+            self.header[index] = (offset, len(data))
+            self.file.seek(index * 8)
+            self.file.write(self.header[index].tobytes())
+            self.file.flush()
+            # Файл мог вырасти - отображение создадим заново при следующем чтении
+            self._close_map()
+
+    def _ensure_open(self):
+        # Файл мог быть закрыт при вытеснении из списка открытых регионов
+        if self.file.closed:
+            self.file = open(self.path, "r+b")
+
+    def _close_map(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def close(self):
+        """Закрыть файл (таблица смещений остается, read и write откроют его снова)"""
+        with self.lock:
+            self._close_map()
+            self.file.close()
+
+
+class RegionStorage:
+    """Сохранение и ленивая загрузка чанков из файлов регионов"""
+
+    def __init__(self, directory, chunk_size, max_open_files=32):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.max_open_files = max_open_files
+        os.makedirs(directory, exist_ok=True)
+        # Один RegionFile на файл на все время работы (его таблица смещений - единственная
+        # верная копия), а открытыми держим только недавно использованные
+        self.regions = {}
+        self.open_regions = OrderedDict()
+        self.regions_lock = threading.Lock()
+        # Чанки, поставленные в очередь на запись, но еще не записанные
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="region-writer")
+        self.bytes_written = 0
+
+    def load_meta(self):
+        """Параметры сохраненного мира или None для нового мира"""
+        path = os.path.join(self.directory, "world.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_meta(self, meta):
+        meta = dict(meta, format_version=FORMAT_VERSION, chunk_size=self.chunk_size)
+        with open(os.path.join(self.directory, "world.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+    def _region(self, coords):
+        with self.regions_lock:
+            region = self.regions.get(coords)
+            if region is None:
+                name = "r.{}.{}.{}.bin".format(*coords)
+                region = RegionFile(os.path.join(self.directory, name))
+                self.regions[coords] = region
+            self.open_regions[coords] = region
+            self.open_regions.move_to_end(coords)
+            # Ограничиваем число одновременно открытых файлов: закрывается только файл,
+            # при следующем обращении RegionFile откроет его заново под своей блокировкой
+            while len(self.open_regions) > self.max_open_files:
+                _, old = self.open_regions.popitem(last=False)
+                old.close()
+            return region
+
+    def load(self, key):
+        """Блоки сохраненного чанка или None"""
+        with self.pending_lock:
+            blocks = self.pending.get(key)
+        if blocks is not None:
+            return blocks.copy()
+
+        coords, index = region_coords(key)
+        path = os.path.join(self.directory, "r.{}.{}.{}.bin".format(*coords))
+        if coords not in self.regions and not os.path.exists(path):
+            return None
+        data = self._region(coords).read(index)
+        if data is None:
+            return None
+        shape = (self.chunk_size,) * 3
+        return np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(shape).copy()
+
+    def save(self, chunks):
+        """Поставить чанки {ключ: копия блоков} в очередь на запись в фоновом потоке"""
+        if not chunks:
+            return None
+        with self.pending_lock:
+            self.pending.update(chunks)
+        return self.writer.submit(self._write, chunks)
+
+    def _write(self, chunks):
+        for key, blocks in chunks.items():
+            data = zlib.compress(blocks.tobytes())
+            coords, index = region_coords(key)
+            self._region(coords).write(index, data)
+            self.bytes_written += len(data)
+            with self.pending_lock:
+                # Если за это время чанк снова поставили в очередь, оставляем новую версию
+                if self.pending.get(key) is blocks:
+                    del self.pending[key]
+
+    def flush(self):
+        """Дождаться окончания всех поставленных в очередь записей"""
+        self.writer.submit(lambda: None).result()
+
+    def close(self):
+        self.flush()
+        self.writer.shutdown(wait=True)
+        with self.regions_lock:
+            for region in self.regions.values():
+                region.close()
+            self.regions.clear()
+            self.open_regions.clear()
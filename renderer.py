@@ -0,0 +1,246 @@
+import ctypes
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+import settings
+from mesher import VERTEX_SIZE
+
+# Размер вершины в байтах и смещения атрибутов внутри нее
+VERTEX_STRIDE = VERTEX_SIZE * 4
+UV_OFFSET = 3 * 4
+NORMAL_OFFSET = 6 * 4
+COLOR_OFFSET = 9 * 4
+
+# Шейдер повторяет текстуру внутри клетки атласа (нужно для объединенных граней);
+# освещение уже запечено в цвет вершины
+ATLAS_VERTEX_SHADER = """
+#version 120
+varying vec3 tile_uv;
+varying vec4 light;
+void main() {
+    gl_Position = ftransform();
+    tile_uv = gl_MultiTexCoord0.xyz;
+    light = gl_Color;
+}
+"""
+
+ATLAS_FRAGMENT_SHADER = """
+#version 120
+uniform sampler2D atlas;
+uniform vec2 atlas_grid;
+varying vec3 tile_uv;
+varying vec4 light;
+void main() {
+    float layer = floor(tile_uv.z + 0.5);
+    vec2 tile = vec2(mod(layer, atlas_grid.x), floor(layer / atlas_grid.x));
+    gl_FragColor = texture2D(atlas, (tile + fract(tile_uv.xy)) / atlas_grid) * light;
+}
+"""
+
+
+def _compile_atlas_program():
+    """Собрать шейдер атласа, вернуть None если драйвер его не поддерживает"""
+    try:
+        return shaders.compileProgram(
+            shaders.compileShader(ATLAS_VERTEX_SHADER, GL_VERTEX_SHADER),
+            shaders.compileShader(ATLAS_FRAGMENT_SHADER, GL_FRAGMENT_SHADER),
+        )
+    except Exception as error:
+        if settings.DEBUG_MODE:
+            print(f"Шейдер атласа недоступен: {error}")
+        return None
+
+
+def _set_vertex_pointers(base):
+    """Указать OpenGL, где лежат атрибуты вершин (base - адрес или смещение в VBO)"""
+    glVertexPointer(3, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(base))
+    # Третья координата текстуры - номер клетки атласа
+    glTexCoordPointer(3, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(base + UV_OFFSET))
+    glNormalPointer(GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(base + NORMAL_OFFSET))
+    # Свет запечен в цвет вершины
+    glColorPointer(3, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(base + COLOR_OFFSET))
+
+
+def _enable_arrays():
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+    glEnableClientState(GL_NORMAL_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+
+
+def _disable_arrays():
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_NORMAL_ARRAY)
+    glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+
+def _to_atlas_vertices(mesh, atlas):
+    """Копия вершин с координатами атласа для фиксированного конвейера"""
+    vertices = mesh.vertices.copy()
+    vertices[:, 3:5] = atlas.to_atlas_uvs(vertices[:, 3:5], vertices[:, 5])
+    return vertices
+
+
+class DisplayListRenderer:
+    """Запасной путь: геометрия каждого чанка записывается в свой display list"""
+
+    # Без шейдера текстуру нельзя повторять внутри клетки атласа
+    supports_tiling = False
+
+    def __init__(self, atlas):
+        self.atlas = atlas
+        if atlas.texture_id is None:
+            atlas.upload()
+        self.display_lists = {}
+
+    def update_chunk(self, key, mesh):
+        """Перезаписать геометрию чанка (mesh - ChunkMesh или None для пустого чанка)"""
+        if mesh is None:
+            self.remove_chunk(key)
+            return
+
+        display_list = self.display_lists.get(key)
+        if display_list is None:
+            display_list = glGenLists(1)
+            self.display_lists[key] = display_list
+
+        # Клиентские массивы разыменовываются при компиляции списка
+        vertices = _to_atlas_vertices(mesh, self.atlas)
+        glNewList(display_list, GL_COMPILE)
+        _enable_arrays()
+        _set_vertex_pointers(vertices.ctypes.data)
+        glDrawElements(GL_TRIANGLES, len(mesh.indices), GL_UNSIGNED_INT, mesh.indices)
+        _disable_arrays()
+        glEndList()
+
+    def remove_chunk(self, key):
+        display_list = self.display_lists.pop(key, None)
+        if display_list is not None:
+            glDeleteLists(display_list, 1)
+
+    def chunk_keys(self):
+        return list(self.display_lists)
+
+    def draw(self, keys):
+        """Нарисовать чанки из списка keys"""
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.atlas.texture_id)
+        for key in keys:
+            glCallList(self.display_lists[key])
+        glDisable(GL_TEXTURE_2D)
+        # После массива цветов текущий цвет не определен
+        glColor3f(1.0, 1.0, 1.0)
+
+
+class VBORenderer:
+    """Геометрия каждого чанка хранится в своих вершинном и индексном буферах"""
+
+    def __init__(self, atlas):
+        self.atlas = atlas
+        if atlas.texture_id is None:
+            atlas.upload()
+        self.program = _compile_atlas_program()
+        self.supports_tiling = self.program is not None
+        # Ключ чанка -> (vbo, ibo, число индексов)
+        self.buffers = {}
+
+    @staticmethod
+    def is_supported():
+        return bool(glGenBuffers) and bool(glBufferData)
+
+    def update_chunk(self, key, mesh):
+        """Загрузить геометрию чанка одним вызовом на буфер"""
+        if mesh is None:
+            self.remove_chunk(key)
+            return
+
+        entry = self.buffers.get(key)
+        if entry is None:
+            vbo, ibo = glGenBuffers(2)
+        else:
+            vbo, ibo, _ = entry
+
+        vertices = mesh.vertices if self.program is not None else _to_atlas_vertices(mesh, self.atlas)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, mesh.indices.nbytes, mesh.indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        self.buffers[key] = (vbo, ibo, len(mesh.indices))
+
+    def remove_chunk(self, key):
+        entry = self.buffers.pop(key, None)
+        if entry is not None:
+            glDeleteBuffers(2, [entry[0], entry[1]])
+
+    def chunk_keys(self):
+        return list(self.buffers)
+
+    def draw(self, keys):
+        """Нарисовать чанки из списка keys"""
+        glEnable(GL_TEXTURE_2D)
+        # Одна привязка текстуры на весь мир
+        glBindTexture(GL_TEXTURE_2D, self.atlas.texture_id)
+        if self.program is not None:
+            glUseProgram(self.program)
+            glUniform1i(glGetUniformLocation(self.program, "atlas"), 0)
+            glUniform2f(glGetUniformLocation(self.program, "atlas_grid"), self.atlas.columns, self.atlas.rows)
+        _enable_arrays()
+        for key in keys:
+            vbo, ibo, count = self.buffers[key]
+            glBindBuffer(GL_ARRAY_BUFFER, vbo)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ibo)
+            _set_vertex_pointers(0)
+            glDrawElements(GL_TRIANGLES, count, GL_UNSIGNED_INT, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        _disable_arrays()
+        if self.program is not None:
+            glUseProgram(0)
+        glDisable(GL_TEXTURE_2D)
+        glColor3f(1.0, 1.0, 1.0)
+
+
+class NullRenderer:
+    """Бэкенд без OpenGL: запоминает только, у каких чанков есть геометрия и ее размер.
+
+    Нужен для запуска без окна и видеокарты - мешинг и отсечение работают как обычно.
+    """
+
+    supports_tiling = True
+
+    def __init__(self, atlas):
+        self.atlas = atlas
+        # Ключ чанка -> число индексов
+        self.index_counts = {}
+
+    def update_chunk(self, key, mesh):
+        if mesh is None:
+            self.remove_chunk(key)
+            return
+        self.index_counts[key] = len(mesh.indices)
+
+    def remove_chunk(self, key):
+        self.index_counts.pop(key, None)
+
+    def chunk_keys(self):
+        return list(self.index_counts)
+
+    def draw(self, keys):
+        # Сколько чанков нарисовано, считает World.culling_stats
+        pass
+
+
+def create_renderer(atlas, backend=None):
+    """Выбрать бэкенд отрисовки (по умолчанию settings.RENDER_BACKEND)"""
+    if backend is None:
+        backend = getattr(settings, 'RENDER_BACKEND', "vbo")
+    if backend == "null":
+        return NullRenderer(atlas)
+    if backend == "vbo" and VBORenderer.is_supported():
+        return VBORenderer(atlas)
+    if backend == "vbo" and settings.DEBUG_MODE:
+        print("VBO не поддерживаются, используются display list")
+    return DisplayListRenderer(atlas)
@@ -0,0 +1,232 @@
+import argparse
+import math
+import multiprocessing
+import os
+import socket
+import time
+from collections import Counter, deque
+import numpy as np
+import settings
+from edits import ChangeSet
+from network import (CHUNK, DELTA, EDIT, POSITION, UNLOAD, WELCOME, Connection, KEY,
+                     decode_edits, decode_position, encode_chunk, encode_delta, encode_welcome, parse_address)
+from world import World
+
+# Авторитетный сервер мира: владеет World, принимает правки клиентов и раз в тик
+# рассылает каждому изменения тех чанков, которые у него есть. Клиент получает
+# только чанки вокруг своего игрока (область интереса): новые - целиком и сжатыми,
+# вышедшие из области - сообщением о выгрузке.
+
+
+class RemoteClient:
+    """Состояние одного подключенного клиента на сервере"""
+
+    def __init__(self, connection, position):
+        self.connection = connection
+        self.position = position
+        self.center = None
+        self.wanted = []   # Чанки области интереса, от ближних к дальним
+        self.sent = set()  # Чанки, которые есть у клиента
+        self.edit_seq = 0  # Номер последней примененной правки клиента
+        self.acked = 0     # Номер правки, подтвержденный в последней дельте
+
+
+class WorldServer:
+    """Мир для нескольких клиентов с фиксированным тиком (settings.TICK_RATE)"""
+
+    def __init__(self, address=None, world=None):
+        self.world = world if world is not None else World(server=True)
+        self.spawn = self.world.spawn_point(5 * settings.WORLD_SIZE, 5 * settings.WORLD_SIZE)
+        family, target = parse_address(settings.SERVER_ADDRESS if address is None else address)
+        self.socket_path = target if family == socket.AF_UNIX else None
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(target)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.clients = []
+        self.tick_number = 0
+        # Длительность последних тиков (секунды) и трафик отключившихся клиентов по типам сообщений
+        self.tick_times = deque(maxlen=settings.TICK_RATE * 60)
+        self.traffic = Counter()
+        self.last_save_time = time.time()
+
+    def run(self, ticks=None, stop_event=None):
+        """Крутить тики, пока не пройдет ticks тиков или не будет выставлен stop_event"""
+        dt = 1.0 / settings.TICK_RATE
+        next_tick = time.perf_counter()
+        try:
+            while (ticks is None or self.tick_number < ticks) and not (stop_event is not None and stop_event.is_set()):
+                self.tick()
+                next_tick += dt
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Тик не уложился в срок - не догоняем, как и FixedTimestep у клиента
+                    next_tick = time.perf_counter()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def tick(self):
+        start = time.perf_counter()
+        self._accept()
+
+        edits = []
+        for client in self.clients:
+            try:
+                edits.extend(self._receive(client))
+            except ValueError:
+                # Испорченное сообщение - отключаем только этого клиента
+                client.connection.close()
+        # Правки всех клиентов за тик - одна массовая правка (при повторе блока действует последняя)
+        changes = self.world.apply_edits(np.concatenate(edits)) if edits else ChangeSet()
+        # Сервер геометрию не строит
+        self.world.dirty_chunks.clear()
+
+        for client in self.clients:
+            # Сначала дельта: чанки, отправленные ниже, уже содержат правки этого тика
+            self._send_delta(client, changes)
+            self._stream(client)
+            client.connection.flush()
+        for client in [c for c in self.clients if c.connection.closed]:
+            self._disconnect(client)
+
+        # Держим в памяти области интереса всех клиентов, остальное вытесняется как обычно
+        self.world.active_chunks = set().union(*(client.wanted for client in self.clients))
+        self.world.evict_chunks()
+        self.world.compact_idle_chunks()
+        if time.time() - self.last_save_time >= settings.AUTOSAVE_INTERVAL:
+            self.world.save()
+            self.last_save_time = time.time()
+
+        self.tick_number += 1
+        self.tick_times.append(time.perf_counter() - start)
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except BlockingIOError:
+                return
+            client = RemoteClient(Connection(sock), self.spawn.copy())
+            client.connection.send(WELCOME, encode_welcome(settings.TICK_RATE, self.world.chunk_size,
+                                                           self.world.size_y, self.spawn))
+            self.clients.append(client)
+
+    def _receive(self, client):
+        """Разобрать пришедшие сообщения клиента: обновить позицию и вернуть его правки"""
+        batches = []
+        for kind, data in client.connection.receive():
+            if kind == POSITION:
+                client.position = decode_position(data)
+            elif kind == EDIT:
+                client.edit_seq, batch = decode_edits(data)
+                batches.append(batch)
+        return batches
+
+    def _send_delta(self, client, changes):
+        visible = {key: (indices, new) for key, (indices, _, new) in changes.changes.items() if key in client.sent}
+        # Пустая дельта нужна только для подтверждения правки клиента
+        if visible or client.edit_seq != client.acked:
+            client.connection.send(DELTA, encode_delta(self.tick_number, client.edit_seq, visible))
+            client.acked = client.edit_seq
+
+    def _stream(self, client):
+        """Отправить клиенту новые чанки его области интереса и выгрузить ушедшие"""
+        size = self.world.chunk_size
+        center = (math.floor(client.position[0]) // size, math.floor(client.position[2]) // size)
+        if center != client.center:
+            client.center = center
+            client.wanted = self.world.chunks_around(center)
+            keep = set(self.world.chunks_around(center, settings.RENDER_DISTANCE + 2 + settings.SERVER_UNLOAD_MARGIN))
+            for key in client.sent - keep:
+                client.connection.send(UNLOAD, KEY.pack(*key))
+                client.sent.discard(key)
+
+        # Медленному клиенту не копим очередь - подождем, пока он заберет отправленное
+        if len(client.connection.outgoing) > settings.SERVER_SEND_BUFFER_KB * 1024:
+            return
+        budget = settings.SERVER_CHUNKS_PER_TICK
+        for key in client.wanted:
+            if budget == 0:
+                break
+            if key in client.sent:
+                continue
+            chunk = self.world.chunks.get(key) or self.world.load_chunk(key)
+            client.connection.send(CHUNK, encode_chunk(key, chunk.blocks))
+            client.sent.add(key)
+            budget -= 1
+
+    def _disconnect(self, client):
+        self.traffic.update(client.connection.bytes_sent)
+        client.connection.close()
+        self.clients.remove(client)
+
+    def report_lines(self):
+        """Время тика и исходящий трафик по типам сообщений"""
+        lines = []
+        if self.tick_times:
+            times = np.array(self.tick_times) * 1000
+            lines.append("тик сервера p50/p95/max: {:.2f} / {:.2f} / {:.2f} мс".format(
+                np.percentile(times, 50), np.percentile(times, 95), times.max()))
+        traffic = self.traffic.copy()
+        for client in self.clients:
+            traffic.update(client.connection.bytes_sent)
+        if traffic:
+            seconds = max(self.tick_number, 1) / settings.TICK_RATE
+            lines.append(f"отправлено клиентам: {sum(traffic.values()) / 1024:.1f} КБ ("
+                         + ", ".join(f"{name} {count / 1024:.1f} КБ" for name, count in traffic.most_common())
+                         + f"), {sum(traffic.values()) / 1024 / seconds:.1f} КБ/с")
+        return lines
+
+    def close(self):
+        for client in list(self.clients):
+            client.connection.flush()
+            self._disconnect(client)
+        self.listener.close()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.world.close()
+
+
+def serve(address, stop_event=None, ticks=None):
+    """Запустить сервер и крутить его до остановки (цель для отдельного процесса)"""
+    server = WorldServer(address)
+    server.run(ticks, stop_event)
+    return server
+
+
+class LocalServer:
+    """Сервер мира в отдельном процессе на этой же машине"""
+
+    def __init__(self, address=None):
+        self.address = settings.SERVER_ADDRESS if address is None else address
+        # spawn, а не fork: дочернему процессу не нужны окно и OpenGL родителя
+        context = multiprocessing.get_context("spawn")
+        self.stop_event = context.Event()
+        self.process = context.Process(target=serve, args=(self.address, self.stop_event), daemon=True)
+        self.process.start()
+
+    def stop(self, timeout=10.0):
+        """Остановить сервер (он сохранит мир) и дождаться процесса"""
+        self.stop_event.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сервер мира Pyvoxels")
+    parser.add_argument("--address", default=settings.SERVER_ADDRESS, help="\"хост:порт\" или \"unix:/путь\"")
+    parser.add_argument("--ticks", type=int, help="остановиться после стольких тиков")
+    args = parser.parse_args()
+    server = WorldServer(args.address)
+    print(f"Сервер слушает {args.address}")
+    server.run(args.ticks)
+    print("\n".join(server.report_lines()))
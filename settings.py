@@ -3,22 +3,82 @@
 # Параметры графики
 WINDOW_WIDTH = 1280
 WINDOW_HEIGHT = 720
-FPS = 60
+FPS = 60             # Ограничение частоты кадров (0 - без ограничения)
+FOV = 70             # Угол обзора по вертикали в градусах
+NEAR_PLANE = 0.1
+FAR_PLANE_MARGIN = 32  # Дальняя плоскость отсечения: RENDER_DISTANCE * CHUNK_SIZE плюс столько блоков
+SUN_DIRECTION = [0.3, 1.0, 0.5]  # Направление на солнце (затенение граней, запекается в вершины)
+RENDER_BACKEND = "vbo"  # "vbo", "display_list" (запасной путь для старых драйверов) или "null" (без OpenGL)
 
-# Параметры управления
+# Симуляция идет фиксированными тиками независимо от частоты кадров
+TICK_RATE = 60             # Тиков симуляции в секунду
+MAX_TICKS_PER_FRAME = 5    # Больше тиков за кадр не догоняем, отставание отбрасывается
+
+# Параметры управления (скорости - в блоках за тик)
 MOUSE_SENSITIVITY = 0.15
 PLAYER_SPEED = 0.05
 SPRINT_SPEED = PLAYER_SPEED * 2
 FLY_SPEED = 0.1
 
-# Физика
+# Физика (за тик)
 GRAVITY = 0.01
 JUMP_STRENGTH = 0.2
 
 # Параметры мира
 WORLD_SIZE = 4
-RENDER_DISTANCE = 8  # Дистанция отрисовки в блоках
+RENDER_DISTANCE = 8  # Дистанция отрисовки в чанках
 CHUNK_SIZE = 16      # Размер чанка в блоках
+WORLD_HEIGHT = 64    # Высота мира в блоках (по X и Z мир бесконечен)
+
+# Генерация ландшафта
+WORLD_SEED = 1337
+TERRAIN_TYPE = "hills"     # "hills" или "flat" (два плоских слоя, как в старом мире)
+TERRAIN_BASE_HEIGHT = 16   # Средняя высота поверхности
+TERRAIN_AMPLITUDE = 10     # Насколько холмы выше/ниже средней высоты
+TERRAIN_SCALE = 48         # Размер холмов в блоках
+TERRAIN_DIRT_DEPTH = 3     # Толщина слоя земли
+
+# Подгрузка чанков
+CHUNK_LOAD_BUDGET_MS = 4.0  # Сколько времени кадра можно тратить на генерацию чанков
+CHUNK_CACHE_MB = 64         # Сколько памяти могут занимать загруженные чанки
+CHUNK_STORAGE = "palette"   # "palette" - сжатые блоки с палитрой, "dense" - массив байт на блок
+CHUNK_COMPACT_DELAY = 5.0   # Через сколько секунд без изменений редактируемый чанк снова сжимается
+
+# Запуск: пока чанки вокруг игрока не готовы, игра стоит на экране загрузки
+LOADING_RADIUS = 2          # Радиус в чанках, который должен быть построен до начала игры
+LOADING_BUDGET_MS = 40.0    # Время кадра на подгрузку и мешинг во время загрузки
+
+# Сохранение мира
+SAVE_DIR = "saves/world"    # Папка с файлами регионов (None - не сохранять)
+AUTOSAVE_INTERVAL = 30      # Интервал автосохранения в секундах
+
+# Описания типов блоков: имя, текстуры граней (файлы из textures/), свойства
+BLOCKS_FILE = "blocks.json"
+
+# Построение геометрии чанков (в фоне)
+GREEDY_MESHING = False       # Объединять соседние грани одного блока в большие прямоугольники
+MESH_WORKERS = 2             # Число потоков/процессов мешера (0 - строить в главном потоке)
+MESH_POOL = "thread"         # "thread" или "process"
+MESH_UPLOAD_BUDGET_MS = 4.0  # Сколько времени кадра можно тратить на загрузку мешей
+MESH_CACHE_DIR = "saves/mesh_cache"  # Геометрия чанков между запусками (None - не кэшировать)
+MESH_CACHE_MB = 256                  # Предел размера кэша, старые записи вытесняются
+
+# Уровни детализации: дальше LOD_DISTANCES[i] чанков геометрия строится из сетки в 2 ** (i + 1) раз грубее
+LOD_DISTANCES = (4, 8, 16)
+LOD_HYSTERESIS = 0.5  # Запас в чанках при смене уровня, чтобы чанки на границе не переключались туда-обратно
+
+# Отсечение чанков
+OCCLUSION_CULLING = True  # Не рисовать чанки, которые не видно через воздух от чанка камеры
+
+# Освещение (уровни 0..15, запекаются в цвета вершин)
+AMBIENT_OCCLUSION = True      # Затенять углы у примыкающих блоков
+LIGHT_BUDGET_MS = 4.0         # Сколько времени кадра можно тратить на расчет света новых колонн
+
+# Сервер мира (server.py) и подключение к нему (main.py --connect / --local-server)
+SERVER_ADDRESS = "127.0.0.1:25565"  # "хост:порт" или "unix:/путь/к/сокету"
+SERVER_CHUNKS_PER_TICK = 16         # Сколько новых чанков за тик отправлять одному клиенту
+SERVER_SEND_BUFFER_KB = 1024        # Пока у клиента столько неотправленных данных, новые чанки ему не шлем
+SERVER_UNLOAD_MARGIN = 1            # Запас в чанках, после которого чанк выходит из области интереса клиента
 
 # Параметры игрока
 PLAYER_HEIGHT = 1.8  # Высота игрока в блоках
@@ -31,3 +91,9 @@ INTERACTION_DISTANCE = 5.0  # Максимальное расстояние дл
 # Отладка
 DEBUG_MODE = False   # Режим отладки
 SHOW_FPS = True      # Показывать FPS
+
+# Профилировщик кадров (F9 - сохранить трассу в PROFILER_TRACE_PATH)
+PROFILER_ENABLED = False
+PROFILER_FRAMES = 600                     # Сколько последних кадров хранить
+PROFILER_TRACE_PATH = "profile_trace.json"  # Файл для chrome://tracing или Perfetto
+STARTUP_REGRESSION_TOLERANCE = 0.25       # Насколько фаза запуска может замедлиться относительно базового замера
@@ -0,0 +1,81 @@
+from functools import lru_cache
+import numpy as np
+import settings
+
+
+def _lattice_values(ix, iz, seed):
+    """Псевдослучайное значение [0, 1] в каждом узле целочисленной сетки"""
+    h = (ix.astype(np.int64) * 374761393 + iz.astype(np.int64) * 668265263 + seed * 1442695041) & 0xFFFFFFFF
+    h = ((h ^ (h >> 13)) * 1274126177) & 0xFFFFFFFF
+    h ^= h >> 16
+    return h / 0xFFFFFFFF
+
+
+def value_noise(x, z, seed):
+    """Гладкий value noise для массивов координат x, z"""
+    x0, z0 = np.floor(x), np.floor(z)
+    tx, tz = x - x0, z - z0
+    # Сглаживание, чтобы не было изломов на границах клеток
+    tx = tx * tx * (3 - 2 * tx)
+    tz = tz * tz * (3 - 2 * tz)
+    ix, iz = x0.astype(np.int64), z0.astype(np.int64)
+
+    v00 = _lattice_values(ix, iz, seed)
+    v10 = _lattice_values(ix + 1, iz, seed)
+    v01 = _lattice_values(ix, iz + 1, seed)
+    v11 = _lattice_values(ix + 1, iz + 1, seed)
+    top = v00 + (v10 - v00) * tx
+    bottom = v01 + (v11 - v01) * tx
+    return top + (bottom - top) * tz
+
+
+def fractal_noise(x, z, seed, octaves=4):
+    """Сумма нескольких октав value noise, результат в [0, 1]"""
+    total = np.zeros(np.broadcast(x, z).shape)
+    amplitude, frequency, norm = 1.0, 1.0, 0.0
+    for octave in range(octaves):
+        total += value_noise(x * frequency, z * frequency, seed + octave) * amplitude
+        norm += amplitude
+        amplitude *= 0.5
+        frequency *= 2
+    return total / norm
+
+
+class TerrainGenerator:
+    """Детерминированная генерация чанков по сиду"""
+
+    def __init__(self, seed=None, kind=None):
+        self.seed = settings.WORLD_SEED if seed is None else seed
+        self.kind = settings.TERRAIN_TYPE if kind is None else kind
+
+    def height_map(self, x0, z0, size_x, size_z):
+        """Высота поверхности (первый блок воздуха) для прямоугольника колонн"""
+        if self.kind == "flat":
+            # Старый мир: камень на уровне 0, земля на уровне 1
+            return np.full((size_x, size_z), 2, dtype=np.int32)
+        x = (x0 + np.arange(size_x))[:, None] / settings.TERRAIN_SCALE
+        z = (z0 + np.arange(size_z))[None, :] / settings.TERRAIN_SCALE
+        noise = fractal_noise(x, z, self.seed)
+        heights = settings.TERRAIN_BASE_HEIGHT + (noise - 0.5) * 2 * settings.TERRAIN_AMPLITUDE
+        return np.clip(heights.astype(np.int32), 1, settings.WORLD_HEIGHT - 1)
+
+    def height_at(self, x, z):
+        return int(self.height_map(x, z, 1, 1)[0, 0])
+
+    @lru_cache(maxsize=1024)
+    def column_heights(self, cx, cz, size):
+        """Карта высот колонны чанков (общая для всех чанков колонны)"""
+        heights = self.height_map(cx * size, cz * size, size, size)
+        heights.flags.writeable = False
+        return heights
+
+    def generate_chunk(self, cx, cy, cz, size):
+        """Заполнить массив блоков чанка: земля сверху, камень под ней"""
+        heights = self.column_heights(cx, cz, size)[:, None, :]
+        y = (cy * size + np.arange(size))[None, :, None]
+        dirt_depth = 1 if self.kind == "flat" else settings.TERRAIN_DIRT_DEPTH
+
+        blocks = np.zeros((size, size, size), dtype=np.uint8)
+        blocks[y < heights] = 2                                  # Камень
+        blocks[(y < heights) & (y >= heights - dirt_depth)] = 1  # Земля
+        return blocks
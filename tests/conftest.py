@@ -0,0 +1,31 @@
+import os
+import sys
+import pytest
+
+# Модули игры лежат в корне репозитория, а blocks.json и текстуры читаются
+# относительно текущей папки - тесты запускаются из корня
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+@pytest.fixture
+def headless_settings(monkeypatch):
+    """Игра без окна, без сохранения и кэша мешей"""
+    import settings
+
+    monkeypatch.setattr(settings, "SAVE_DIR", None)
+    monkeypatch.setattr(settings, "MESH_CACHE_DIR", None)
+
+
+@pytest.fixture
+def world(headless_settings, monkeypatch):
+    """Освещенный мир без сохранения и рендерера вокруг колонны (0, 0)"""
+    import settings
+    from world import World
+
+    monkeypatch.setattr(settings, "RENDER_DISTANCE", 2)
+    world = World(seed=1, backend="null")
+    world.update_streaming((8, 0, 8), float("inf"))
+    yield world
+    world.close()
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from chunk import Chunk, PalettedBlocks
+
+SHAPE = (16, 16, 16)
+
+
+@pytest.mark.parametrize("palette_size", [1, 2, 3, 4, 5, 16, 17, 200, 256])
+def test_palette_round_trip(palette_size):
+    rng = np.random.default_rng(palette_size)
+    types = rng.choice(256, palette_size, replace=False).astype(np.uint8)
+    dense = types[rng.integers(0, palette_size, SHAPE)]
+    dense.reshape(-1)[:palette_size] = types  # Каждый тип палитры встречается
+
+    packed = PalettedBlocks.from_dense(dense)
+    assert len(packed.palette) == palette_size
+    assert packed.bits == PalettedBlocks.bits_for(palette_size)
+    assert packed.packed.nbytes == np.prod(SHAPE) * packed.bits // 8
+    assert np.array_equal(packed.to_dense(), dense)
+
+    lx, ly, lz = rng.integers(0, 16, (3, 100))
+    assert np.array_equal(packed.get_many(lx, ly, lz), dense[lx, ly, lz])
+    for x, y, z in zip(lx[:10], ly[:10], lz[:10]):
+        assert packed.get(x, y, z) == dense[x, y, z]
+
+
+def test_compact_chunk_edits():
+    chunk = Chunk(0, 0, 0, size=16)
+    blocks = np.zeros(SHAPE, dtype=np.uint8)
+    blocks[:, :8] = 2
+    chunk.blocks = blocks.copy()
+    chunk.compact()
+    assert chunk.storage_kind == "palette"
+    assert chunk.nbytes < blocks.nbytes
+
+    # Правка сжатого чанка разворачивает его и возвращает прежние типы
+    indices = np.array([0, 100, 4095], dtype=np.uint16)
+    old = chunk.set_many(indices, np.array([5, 5, 5], dtype=np.uint8))
+    assert np.array_equal(old, blocks.reshape(-1)[indices])
+    blocks.reshape(-1)[indices] = 5
+    assert chunk.storage_kind == "dense"
+    chunk.compact()
+    assert np.array_equal(chunk.blocks, blocks)
+
+
+def test_uniform_chunk_stores_only_palette():
+    chunk = Chunk(0, 0, 0, size=16)
+    chunk.blocks = np.full(SHAPE, 2, dtype=np.uint8)
+    chunk.compact()
+    assert chunk.storage_kind == "uniform"
+    assert chunk.nbytes == 1
+    assert not chunk.is_empty()
+    assert chunk.get_local(3, 4, 5) == 2
@@ -0,0 +1,22 @@
+import numpy as np
+
+
+def blocks_of(world, keys):
+    return {key: world.chunks[key].blocks.copy() for key in keys}
+
+
+def test_revert_restores_blocks_and_can_be_redone(world):
+    surface = int(world.spawn_point(8, 8)[1])
+    before = blocks_of(world, list(world.chunks))
+    change_set = world.fill_box((-4, surface - 3, -4), (20, surface + 3, 20), 5)
+    assert change_set
+    after = blocks_of(world, change_set.chunks)
+
+    undo = world.revert(change_set)
+    assert len(undo) == len(change_set)
+    for key, blocks in blocks_of(world, change_set.chunks).items():
+        assert np.array_equal(blocks, before[key])
+
+    world.revert(undo)
+    for key, blocks in blocks_of(world, change_set.chunks).items():
+        assert np.array_equal(blocks, after[key])
@@ -0,0 +1,36 @@
+import pytest
+import settings
+from main import Game
+
+
+@pytest.mark.parametrize("render_distance", [1, 2, 3, 4])
+def test_loading_finishes_at_small_render_distance(headless_settings, monkeypatch, render_distance):
+    monkeypatch.setattr(settings, "RENDER_DISTANCE", render_distance)
+    game = Game(headless=True)
+    game.run(frames=400, until_loaded=True)
+    assert not game.loading
+    assert game.frame < 400
+
+
+def test_scripted_session_edits_world(headless_settings, monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_DISTANCE", 3)
+    # Кадры сценария считаются с конца загрузки мира
+    script = [
+        (0, "mouse_move", (0, 300)),  # Взгляд вниз, на землю под ногами
+        (2, "click", 1),
+        (4, "click", 3),
+        (6, "key_down", "w"),
+        (20, "key_up", "w"),
+        (22, "key_down", "2"),
+        (23, "key_up", "2"),
+        (25, "click", 3),
+        (30, "quit", None),
+    ]
+    game = Game(headless=True, script=script)
+    game.run(frames=1000)
+    assert not game.loading
+    assert game.input.finished
+    assert game.player.selected_block == 2
+    assert game.world.unsaved_chunks
+    stats = game.world.culling_stats
+    assert stats.drawn > 0
@@ -0,0 +1,35 @@
+
+AIR, STONE, GLOWSTONE, GLASS = 0, 2, 3, 6
+
+
+def central_light(world):
+    """Свет колонн 3x3 вокруг (0, 0): все, от чего он зависит, загружено и освещено"""
+    return {key: chunk.light.copy() for key, chunk in world.chunks.items()
+            if abs(key[0]) <= 1 and abs(key[2]) <= 1}
+
+
+def test_incremental_light_matches_fresh_pass(world):
+    size = world.chunk_size
+    surface = int(world.spawn_point(8, 8)[1])
+    # Отдельные блоки: светокамень под землей и на поверхности, крыша, яма до светокамня
+    world.set_block(4, surface - 6, 4, GLOWSTONE)
+    world.set_block(10, surface + 2, 6, GLOWSTONE)
+    world.set_block(10, surface + 4, 6, STONE)
+    for y in range(surface - 5, surface + 1):
+        world.set_block(4, y, 4, AIR)
+    # Массовые правки: пещера (пересчет области), стеклянный навес и немного блоков поблочно
+    world.fill_box((-12, surface - 10, -6), (12, surface - 3, 10), AIR)
+    world.fill_box((-10, surface + 6, -10), (6, surface + 7, 6), GLASS)
+    world.fill_box((-10, surface + 8, -10), (6, surface + 9, 6), STONE)
+    world.fill_box((size - 2, surface - 8, 2), (size + 1, surface - 7, 5), GLOWSTONE)
+    incremental = central_light(world)
+
+    for chunk in world.chunks.values():
+        chunk.light = None
+    world.lighting.lit_columns.clear()
+    world.update_lighting(float("inf"))
+    fresh = central_light(world)
+
+    assert incremental.keys() == fresh.keys()
+    differing = sum(int((incremental[key] != fresh[key]).sum()) for key in fresh)
+    assert differing == 0
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from blocks import registry
+from mesher import FACE_DIRECTIONS, build_chunk_mesh, combine_faces, visible_faces
+from textures import TextureAtlas
+
+BLOCK_TEXTURES = registry.texture_lookup(TextureAtlas.load())
+
+
+def random_padded(seed, size=8):
+    """Блоки чанка с рамкой: воздух, земля, камень, стекло и листва вперемешку"""
+    rng = np.random.default_rng(seed)
+    return rng.choice(np.array([0, 0, 1, 2, 6, 7], dtype=np.uint8), (size + 2,) * 3)
+
+
+def naive_face_count(padded, face):
+    """Число видимых граней face - проверкой соседа у каждого блока по очереди"""
+    dx, dy, dz = FACE_DIRECTIONS[face]
+    count = 0
+    for x, y, z in np.ndindex(*(n - 2 for n in padded.shape)):
+        block = padded[x + 1, y + 1, z + 1]
+        neighbour = padded[x + 1 + dx, y + 1 + dy, z + 1 + dz]
+        if block and registry.transparent[neighbour] and neighbour != block:
+            count += 1
+    return count
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_face_count_matches_naive_loop(seed):
+    padded = random_padded(seed)
+    meshes = build_chunk_mesh(padded, BLOCK_TEXTURES)
+    for face in FACE_DIRECTIONS:
+        expected = naive_face_count(padded, face)
+        assert visible_faces(padded, face).sum() == expected
+        mesh = meshes[face]
+        assert len(mesh.textures) == expected
+        assert mesh.positions.shape == (4 * expected, 3)
+        assert mesh.uvs.shape == (4 * expected, 2)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_greedy_mesh_covers_the_same_faces(seed):
+    padded = random_padded(seed)
+    meshes = build_chunk_mesh(padded, BLOCK_TEXTURES, greedy=True)
+    for face in FACE_DIRECTIONS:
+        corners = meshes[face].positions.reshape(-1, 4, 3)
+        # Площадь каждого прямоугольника - произведение длин двух его сторон
+        area = (np.linalg.norm(corners[:, 1] - corners[:, 0], axis=1)
+                * np.linalg.norm(corners[:, 3] - corners[:, 0], axis=1)).sum()
+        assert area == pytest.approx(naive_face_count(padded, face))
+
+
+def test_empty_and_buried_chunks_have_no_mesh():
+    assert combine_faces(build_chunk_mesh(np.zeros((10, 10, 10), dtype=np.uint8), BLOCK_TEXTURES)) is None
+    assert combine_faces(build_chunk_mesh(np.full((10, 10, 10), 2, dtype=np.uint8), BLOCK_TEXTURES)) is None
@@ -0,0 +1,45 @@
+import numpy as np
+from raycast import raycast, raycast_batch
+
+
+class GridWorld:
+    """Мир из одного массива блоков; вне массива - воздух"""
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.size_y = blocks.shape[1]
+
+    def get_block(self, x, y, z):
+        return int(self.get_blocks([(x, y, z)])[0])
+
+    def get_blocks(self, positions):
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3)
+        inside = np.all((positions >= 0) & (positions < self.blocks.shape), axis=1)
+        result = np.zeros(len(positions), dtype=np.uint8)
+        result[inside] = self.blocks[tuple(positions[inside].T)]
+        return result
+
+
+def test_batch_matches_single_rays():
+    rng = np.random.default_rng(11)
+    blocks = np.where(rng.random((24, 16, 24)) < 0.04, 1, 0).astype(np.uint8)
+    world = GridWorld(blocks)
+    origins = rng.uniform((-2, -2, -2), (26, 18, 26), (200, 3))
+    directions = rng.normal(size=(200, 3))
+    # Лучи вдоль осей и в плоскостях осей - нулевые компоненты направления
+    directions[:20] *= np.eye(3)[rng.integers(0, 3, 20)]
+    directions[20:40, rng.integers(0, 3)] = 0
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    max_distance = 12.0
+
+    hit, cells, normals, distances = raycast_batch(world, origins, directions, max_distance)
+    assert 0 < hit.sum() < len(hit)
+    for i in range(len(origins)):
+        single = raycast(world, origins[i], directions[i], max_distance)
+        assert hit[i] == (single is not None)
+        if single is not None:
+            assert tuple(cells[i]) == single.block
+            assert tuple(normals[i]) == single.normal
+            assert np.isclose(distances[i], single.distance)
+        else:
+            assert distances[i] == np.inf
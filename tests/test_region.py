@@ -0,0 +1,31 @@
+import numpy as np
+from region import REGION_SIZE, RegionStorage
+
+CHUNK_SIZE = 16
+
+
+def test_saved_chunks_survive_closing_idle_regions(tmp_path):
+    storage = RegionStorage(str(tmp_path), CHUNK_SIZE, max_open_files=1)
+    rng = np.random.default_rng(0)
+    keys = [(i * REGION_SIZE, 0, 0) for i in range(4)]
+    try:
+        # Две версии каждого чанка вперемешку: регионы постоянно вытесняют друг друга,
+        # пока фоновый поток в них пишет
+        for version in range(2):
+            saved = {key: rng.integers(0, 8, (CHUNK_SIZE,) * 3, dtype=np.uint8) for key in keys}
+            for key, blocks in saved.items():
+                storage.save({key: blocks})
+                storage.load(keys[0])
+        storage.flush()
+        assert len(storage.regions) == len(keys)
+        for key, blocks in saved.items():
+            assert np.array_equal(storage.load(key), blocks)
+    finally:
+        storage.close()
+
+    storage = RegionStorage(str(tmp_path), CHUNK_SIZE)
+    try:
+        for key, blocks in saved.items():
+            assert np.array_equal(storage.load(key), blocks)
+    finally:
+        storage.close()
@@ -0,0 +1,106 @@
+import os
+import socket
+import threading
+import time
+import numpy as np
+import pytest
+import settings
+from client import WorldClient
+from network import EDIT, HEADER, MAX_MESSAGE_SIZE, POSITION
+from server import WorldServer
+from world import World
+
+TICKS = 90
+# Последние тики правок не шлем, чтобы успели прийти их дельты
+EDIT_TICKS = TICKS - 30
+
+
+@pytest.fixture
+def small_world(monkeypatch):
+    """Мир без сохранения и кэша мешей, с небольшой областью интереса"""
+    monkeypatch.setattr(settings, "SAVE_DIR", None)
+    monkeypatch.setattr(settings, "MESH_CACHE_DIR", None)
+    monkeypatch.setattr(settings, "RENDER_DISTANCE", 2)
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="нужны Unix-сокеты")
+def test_replicas_match_server(small_world, tmp_path):
+    address = "unix:" + os.path.join(tmp_path, "world.sock")
+    server = WorldServer(address)
+    thread = threading.Thread(target=server.run, kwargs={"ticks": TICKS})
+    thread.start()
+    try:
+        clients = [WorldClient(address, World(remote=True, backend="null")) for _ in range(2)]
+        position = server.spawn.copy()
+        rng = np.random.default_rng(0)
+        edits = 0
+        while thread.is_alive():
+            for client in clients:
+                if server.tick_number < EDIT_TICKS and rng.random() < 0.5:
+                    # Оба клиента правят одни и те же блоки - побеждает последняя правка на сервере
+                    for dx, dy, dz, block_type in rng.integers(-4, 5, (8, 4)).tolist():
+                        client.set_block(int(position[0]) + dx, int(position[1]) + dy, int(position[2]) + dz,
+                                         abs(block_type) % 4)
+                        edits += 1
+                client.update(position)
+            time.sleep(0.005)
+    finally:
+        thread.join()
+    for client in clients:
+        # Забрать то, что сервер успел отправить перед закрытием
+        client.update(position)
+        client.close()
+
+    assert edits > 0
+    assert len(server.tick_times) == TICKS
+    for client in clients:
+        assert client.world.chunks
+        for key, chunk in client.world.chunks.items():
+            assert np.array_equal(chunk.blocks, server.world.chunks[key].blocks), key
+        assert client.latencies
+        assert client.connection.bytes_received["chunk"] > 0
+        assert client.connection.bytes_received["delta"] > 0
+        assert client.connection.bytes_sent["edit"] > 0
+        assert len(client.report_lines()) == 2
+    assert server.traffic["chunk"] > 0 and server.traffic["delta"] > 0
+    assert len(server.report_lines()) == 2
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="нужны Unix-сокеты")
+@pytest.mark.parametrize("message", [
+    HEADER.pack(EDIT, 7) + bytes(7),                      # Правки не кратны размеру записи
+    HEADER.pack(POSITION, 4) + bytes(4),                  # Короткая позиция
+    HEADER.pack(POSITION, 12) + b"\x00\x00\xc0\x7f" * 3,  # NaN в позиции
+    HEADER.pack(EDIT, MAX_MESSAGE_SIZE + 1),              # Слишком длинное сообщение
+])
+def test_malformed_message_disconnects_only_sender(small_world, tmp_path, message):
+    address = "unix:" + os.path.join(tmp_path, "world.sock")
+    server = WorldServer(address)
+    stop = threading.Event()
+    thread = threading.Thread(target=server.run, kwargs={"stop_event": stop})
+    thread.start()
+
+    def wait_for(condition):
+        deadline = time.perf_counter() + 5.0
+        while not condition() and time.perf_counter() < deadline:
+            client.update(server.spawn)
+            time.sleep(0.005)
+        return condition()
+
+    try:
+        client = WorldClient(address, World(remote=True, backend="null"))
+        bad = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        bad.connect(address[len("unix:"):])
+        assert wait_for(lambda: len(server.clients) == 2)
+        bad.sendall(message)
+        assert wait_for(lambda: len(server.clients) == 1)
+        # Оставшийся клиент обслуживается как обычно
+        client.set_block(int(server.spawn[0]), int(server.spawn[1]), int(server.spawn[2]), 2)
+        assert wait_for(lambda: client.latencies)
+        assert client.connected and client.world.chunks
+        assert thread.is_alive()
+        bad.close()
+        client.close()
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,60 @@
+import math
+import os
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+
+class TextureAtlas:
+    """Все текстуры блоков из одной папки, упакованные сеткой в одну текстуру"""
+
+    def __init__(self, names, pixels, tile_size, columns, rows):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        self.pixels = pixels
+        self.tile_size = tile_size
+        self.columns = columns
+        self.rows = rows
+        self.texture_id = None
+
+    @classmethod
+    def load(cls, directory="textures"):
+        """Прочитать все .png из папки и разложить их по клеткам атласа"""
+        files = sorted(f for f in os.listdir(directory) if f.lower().endswith(".png"))
+        if not files:
+            raise FileNotFoundError(f"В папке {directory} нет текстур")
+        surfaces = [pygame.image.load(os.path.join(directory, f)) for f in files]
+        tile_size = max(max(surface.get_size()) for surface in surfaces)
+
+        columns = math.ceil(math.sqrt(len(files)))
+        rows = math.ceil(len(files) / columns)
+        pixels = np.zeros((rows * tile_size, columns * tile_size, 4), dtype=np.uint8)
+        for i, surface in enumerate(surfaces):
+            if surface.get_size() != (tile_size, tile_size):
+                surface = pygame.transform.scale(surface, (tile_size, tile_size))
+            # Строки идут снизу вверх, как ожидает OpenGL
+            data = pygame.image.tostring(surface, "RGBA", True)
+            tile = np.frombuffer(data, dtype=np.uint8).reshape(tile_size, tile_size, 4)
+            row, column = divmod(i, columns)
+            pixels[row * tile_size:(row + 1) * tile_size, column * tile_size:(column + 1) * tile_size] = tile
+
+        names = tuple(os.path.splitext(f)[0] for f in files)
+        return cls(names, pixels, tile_size, columns, rows)
+
+    def upload(self):
+        """Создать текстуру OpenGL из атласа"""
+        height, width = self.pixels.shape[:2]
+        self.texture_id = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, self.pixels)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        return self.texture_id
+
+    def to_atlas_uvs(self, uvs, layers):
+        """Перевести координаты внутри клетки [0, 1] в координаты атласа"""
+        layers = np.asarray(layers).astype(np.int32)
+        tiles = np.stack([layers % self.columns, layers // self.columns], axis=1)
+        return ((tiles + uvs) / (self.columns, self.rows)).astype(np.float32)
@@ -0,0 +1,42 @@
+import time
+
+
+class FixedTimestep:
+    """Накопитель времени для симуляции с фиксированным шагом.
+
+    advance() говорит, сколько тиков нужно выполнить за прошедшее время,
+    alpha - доля следующего тика, уже прошедшая к моменту отрисовки
+    (для интерполяции между двумя последними состояниями).
+    """
+
+    def __init__(self, tick_rate, max_ticks):
+        self.dt = 1.0 / tick_rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        self.last_time = None
+        self.ticks = 0
+        # Сколько времени симуляции отброшено, чтобы не уйти в бесконечное догоняние
+        self.dropped_time = 0.0
+
+    def advance(self, now=None):
+        """Учесть время с прошлого вызова и вернуть число тиков для выполнения"""
+        now = time.perf_counter() if now is None else now
+        if self.last_time is not None:
+            self.accumulator += now - self.last_time
+        self.last_time = now
+
+        # Небольшой допуск, чтобы ровно накопленный тик не терялся из-за округления
+        ticks = int(self.accumulator / self.dt + 1e-9)
+        if ticks > self.max_ticks:
+            self.dropped_time += (ticks - self.max_ticks) * self.dt
+            ticks = self.max_ticks
+            # Остаток меньше тика сохраняем, чтобы интерполяция не прыгала
+            self.accumulator %= self.dt
+        else:
+            self.accumulator = max(self.accumulator - ticks * self.dt, 0.0)
+        self.ticks += ticks
+        return ticks
+
+    @property
+    def alpha(self):
+        return min(self.accumulator / self.dt, 1.0)
@@ -1,175 +1,527 @@
-import pygame
-from OpenGL.GL import *
+from collections import OrderedDict
+import math
 import numpy as np
+import os
 import settings
+import time
+import zlib
+from chunk import Chunk, chunk_coords
+from blocks import registry
+from culling import ALL_CONNECTED, CullingStats, cull_chunks, reachable_chunks
+from edits import ChangeSet, box_slices
+from lighting import EMISSION, FULL_SKY, MAX_LIGHT, OPAQUE, LightEngine
+from mesh_builder import MeshBuilder
+from mesh_cache import MeshCache
+from profiler import profiler
+from region import RegionStorage
+from renderer import create_renderer
+from terrain import TerrainGenerator
+from textures import TextureAtlas
+
+# До скольких изменений света массовая правка обновляет свет поблочно (дальше - пересчет области)
+LIGHT_EDITS_ONE_BY_ONE = 16
+# Площадь пересчета (блоков по горизонтали) на одну правку, выше которой поблочно быстрее
+LIGHT_BOX_AREA_PER_EDIT = 1024
 
 class World:
-    def __init__(self, size_x, size_y, size_z):
-        self.size_x = size_x
-        self.size_y = size_y
-        self.size_z = size_z
-        
-        # Используем NumPy для более эффективного хранения блоков
-        self.blocks = np.zeros((size_x, size_y, size_z), dtype=np.uint8)
-        
-        # Инициализация земли и камня
-        self.blocks[:, 0, :] = 2  # Камень на уровне 0
-        self.blocks[:, 1, :] = 1  # Земля на уровне 1
-        
-        self.textures = self.load_textures()
-        # Создаем display list для кэширования отрисовки
-        self.display_list = None
-        self.needs_update = True
-
-    @staticmethod
-    def load_textures():
-        # Загружаем текстуры
-        textures = {}
-        textures['dirt'] = World.load_texture("textures/dirt.png")
-        textures['stone'] = World.load_texture("textures/stone.png")
-        return textures
-
-    @staticmethod
-    def load_texture(path):
-        # Загружаем изображение с помощью Pygame
-        texture_surface = pygame.image.load(path)
-        texture_data = pygame.image.tostring(texture_surface, "RGBA", True)
-        width, height = texture_surface.get_size()
-
-        # Генерируем текстуру в OpenGL
-        texture_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texture_id)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
-        return texture_id
-    
+    def __init__(self, seed=None, backend=None, atlas=None, remote=False, server=False):
+        """atlas - уже загруженный TextureAtlas (иначе текстуры читаются здесь),
+        remote - копия мира клиента: чанки и правки приходят с сервера (client.py), на диск ничего не пишется,
+        server - мир сервера (server.py): только блоки, без геометрии, текстур, кэша мешей и света"""
+        self.chunk_size = settings.CHUNK_SIZE
+        # Мир бесконечен по X и Z, по высоте ограничен WORLD_HEIGHT
+        self.size_y = settings.WORLD_HEIGHT
+        self.height_chunks = -(-self.size_y // self.chunk_size)
+        
+        self.remote = remote
+        self.server = server
+        # Сохранение в файлы регионов; у сохраненного мира берем его параметры
+        self.storage = RegionStorage(settings.SAVE_DIR, self.chunk_size) if settings.SAVE_DIR and not remote else None
+        meta = self.storage.load_meta() if self.storage is not None else None
+        if meta is not None:
+            if meta["chunk_size"] != self.chunk_size or meta["world_height"] != self.size_y:
+                raise ValueError(f"Мир в {settings.SAVE_DIR} сохранен с другими CHUNK_SIZE/WORLD_HEIGHT")
+            self.generator = TerrainGenerator(meta["seed"], meta["terrain"])
+        else:
+            self.generator = TerrainGenerator(seed)
+            if self.storage is not None:
+                self.storage.save_meta({"seed": self.generator.seed, "terrain": self.generator.kind,
+                                        "world_height": self.size_y})
+        # Чанки, измененные с прошлого сохранения
+        self.unsaved_chunks = set()
+        
+        # Загруженные чанки по координатам чанка; порядок - от давно ненужных
+        # к недавно использованным (LRU для выгрузки)
+        self.chunks = OrderedDict()
+        self.dirty_chunks = set()
+        # Чанки в радиусе загрузки вокруг игрока - их выгружать нельзя
+        self.active_chunks = set()
+        self.stream_center = None
+        # Измененные игроком чанки, вытесненные из памяти, если сохранение выключено (сжатые блоки)
+        self.spilled_chunks = {}
+        # Недавно редактированные чанки (ключ -> время последнего изменения);
+        # их блоки хранятся развернутыми, пока чанк не перестанут менять
+        self.hot_chunks = {}
+        # Свет блоков: считается для колонн чанков, у которых загружены соседи
+        self.lighting = LightEngine(self)
+        # Плоские индексы блоков чанка - по ним берутся срезы при массовых правках
+        size = self.chunk_size
+        self._local_indices = np.arange(size ** 3, dtype=np.uint16).reshape(size, size, size)
+        
+        # Все текстуры блоков в одном атласе (серверу не нужны)
+        if server:
+            self.atlas = self.block_textures = None
+        else:
+            self.atlas = atlas if atlas is not None else TextureAtlas.load("textures")
+            self.block_textures = registry.texture_lookup(self.atlas)
+        # Бэкенд отрисовки хранит геометрию каждого чанка на GPU
+        # (backend="null" - без OpenGL, для запуска без окна)
+        self.renderer = create_renderer(self.atlas, "null" if server else backend)
+        
+        # Геометрия строится в фоне, main loop только загружает готовые меши;
+        # геометрия неизмененных чанков берется из кэша прошлых запусков
+        # (у копии мира с сервера - свой каталог: ее чанки не совпадают с локальным миром)
+        self.mesh_cache = None
+        if settings.MESH_CACHE_DIR and not server:
+            directory = os.path.join(settings.MESH_CACHE_DIR, "remote") if remote else settings.MESH_CACHE_DIR
+            self.mesh_cache = MeshCache.open(directory, settings.MESH_CACHE_MB * 2 ** 20)
+        self.mesh_builder = MeshBuilder(cache=self.mesh_cache) if not server else None
+        self.pending_meshes = {}  # Ключ чанка -> версия, отправленная в пул
+        
+        # Статистика построения геометрии (для сравнения режимов мешера)
+        self.chunk_vertex_counts = {}
+        self.lod_camera = None  # Позиция камеры при последнем выборе уровней детализации
+        self.last_mesh_time = 0.0
+        self.culling_stats = CullingStats()
+        # Чанки, видимые из чанка камеры по графу видимости; пересчитываются, когда
+        # камера переходит в другой чанк или меняется связность чанков
+        self.visibility_generation = 0
+        self.visibility_cache = (None, None, None)
+
+    def spawn_point(self, x, z):
+        """Точка появления игрока над поверхностью в колонне (x, z)"""
+        return np.array([x + 0.5, self.generator.height_at(x, z), z + 0.5], dtype=np.float32)
+
+    def update_streaming(self, position, time_budget=None):
+        """Подгрузить чанки вокруг позиции игрока и выгрузить лишние.
+
+        Чанки загружаются от ближних к дальним, пока не истечет time_budget
+        секунд (по умолчанию CHUNK_LOAD_BUDGET_MS, float("inf") - загрузить все сразу).
+        """
+        light_budget = time_budget
+        if time_budget is None:
+            time_budget = settings.CHUNK_LOAD_BUDGET_MS / 1000
+        center = (math.floor(position[0]) // self.chunk_size, math.floor(position[2]) // self.chunk_size)
+        
+        if center != self.stream_center:
+            self.active_chunks = self.chunks_around(center)
+            self.stream_center = center
+            # Какие чанки держать в копии мира, решает сервер - здесь только порядок расчета света
+            if not self.remote:
+                # Отмечаем нужные чанки как недавно использованные
+                for key in reversed(self.active_chunks):
+                    if key in self.chunks:
+                        self.chunks.move_to_end(key)
+                self.evict_chunks()
+        self.compact_idle_chunks()
+        
+        if not self.remote:
+            deadline = time.perf_counter() + time_budget
+            loaded = False
+            for key in self.active_chunks:
+                if key not in self.chunks:
+                    self.load_chunk(key)
+                    loaded = True
+                    if time.perf_counter() >= deadline:
+                        break
+            if loaded:
+                self.evict_chunks()
+        self.update_lighting(light_budget)
+
+    def chunks_around(self, center, radius=None):
+        """Ключи чанков в круге колонн radius вокруг колонны center, от ближних к дальним.
+
+        Радиус по умолчанию на два чанка больше радиуса отрисовки: видимым чанкам нужен
+        посчитанный свет соседей, а для света колонны - загруженные соседние колонны.
+        """
+        radius = settings.RENDER_DISTANCE + 2 if radius is None else radius
+        columns = [(dx, dz) for dx in range(-radius, radius + 1) for dz in range(-radius, radius + 1)
+                   if dx * dx + dz * dz <= radius * radius]
+        columns.sort(key=lambda c: c[0] * c[0] + c[1] * c[1])
+        return [(center[0] + dx, cy, center[1] + dz) for dx, dz in columns for cy in range(self.height_chunks)]
+
+    def update_lighting(self, time_budget=None):
+        """Посчитать свет загруженных колонн от ближних к дальним в пределах time_budget секунд"""
+        if time_budget is None:
+            time_budget = settings.LIGHT_BUDGET_MS / 1000
+        deadline = time.perf_counter() + time_budget
+        for cx, cy, cz in self.active_chunks:
+            if cy != 0 or (cx, cz) in self.lighting.lit_columns or not self.lighting.can_light(cx, cz):
+                continue
+            self.lighting.light_column(cx, cz)
+            if time.perf_counter() >= deadline:
+                break
+
+    def load_chunk(self, key):
+        """Загрузить чанк: вернуть вытесненный, прочитать с диска или сгенерировать заново"""
+        spilled = self.spilled_chunks.pop(key, None)
+        saved = self.storage.load(key) if spilled is None and self.storage is not None else None
+        if spilled is not None:
+            shape = (self.chunk_size,) * 3
+            return self.add_chunk(key, np.frombuffer(zlib.decompress(spilled), dtype=np.uint8).reshape(shape).copy(),
+                                  modified=True)
+        if saved is not None:
+            return self.add_chunk(key, saved, modified=True)
+        return self.add_chunk(key, self.generator.generate_chunk(*key, self.chunk_size))
+
+    def add_chunk(self, key, blocks, modified=False):
+        """Добавить в мир чанк с готовым массивом блоков (например, полученный с сервера)"""
+        chunk = Chunk(*key, self.chunk_size)
+        chunk.blocks = blocks
+        chunk.modified = modified
+        if settings.CHUNK_STORAGE == "palette":
+            chunk.compact()
+        self.chunks[key] = chunk
+        self.visibility_generation += 1
+        
+        # Новый чанк меняет видимость граней у уже загруженных соседей
+        self.mark_dirty(key)
+        cx, cy, cz = key
+        for neighbour in ((cx - 1, cy, cz), (cx + 1, cy, cz), (cx, cy - 1, cz),
+                          (cx, cy + 1, cz), (cx, cy, cz - 1), (cx, cy, cz + 1)):
+            self.mark_dirty(neighbour)
+        return chunk
+
+    def drop_chunk(self, key):
+        """Выгрузить чанк key сразу, не дожидаясь вытеснения"""
+        chunk = self.chunks.pop(key, None)
+        if chunk is not None:
+            self.unload_chunk(chunk)
+
+    def evict_chunks(self):
+        """Выгрузить давно не нужные чанки, пока память не уложится в CHUNK_CACHE_MB"""
+        limit = settings.CHUNK_CACHE_MB * 1024 * 1024
+        memory = self.chunk_memory()
+        if memory <= limit:
+            return
+        active = set(self.active_chunks)
+        for key in list(self.chunks):
+            if memory <= limit:
+                break
+            if key in active:
+                continue
+            chunk = self.chunks.pop(key)
+            memory -= self._chunk_bytes(chunk)
+            self.unload_chunk(chunk)
+
+    def compact_idle_chunks(self):
+        """Сжать чанки, которые не редактировали дольше CHUNK_COMPACT_DELAY секунд"""
+        if settings.CHUNK_STORAGE != "palette" or not self.hot_chunks:
+            return
+        now = time.perf_counter()
+        for key, edited in list(self.hot_chunks.items()):
+            if now - edited < settings.CHUNK_COMPACT_DELAY:
+                continue
+            del self.hot_chunks[key]
+            chunk = self.chunks.get(key)
+            if chunk is not None:
+                chunk.compact()
+
+    def unload_chunk(self, chunk):
+        """Освободить чанк; измененные чанки сохраняются на диск или в сжатом виде в памяти"""
+        if self.storage is not None:
+            if chunk.key in self.unsaved_chunks:
+                self.unsaved_chunks.discard(chunk.key)
+                self.storage.save({chunk.key: chunk.blocks})
+        elif chunk.modified and not self.remote:
+            self.spilled_chunks[chunk.key] = zlib.compress(chunk.blocks.tobytes())
+        self.renderer.remove_chunk(chunk.key)
+        self.dirty_chunks.discard(chunk.key)
+        self.pending_meshes.pop(chunk.key, None)
+        self.chunk_vertex_counts.pop(chunk.key, None)
+        self.hot_chunks.pop(chunk.key, None)
+        self.visibility_generation += 1
+        # Без чанка свет колонны неполный - после загрузки он считается заново
+        if (chunk.cx, chunk.cz) in self.lighting.lit_columns:
+            self.lighting.forget_column(chunk.cx, chunk.cz)
+            for cy in range(self.height_chunks):
+                other = self.chunks.get((chunk.cx, cy, chunk.cz))
+                if other is not None:
+                    other.light = None
+
+    def chunk_memory(self):
+        """Память, занятая блоками и светом загруженных чанков, в байтах"""
+        return sum(self._chunk_bytes(chunk) for chunk in self.chunks.values())
+
+    def _chunk_bytes(self, chunk):
+        return chunk.nbytes + self.lighting.nbytes(chunk)
+
+    def memory_report(self):
+        """Число чанков и занятая память по видам хранения плюс размер без сжатия"""
+        report = {kind: {"chunks": 0, "bytes": 0} for kind in ("uniform", "palette", "dense")}
+        for chunk in self.chunks.values():
+            entry = report[chunk.storage_kind]
+            entry["chunks"] += 1
+            entry["bytes"] += chunk.nbytes
+        report["total_bytes"] = sum(report[kind]["bytes"] for kind in ("uniform", "palette", "dense"))
+        report["dense_bytes"] = len(self.chunks) * self.chunk_size ** 3
+        report["light_bytes"] = sum(self.lighting.nbytes(chunk) for chunk in self.chunks.values())
+        return report
+
+    def mark_dirty(self, key):
+        """Отметить чанк как требующий перестройки"""
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            chunk.dirty = True
+            chunk.version += 1
+            self.dirty_chunks.add(key)
+
+    def mark_region_dirty(self, key, changed):
+        """В чанке изменились блоки или свет по маске changed - перестроить его и соседей, чья рамка их видит"""
+        self.mark_dirty(key)
+        cx, cy, cz = key
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    neighbour = self.chunks.get((cx + dx, cy + dy, cz + dz))
+                    if neighbour is None or not (dx or dy or dz):
+                        continue
+                    # Рамка соседа толщиной в клетку его сетки детализации
+                    border = 1 << neighbour.lod
+                    sides = {-1: slice(0, border), 0: slice(None), 1: slice(-border, None)}
+                    if changed[sides[dx], sides[dy], sides[dz]].any():
+                        self.mark_dirty(neighbour.key)
+
     def update_chunk(self, x=None, y=None, z=None):
-        """Отметить мир или его часть как требующую обновления"""
-        self.needs_update = True
-        
-    def draw(self):
-        # Используем display list для кэширования геометрии
-        if self.needs_update or self.display_list is None:
-            if self.display_list is None:
-                self.display_list = glGenLists(1)
-            
-            glNewList(self.display_list, GL_COMPILE)
-            self._render_world()
-            glEndList()
-            self.needs_update = False
+        """Отметить мир или чанк с блоком (x, y, z) как требующий обновления"""
+        if x is None or y is None or z is None:
+            for key in self.chunks:
+                self.mark_dirty(key)
+        else:
+            self.mark_dirty(chunk_coords(x, y, z, self.chunk_size))
+        
+    def draw(self, frustum=None, camera_position=None):
+        with profiler.scope("meshing"):
+            if camera_position is not None:
+                self.update_lod(camera_position)
+            self.update_meshes()
         
-        # Отрисовываем кэшированную геометрию
-        glCallList(self.display_list)
+        # Отрисовываем кэшированную геометрию видимых чанков
+        with profiler.scope("culling"):
+            max_distance = settings.RENDER_DISTANCE * self.chunk_size
+            visible = cull_chunks(self.renderer.chunk_keys(), self.chunk_size, frustum,
+                                  camera_position, max_distance, self.culling_stats)
+            self.culling_stats.culled_occlusion = 0
+            if settings.OCCLUSION_CULLING and camera_position is not None:
+                reachable = self.reachable_chunks(camera_position)
+                if reachable is not None:
+                    in_view = len(visible)
+                    visible = [key for key in visible if key in reachable]
+                    self.culling_stats.culled_occlusion = in_view - len(visible)
+                    self.culling_stats.drawn = len(visible)
+        with profiler.scope("gl_submit"):
+            self.renderer.draw(visible)
     
-    def _render_world(self):
-        """Внутренний метод для рендеринга мира"""
-        glEnable(GL_TEXTURE_2D)
+    def reachable_chunks(self, camera_position):
+        """Чанки, которые можно увидеть из чанка камеры (None - камера вне загруженного мира)"""
+        camera = chunk_coords(*(int(np.floor(c)) for c in camera_position), self.chunk_size)
+        if camera not in self.chunks:
+            return None
+        cached_camera, generation, reachable = self.visibility_cache
+        if cached_camera == camera and generation == self.visibility_generation:
+            return reachable
+        radius = settings.RENDER_DISTANCE + 1
+        allowed = {key for key in self.chunks
+                   if abs(key[0] - camera[0]) <= radius and abs(key[2] - camera[2]) <= radius}
+        connectivity = {key: self.chunks[key].connectivity for key in allowed
+                        if self.chunks[key].connectivity is not None}
+        reachable = reachable_chunks(camera, connectivity, allowed)
+        self.visibility_cache = (camera, self.visibility_generation, reachable)
+        return reachable
+
+    def update_lod(self, camera_position):
+        """Выбрать уровень детализации чанков по расстоянию от камеры по горизонтали.
+
+        Уровень меняется, только когда чанк отошел за границу кольца (или
+        вернулся внутрь) больше чем на LOD_HYSTERESIS чанков.
+        """
+        camera = np.asarray(camera_position, dtype=np.float64)
+        if not settings.LOD_DISTANCES or not self.chunks:
+            return
+        if self.lod_camera is not None and np.abs(camera - self.lod_camera).max() < 1.0:
+            return
+        self.lod_camera = camera
+        keys = list(self.chunks)
+        centers = (np.array(keys, dtype=np.float64)[:, [0, 2]] + 0.5) * self.chunk_size
+        distances = np.hypot(*(centers - camera[[0, 2]]).T)[:, None] / self.chunk_size
+        rings = np.array(settings.LOD_DISTANCES, dtype=np.float64)
+        lowest = (distances > rings + settings.LOD_HYSTERESIS).sum(axis=1)
+        highest = (distances > rings - settings.LOD_HYSTERESIS).sum(axis=1)
+        current = np.array([self.chunks[key].lod for key in keys])
+        levels = np.clip(current, lowest, highest)
+        for i in np.flatnonzero(levels != current):
+            self.chunks[keys[i]].lod = int(levels[i])
+            # Старая геометрия рисуется, пока не готова новая, - без провала на месте чанка
+            self.mark_dirty(keys[i])
+
+    def update_meshes(self, time_budget=None):
+        """Отправить измененные чанки в пул и загрузить готовые меши в пределах бюджета кадра"""
+        if time_budget is None:
+            time_budget = settings.MESH_UPLOAD_BUDGET_MS / 1000
         
-        # Используем NumPy для быстрого поиска непустых блоков
-        x_coords, y_coords, z_coords = np.where(self.blocks > 0)
+        # Объединенным граням нужен повтор текстуры внутри клетки атласа
+        greedy = settings.GREEDY_MESHING and self.renderer.supports_tiling
+        waiting = set()
+        for key in self.dirty_chunks:
+            chunk = self.chunks[key]
+            # Без соседей граней на границе не определить - ждем их загрузки и света
+            if not self._ready_to_mesh(chunk):
+                waiting.add(key)
+                continue
+            if chunk.is_empty():
+                self._apply_mesh(chunk, None, ALL_CONNECTED)
+                continue
+            # Пул получает копию блоков, поэтому чанк можно менять дальше;
+            # упрощенной геометрии нужна рамка толщиной в одну клетку уменьшенной сетки
+            border = 1 << chunk.lod
+            self.mesh_builder.submit(key, chunk.version, self.get_padded_blocks(chunk, border),
+                                     chunk.origin, greedy, self.block_textures,
+                                     self.get_padded_light(chunk, border), settings.AMBIENT_OCCLUSION,
+                                     chunk.lod, self.renderer.supports_tiling)
+            self.pending_meshes[key] = chunk.version
+        self.dirty_chunks = waiting
         
-        for i in range(len(x_coords)):
-            x, y, z = x_coords[i], y_coords[i], z_coords[i]
-            block_type = self.blocks[x, y, z]
-            texture_id = self.textures['dirt'] if block_type == 1 else self.textures['stone']
-            
-            # Проверяем и рисуем только видимые грани
-            # Верхняя грань
-            if y + 1 >= self.size_y or self.blocks[x, y + 1, z] == 0:
-                self.draw_face(x, y, z, texture_id, "top")
-            # Нижняя грань
-            if y - 1 < 0 or self.blocks[x, y - 1, z] == 0:
-                self.draw_face(x, y, z, texture_id, "bottom")
-            # Передняя грань
-            if z + 1 >= self.size_z or self.blocks[x, y, z + 1] == 0:
-                self.draw_face(x, y, z, texture_id, "front")
-            # Задняя грань
-            if z - 1 < 0 or self.blocks[x, y, z - 1] == 0:
-                self.draw_face(x, y, z, texture_id, "back")
-            # Левая грань
-            if x - 1 < 0 or self.blocks[x - 1, y, z] == 0:
-                self.draw_face(x, y, z, texture_id, "left")
-            # Правая грань
-            if x + 1 >= self.size_x or self.blocks[x + 1, y, z] == 0:
-                self.draw_face(x, y, z, texture_id, "right")
-                
-        glDisable(GL_TEXTURE_2D)
-
-    @staticmethod
-    def draw_face(x, y, z, texture_id, face):
-        glBindTexture(GL_TEXTURE_2D, texture_id)
-        glBegin(GL_QUADS)
-
-        if face == "top":  # Верхняя грань
-            glTexCoord2f(0, 0)
-            glVertex3f(x, y + 1, z)
-            glTexCoord2f(1, 0)
-            glVertex3f(x + 1, y + 1, z)
-            glTexCoord2f(1, 1)
-            glVertex3f(x + 1, y + 1, z + 1)
-            glTexCoord2f(0, 1)
-            glVertex3f(x, y + 1, z + 1)
-        elif face == "bottom":  # Нижняя грань
-            glTexCoord2f(0, 0)
-            glVertex3f(x, y, z)
-            glTexCoord2f(1, 0)
-            glVertex3f(x + 1, y, z)
-            glTexCoord2f(1, 1)
-            glVertex3f(x + 1, y, z + 1)
-            glTexCoord2f(0, 1)
-            glVertex3f(x, y, z + 1)
-        elif face == "front":  # Передняя грань
-            glTexCoord2f(0, 0)
-            glVertex3f(x, y, z + 1)
-            glTexCoord2f(1, 0)
-            glVertex3f(x + 1, y, z + 1)
-            glTexCoord2f(1, 1)
-            glVertex3f(x + 1, y + 1, z + 1)
-            glTexCoord2f(0, 1)
-            glVertex3f(x, y + 1, z + 1)
-        elif face == "back":  # Задняя грань
-            glTexCoord2f(0, 0)
-            glVertex3f(x, y, z)
-            glTexCoord2f(1, 0)
-            glVertex3f(x + 1, y, z)
-            glTexCoord2f(1, 1)
-            glVertex3f(x + 1, y + 1, z)
-            glTexCoord2f(0, 1)
-            glVertex3f(x, y + 1, z)
-        elif face == "left":  # Левая грань
-            glTexCoord2f(0, 0)
-            glVertex3f(x, y, z)
-            glTexCoord2f(1, 0)
-            glVertex3f(x, y, z + 1)
-            glTexCoord2f(1, 1)
-            glVertex3f(x, y + 1, z + 1)
-            glTexCoord2f(0, 1)
-            glVertex3f(x, y + 1, z)
-        elif face == "right":  # Правая грань
-            glTexCoord2f(0, 0)
-            glVertex3f(x + 1, y, z)
-            glTexCoord2f(1, 0)
-            glVertex3f(x + 1, y, z + 1)
-            glTexCoord2f(1, 1)
-            glVertex3f(x + 1, y + 1, z + 1)
-            glTexCoord2f(0, 1)
-            glVertex3f(x + 1, y + 1, z)
-
-        glEnd()
+        self.last_mesh_time = 0.0
+        uploaded = 0
+        for key, version, mesh, connectivity, elapsed in self.mesh_builder.drain(time_budget):
+            chunk = self.chunks.get(key)
+            # Чанк успели изменить, пока строилась геометрия - ждем новый результат
+            if chunk is None or chunk.version != version:
+                continue
+            self._apply_mesh(chunk, mesh, connectivity)
+            self.last_mesh_time += elapsed
+            uploaded += 1
         
+        if uploaded and settings.DEBUG_MODE:
+            print(f"Загружено чанков: {uploaded}, в очереди: {len(self.pending_meshes)}, "
+                  f"вершин в мире: {self.vertex_count()}, время мешинга: {self.last_mesh_time * 1000:.1f} мс")
+    
+    def _ready_to_mesh(self, chunk):
+        # Свет посчитан у колонны и всех соседних - значит, и соседи загружены
+        return self.lighting.is_lit_around(chunk.cx, chunk.cz)
+
+    def _apply_mesh(self, chunk, mesh, connectivity):
+        """Загрузить готовую геометрию чанка в бэкенд отрисовки и запомнить его связность"""
+        self.renderer.update_chunk(chunk.key, mesh)
+        self.pending_meshes.pop(chunk.key, None)
+        self.chunk_vertex_counts[chunk.key] = 0 if mesh is None else len(mesh.vertices)
+        chunk.dirty = False
+        if connectivity != chunk.connectivity:
+            chunk.connectivity = connectivity
+            self.visibility_generation += 1
+    
+    def save(self):
+        """Записать на диск чанки, измененные с прошлого сохранения (в фоновом потоке)"""
+        if self.mesh_cache is not None:
+            self.mesh_cache.save_index()
+        if self.storage is None:
+            return 0
+        changed = {key: self.chunks[key].blocks.copy() for key in self.unsaved_chunks}
+        self.unsaved_chunks.clear()
+        self.storage.save(changed)
+        if changed and settings.DEBUG_MODE:
+            print(f"Сохранено чанков: {len(changed)}")
+        return len(changed)
+
+    def close(self):
+        """Сохранить мир и остановить фоновые потоки"""
+        if self.mesh_builder is not None:
+            self.mesh_builder.shutdown()
+        if self.storage is not None:
+            self.save()
+            self.storage.close()
+        if self.mesh_cache is not None:
+            self.mesh_cache.close()
+
+    def loading_progress(self, position, radius):
+        """Доля чанков в колоннах на radius вокруг position, готовых к отрисовке (загружены, освещены, построены).
+
+        Для геометрии нужен свет колонн 3x3 вокруг, для света - загруженные соседи,
+        то есть колонны 5x5 в круге загрузки (chunks_around); остальные не считаются.
+        """
+        cx, cz = math.floor(position[0]) // self.chunk_size, math.floor(position[2]) // self.chunk_size
+        loaded = settings.RENDER_DISTANCE + 2
+        columns = [(dx, dz) for dx in range(-radius, radius + 1) for dz in range(-radius, radius + 1)
+                   if all((dx + ex) ** 2 + (dz + ez) ** 2 <= loaded ** 2 for ex in (-2, 2) for ez in (-2, 2))]
+        keys = [(cx + dx, cy, cz + dz) for dx, dz in columns for cy in range(self.height_chunks)]
+        ready = sum(1 for key in keys if key in self.chunks and not self.chunks[key].dirty)
+        return ready / len(keys)
+
+    def vertex_count(self):
+        """Общее число вершин в построенной геометрии мира"""
+        return sum(self.chunk_vertex_counts.values())
+
+    def get_padded_blocks(self, chunk, border=1):
+        """Блоки чанка с рамкой в border блоков из соседних чанков (для отсечения граней)"""
+        return self._padded(chunk, lambda c: c.blocks, 0, border)
+
+    def get_padded_light(self, chunk, border=1):
+        """Свет чанка с рамкой из соседних; вне загруженного мира - полный небесный свет"""
+        return self._padded(chunk, lambda c: c.light, FULL_SKY, border)
+
+    def _padded(self, chunk, field, fill, border=1):
+        """Массив field(чанк) с рамкой в border блоков из соседних чанков (нет данных - fill)"""
+        size = self.chunk_size
+        padded = np.full((size + 2 * border,) * 3, fill, dtype=np.uint8)
+        own = field(chunk)
+        if own is not None:
+            padded[border:-border, border:-border, border:-border] = own
+        
+        # Для каждого из 26 соседей копируем только прилегающий к чанку срез
+        ranges = {-1: (slice(0, border), slice(size - border, size)),
+                  0: (slice(border, size + border), slice(0, size)),
+                  1: (slice(size + border, size + 2 * border), slice(0, border))}
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    if dx == dy == dz == 0:
+                        continue
+                    neighbour = self.chunks.get((chunk.cx + dx, chunk.cy + dy, chunk.cz + dz))
+                    values = None if neighbour is None else field(neighbour)
+                    if values is None:
+                        continue
+                    (px, nx), (py, ny), (pz, nz) = ranges[dx], ranges[dy], ranges[dz]
+                    padded[px, py, pz] = values[nx, ny, nz]
+        return padded
+
+    def in_bounds(self, x, y, z):
+        return 0 <= y < self.size_y
+
+    def get_chunk(self, x, y, z):
+        """Получить чанк, содержащий блок (x, y, z)"""
+        return self.chunks.get(chunk_coords(x, y, z, self.chunk_size))
+
     def set_block(self, x, y, z, block_type):
         """Установить блок определенного типа в указанной позиции"""
-        if 0 <= x < self.size_x and 0 <= y < self.size_y and 0 <= z < self.size_z:
+        if self.in_bounds(x, y, z):
+            key = chunk_coords(x, y, z, self.chunk_size)
+            chunk = self.chunks.get(key) or self.load_chunk(key)
+            lx, ly, lz = x - chunk.cx * self.chunk_size, y - chunk.cy * self.chunk_size, z - chunk.cz * self.chunk_size
+            
             # Если блок не меняется, ничего не делаем
-            if self.blocks[x, y, z] == block_type:
+            old_type = chunk.get_local(lx, ly, lz)
+            if not chunk.set_local(lx, ly, lz, block_type):
                 return True
-            
-            # Устанавливаем новый тип блока
-            self.blocks[x, y, z] = block_type
         
-            # Отмечаем, что мир нуждается в обновлении
-            self.needs_update = True
+            # Отмечаем, что чанк нуждается в обновлении и сохранении; блок на границе
+            # чанка меняет видимость граней и затенение углов у соседей
+            changed = np.zeros(chunk.blocks.shape, dtype=bool)
+            changed[lx, ly, lz] = True
+            self.mark_region_dirty(chunk.key, changed)
+            self.unsaved_chunks.add(chunk.key)
+            self.hot_chunks[chunk.key] = time.perf_counter()
+            
+            self.lighting.update_block(x, y, z, old_type, block_type)
         
             # Выводим отладочную информацию
             if hasattr(settings, 'DEBUG_MODE') and settings.DEBUG_MODE:
@@ -177,8 +529,198 @@ class World:
             
             return True
         return False
+
+    def fill_box(self, start, end, block_type):
+        """Заполнить блоки от start до end (не включая, как в срезах) типом block_type.
+
+        Как и остальные массовые правки, возвращает ChangeSet для отмены через revert.
+        """
+        start, end = self._clip_box(start, end)
+        edits = {}
+        for key, _, local in box_slices(start, end, self.chunk_size):
+            indices = self._local_indices[local].ravel()
+            edits[key] = (indices, np.full(len(indices), block_type, dtype=np.uint8))
+        return self.apply_chunk_edits(edits)
+
+    def replace_box(self, start, end, old_type, new_type):
+        """Заменить блоки old_type на new_type в пределах от start до end (не включая)"""
+        start, end = self._clip_box(start, end)
+        edits = {}
+        for key, _, local in box_slices(start, end, self.chunk_size):
+            chunk = self.chunks.get(key) or self.load_chunk(key)
+            indices = self._local_indices[local][chunk.blocks[local] == old_type]
+            if len(indices):
+                edits[key] = (indices, np.full(len(indices), new_type, dtype=np.uint8))
+        return self.apply_chunk_edits(edits)
+
+    def paste(self, blocks, offset, skip_air=False):
+        """Вставить массив блоков (X, Y, Z) углом в точку offset; skip_air - не затирать блоки воздухом"""
+        blocks = np.asarray(blocks, dtype=np.uint8)
+        origin = tuple(int(v) for v in offset)
+        start, end = self._clip_box(origin, tuple(o + n for o, n in zip(origin, blocks.shape)))
+        # Часть массива, попавшая в мир по высоте
+        blocks = blocks[:, start[1] - origin[1]:end[1] - origin[1], :]
+        edits = {}
+        for key, area, local in box_slices(start, end, self.chunk_size):
+            values = blocks[area].ravel()
+            indices = self._local_indices[local].ravel()
+            if skip_air:
+                keep = values != 0
+                values, indices = values[keep], indices[keep]
+            if len(indices):
+                edits[key] = (indices, values)
+        return self.apply_chunk_edits(edits)
+
+    def apply_edits(self, edits):
+        """Применить список правок (x, y, z, тип); при повторе координат действует последняя"""
+        edits = np.asarray(edits, dtype=np.int64).reshape(-1, 4)
+        edits = edits[(edits[:, 1] >= 0) & (edits[:, 1] < self.size_y)]
+        keys = edits[:, :3] // self.chunk_size
+        local = edits[:, :3] - keys * self.chunk_size
+        flat = (local[:, 0] * self.chunk_size + local[:, 1]) * self.chunk_size + local[:, 2]
+        # Группируем по чанкам так же, как get_blocks
+        codes = ((keys[:, 0] + (1 << 20)) << 42) | ((keys[:, 1] + (1 << 20)) << 21) | (keys[:, 2] + (1 << 20))
+        order = np.argsort(codes, kind="stable")
+        starts = np.flatnonzero(np.r_[True, codes[order][1:] != codes[order][:-1]])
+        chunk_edits = {}
+        for rows in np.split(order, starts[1:]) if len(order) else ():
+            # Оставляем последнюю правку каждого блока
+            _, last = np.unique(flat[rows][::-1], return_index=True)
+            rows = rows[::-1][last]
+            chunk_edits[tuple(keys[rows[0]].tolist())] = (flat[rows], edits[rows, 3].astype(np.uint8))
+        return self.apply_chunk_edits(chunk_edits)
+
+    def revert(self, change_set):
+        """Отменить массовую правку; возвращает ChangeSet, которым можно вернуть ее обратно"""
+        inverse = change_set.inverted()
+        return self.apply_chunk_edits({key: (indices, new) for key, (indices, _, new) in inverse.changes.items()})
+
+    def _clip_box(self, start, end):
+        """Ограничить блок [start, end) высотой мира"""
+        start = (int(start[0]), max(int(start[1]), 0), int(start[2]))
+        end = (int(end[0]), min(int(end[1]), self.size_y), int(end[2]))
+        return start, end
+
+    def apply_chunk_edits(self, edits):
+        """Записать правки {ключ чанка: (плоские индексы, новые типы)} и собрать ChangeSet.
+
+        Каждый затронутый чанк отмечается для перестройки один раз, свет
+        пересчитывается одним проходом по области изменений.
+        """
+        changes = {}
+        now = time.perf_counter()
+        shape = (self.chunk_size,) * 3
+        light_edits = []
+        for key, (indices, values) in edits.items():
+            if len(indices) == 0:
+                continue
+            chunk = self.chunks.get(key) or self.load_chunk(key)
+            old = chunk.set_many(indices, values)
+            changed = old != values
+            if not changed.any():
+                continue
+            indices, old, values = indices[changed].astype(np.uint16), old[changed], values[changed]
+            changes[key] = (indices, old, values)
+            mask = np.zeros(shape, dtype=bool)
+            mask.reshape(-1)[indices] = True
+            self.mark_region_dirty(key, mask)
+            self.unsaved_chunks.add(key)
+            self.hot_chunks[key] = now
+            # Свет меняют только блоки, у которых изменилась прозрачность или свечение
+            affects_light = (OPAQUE[old] != OPAQUE[values]) | (EMISSION[old] != EMISSION[values])
+            if affects_light.any():
+                light_edits.append((key, indices[affects_light], old[affects_light], values[affects_light]))
+        self._relight(light_edits)
+        
+        change_set = ChangeSet(changes)
+        if settings.DEBUG_MODE:
+            print(f"Изменено блоков: {len(change_set)} в {len(changes)} чанках")
+        return change_set
+
+    def _relight(self, light_edits):
+        """Обновить свет после массовой правки.
+
+        Правки делятся на группы, далекие друг от друга, и свет каждой группы
+        обновляется отдельно: немного блоков или редкие правки на большой
+        площади - по одному, много - пересчетом области вокруг группы.
+        """
+        # Свет никто не считал (мир сервера) - обновлять нечего
+        if not light_edits or not self.lighting.lit_columns:
+            return
+        shape = (self.chunk_size,) * 3
+        positions = np.concatenate([np.stack(np.unravel_index(indices, shape), axis=1) + np.array(key) * self.chunk_size
+                                    for key, indices, _, _ in light_edits])
+        old = np.concatenate([old for _, _, old, _ in light_edits])
+        new = np.concatenate([new for _, _, _, new in light_edits])
+        margin = 2 * (MAX_LIGHT + 1)
+        for rows in self._light_groups(positions):
+            low, high = positions[rows].min(axis=0), positions[rows].max(axis=0)
+            area = (high[0] - low[0] + 1 + margin) * (high[2] - low[2] + 1 + margin)
+            if len(rows) <= LIGHT_EDITS_ONE_BY_ONE or area > len(rows) * LIGHT_BOX_AREA_PER_EDIT:
+                for (x, y, z), old_type, new_type in zip(positions[rows].tolist(), old[rows].tolist(),
+                                                         new[rows].tolist()):
+                    self.lighting.update_block(x, y, z, old_type, new_type)
+            else:
+                self.lighting.relight_box(int(low[0]), int(low[2]), int(high[0]) + 1, int(high[2]) + 1)
+
+    def _light_groups(self, positions):
+        """Номера правок по группам: колонны чанков с правками ближе 2 * MAX_LIGHT блоков - в одной группе.
+
+        Свет от правки меняется не дальше MAX_LIGHT блоков, поэтому области
+        пересчета разных групп не задевают изменений друг друга.
+        """
+        columns = positions[:, [0, 2]] // self.chunk_size
+        unique, inverse = np.unique(columns, axis=0, return_inverse=True)
+        unique = [tuple(column) for column in unique.tolist()]
+        index = {column: i for i, column in enumerate(unique)}
+        reach = 1 + 2 * MAX_LIGHT // self.chunk_size
+        groups = np.full(len(unique), -1)
+        for first in range(len(unique)):
+            if groups[first] >= 0:
+                continue
+            groups[first] = first
+            stack = [first]
+            while stack:
+                cx, cz = unique[stack.pop()]
+                for dx in range(-reach, reach + 1):
+                    for dz in range(-reach, reach + 1):
+                        other = index.get((cx + dx, cz + dz))
+                        if other is not None and groups[other] < 0:
+                            groups[other] = first
+                            stack.append(other)
+        # Как в get_blocks: сортировка по группе, порядок правок внутри группы сохраняется
+        labels = groups[inverse.reshape(-1)]
+        order = np.argsort(labels, kind="stable")
+        starts = np.flatnonzero(np.r_[True, labels[order][1:] != labels[order][:-1]])
+        return np.split(order, starts[1:])
+
     def get_block(self, x, y, z):
-        """Получить тип блока в указанной позиции"""
-        if 0 <= x < self.size_x and 0 <= y < self.size_y and 0 <= z < self.size_z:
-            return self.blocks[x, y, z]
-        return None
\ No newline at end of file
+        """Получить тип блока в указанной позиции (None вне мира и в незагруженных чанках)"""
+        chunk = self.get_chunk(x, y, z) if self.in_bounds(x, y, z) else None
+        if chunk is not None:
+            return chunk.get_local(x - chunk.cx * self.chunk_size,
+                                   y - chunk.cy * self.chunk_size,
+                                   z - chunk.cz * self.chunk_size)
+        return None
+
+    def get_blocks(self, positions):
+        """Типы блоков для массива координат (N, 3); вне мира и в незагруженных чанках - 0"""
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3)
+        result = np.zeros(len(positions), dtype=np.uint8)
+        inside = np.flatnonzero((positions[:, 1] >= 0) & (positions[:, 1] < self.size_y))
+        if len(inside) == 0:
+            return result
+        keys = positions[inside] // self.chunk_size
+        local = positions[inside] - keys * self.chunk_size
+        # Одно обращение к массиву блоков на каждый затронутый чанк;
+        # ключи чанков упаковываются в одно число, чтобы группировать быстрее
+        codes = ((keys[:, 0] + (1 << 20)) << 42) | ((keys[:, 1] + (1 << 20)) << 21) | (keys[:, 2] + (1 << 20))
+        order = np.argsort(codes, kind="stable")
+        starts = np.flatnonzero(np.r_[True, codes[order][1:] != codes[order][:-1]])
+        for rows in np.split(order, starts[1:]):
+            chunk = self.chunks.get(tuple(keys[rows[0]].tolist()))
+            if chunk is None:
+                continue
+            lx, ly, lz = local[rows].T
+            result[inside[rows]] = chunk.get_many(lx, ly, lz)
+        return result